@@ -361,6 +361,46 @@ def LookingGlassAddonInitHandler(dummy1, dummy2):
 
 
 
+# ------------ SERVICE INITIALIZATION ---------------
+# NOTE: The service connects to Looking Glass Bridge and requests the devices
+#		in a background thread. This timer waits for the service on the main
+#		thread, because bpy must not be accessed from other threads.
+def LookingGlassAddonServiceReadyHandler():
+
+	# if the service was removed in the meantime
+	if not LookingGlassAddon.service or not hasattr(LookingGlassAddon.service, 'is_ready'):
+		return None
+
+	# check again later, if the service is not ready yet
+	if not LookingGlassAddon.service.is_ready():
+		return 0.5
+
+	# log info
+	LookingGlassAddonLogger.info("Connected to Looking Glass Bridge version: %s" % LookingGlassAddon.service.get_version())
+
+	# send the quilts from a background thread, so that the UI is not
+	# blocked while the quilt is encoded and sent
+	LookingGlassAddon.service.asynchronous = True
+
+	# add the devices found by the service to the list of devices
+	pylio.DeviceManager.refresh(devices=LookingGlassAddon.service.devices)
+
+	# detect device changes in the background, if this is activated
+	LookingGlassAddon.update_device_polling(None, None)
+
+	# if no device is active yet, make the first connected one the active one
+	if pylio.DeviceManager.count() and (not pylio.DeviceManager.get_active() or pylio.DeviceManager.get_active().emulated):
+		pylio.DeviceManager.set_active(pylio.DeviceManager.to_list()[0].id)
+
+	# redraw the UI, so that the device list is updated
+	for window in bpy.context.window_manager.windows:
+		for area in window.screen.areas:
+			area.tag_redraw()
+
+	return None
+
+
+
 # ---------- ADDON INITIALIZATION & CLEANUP -------------
 def register():
 
@@ -456,6 +496,9 @@ def register():
 		# setup the quilt presets
 		LookingGlassAddon.setupQuiltPresets()
 
+		# cache the gather indices of the lenticular interleaver in the add-on's temp folder
+		pylio.LookingGlassInterleaver.cache_path = os.path.join(LookingGlassAddon.tmp_path, "interleaver")
+
 		# run initialization helper function as app handler
 		# NOTE: this is needed to run certain modal operators of the addon on startup
 		#		or when a new file is loaded
@@ -468,25 +511,34 @@ def register():
 		LookingGlassAddonLogger.info("Connecting to Looking Glass Bridge ...")
 
 		# create a service using "Looking Glass Bridge" backend
-		LookingGlassAddon.service = pylio.ServiceManager.add(pylio.lookingglass.services.LookingGlassBridge, client_name = LookingGlassAddon.name)
+		# NOTE: In the UI, the service connects in the background, so that Blender
+		#		starts without waiting for Looking Glass Bridge
+		LookingGlassAddon.service = pylio.ServiceManager.add(pylio.lookingglass.services.LookingGlassBridge, client_name = LookingGlassAddon.name, blocking = LookingGlassAddon.background)
 
 		# if a service was added
 		if type(LookingGlassAddon.service) == pylio.lookingglass.services.LookingGlassBridge:
 
-			# if the service is ready
-			if LookingGlassAddon.service.is_ready():
+			# if Blender runs in background mode, the service connected already
+			if LookingGlassAddon.background:
 
 				# log info
-				LookingGlassAddonLogger.info(" [#] Connected to Looking Glass Bridge version: %s" % LookingGlassAddon.service.get_version())
+				if LookingGlassAddon.service.is_ready(): LookingGlassAddonLogger.info(" [#] Connected to Looking Glass Bridge version: %s" % LookingGlassAddon.service.get_version())
+				else: LookingGlassAddonLogger.info(" [#] Connection failed.")
 
 			else:
 
 				# log info
-				LookingGlassAddonLogger.info(" [#] Connection failed.")
+				LookingGlassAddonLogger.info(" [#] Waiting for Looking Glass Bridge in the background ...")
+
+				# set up the service and add the devices, when the service is ready
+				bpy.app.timers.register(LookingGlassAddonServiceReadyHandler, first_interval=0.1, persistent=True)
 
 			# make the device manager use the created service instance
 			pylio.DeviceManager.set_service(LookingGlassAddon.service)
 
+			# rebuild the device lists of the UI, when devices are added or removed
+			pylio.DeviceManager.add_listener(LookingGlassAddonUI.device_list_changed_callback)
+
 			# create a set of emulated devices
 			# NOTE: This automatically creates an emulated Looking Glass for
 			#		each device type that is defined in pyLightIO.
@@ -528,9 +580,18 @@ def register():
 
 def unregister():
 
+	# stop waiting for the service
+	if bpy.app.timers.is_registered(LookingGlassAddonServiceReadyHandler):
+		bpy.app.timers.unregister(LookingGlassAddonServiceReadyHandler)
+
 	# if the a service for display communication is active
 	if LookingGlassAddon.service:
 
+		# stop listening to the device manager
+		pylio.DeviceManager.remove_listener(LookingGlassAddonUI.device_list_changed_callback)
+		if bpy.app.timers.is_registered(LookingGlassAddonUI.device_list_changed_handler):
+			bpy.app.timers.unregister(LookingGlassAddonUI.device_list_changed_handler)
+
 		# Unregister at Looking Glass Bridge
 		pylio.ServiceManager.remove(LookingGlassAddon.service)
 
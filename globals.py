@@ -276,6 +276,26 @@ class LookingGlassAddon:
 						# deactivate console output
 						handler.setLevel(logging.CRITICAL + 1)
 
+	# start or stop the background detection of device changes
+	@staticmethod
+	def update_device_polling(self, context):
+
+		# if the service is not ready yet, the polling is started when it is
+		if not LookingGlassAddon.service or not LookingGlassAddon.service.is_ready():
+			return
+
+		# TODO: Would be better, if from .lib import pylightio could be called,
+		#		but for some reason that does not import all modules and throws
+		#		"AliceLG.lib.pylio has no attribute 'lookingglass"
+		import pylightio as pylio
+
+		# if the devices shall be polled
+		if bpy.context.preferences.addons[__package__].preferences.device_polling:
+			pylio.DeviceManager.start_polling()
+
+		else:
+			pylio.DeviceManager.stop_polling()
+
 	# update the lightfield window to display a lightfield on the device
 	@staticmethod
 	def update_lightfield_window(window_mode, lightfield_image, flip_views=None, invert=None):
@@ -319,7 +339,9 @@ class LookingGlassAddon:
 					if invert is None: invert = False
 
 					# let the device display the image
-					if device.service: device.display(lightfield_image, flip_views=flip_views, invert=invert)
+					# NOTE: The quilt is cached by the service, so that stepping
+					#		through images does not upload the same quilts again
+					if device.service: device.display(lightfield_image, flip_views=flip_views, invert=invert, cache_key=True)
 
 			# if the demo quilt was requested
 			elif lightfield_image is None:
@@ -7,12 +7,12 @@ except:
     # fall back to 100% python implementation
     from .cbor import loads, dumps, load, dump
 
-from .cbor import Tag
+from .cbor import Tag, CBOREncoder, CBORDecoder, dumps_into
 from .tagmap import TagMapper, ClassTag, UnknownTagException
 from .VERSION import __doc__ as __version__
 
 __all__ = [
-    'loads', 'dumps', 'load', 'dump',
+    'loads', 'dumps', 'load', 'dump', 'dumps_into', 'CBOREncoder', 'CBORDecoder',
     'Tag',
     'TagMapper', 'ClassTag', 'UnknownTagException',
     '__version__',
@@ -94,39 +94,6 @@ CBOR_TAG_CBOR_FILEHEADER = 55799 # can open a file with 0xd9d9f7
 
 _CBOR_TAG_BIGNUM_BYTES = struct.pack('B', CBOR_TAG | CBOR_TAG_BIGNUM)
 
-# NOTE: This is a modification to the original CBOR:
-# - define a global list, that stores all objects that shall be CBOR serialized
-# - serialize all in the end to save time
-dumps_list = []
-
-def dumps_int(val):
-    global dumps_list
-
-    "return bytes representing int val in CBOR"
-    if val >= 0:
-        # CBOR_UINT is 0, so I'm lazy/efficient about not OR-ing it in.
-        if val <= 23:
-            dumps_list.append(struct.pack('B', val))
-            return
-        if val <= 0x0ff:
-            dumps_list.append(struct.pack('BB', CBOR_UINT8_FOLLOWS, val))
-            return
-        if val <= 0x0ffff:
-            dumps_list.append(struct.pack('!BH', CBOR_UINT16_FOLLOWS, val))
-            return
-        if val <= 0x0ffffffff:
-            dumps_list.append(struct.pack('!BI', CBOR_UINT32_FOLLOWS, val))
-            return
-        if val <= 0x0ffffffffffffffff:
-            dumps_list.append(struct.pack('!BQ', CBOR_UINT64_FOLLOWS, val))
-            return
-        outb = _dumps_bignum_to_bytearray(val)
-        dumps_list.append(_CBOR_TAG_BIGNUM_BYTES + _encode_type_num(CBOR_BYTES, len(outb)) + outb)
-        return
-    val = -1 - val
-    dumps_list.append(_encode_type_num(CBOR_NEGINT, val))
-
-
 if _IS_PY3:
     def _dumps_bignum_to_bytearray(val):
         out = []
@@ -143,13 +110,6 @@ else:
         return b''.join(out)
 
 
-def dumps_float(val):
-    global dumps_list
-
-    dumps_list.append(struct.pack("!Bd", CBOR_FLOAT64, val))
-    return
-
-
 _CBOR_TAG_NEGBIGNUM_BYTES = struct.pack('B', CBOR_TAG | CBOR_TAG_NEGBIGNUM)
 
 
@@ -181,198 +141,270 @@ else:
         return isinstance(val, unicode)
 
 
-def dumps_string(val, is_text=None, is_bytes=None):
-    global dumps_list
-
-    import time
-    start = time.time()
-    if type(val) == type(bytes()):
-        is_bytes = True
-    if _is_unicode(val):
-        val = val.encode('utf8')
-        is_text = True
-        is_bytes = False
-    if (is_bytes) or not (is_text == True):
-        dumps_list.append(_encode_type_num(CBOR_BYTES, len(val)))
-        dumps_list.append(val)
-        #print("BYTES TOOK: ", (time.time() - start) * 1000)
-        return
-
-    dumps_list.append(_encode_type_num(CBOR_TEXT, len(val)))
-    dumps_list.append(val)
-    #print("STRING TOOK: ", (time.time() - start) * 1000)
-    return
+if _IS_PY3:
+    def _is_stringish(x):
+        return isinstance(x, (str, bytes))
+    def _is_intish(x):
+        return isinstance(x, int)
+else:
+    def _is_stringish(x):
+        return isinstance(x, (str, basestring, bytes, unicode))
+    def _is_intish(x):
+        return isinstance(x, (int, long))
 
 
-def dumps_memoryview(val):
-    global dumps_list
-    import time
-    start = time.time()
+class BitmapRows(object):
+    ''' pixel rows of a bitmap, which are zero padded when serialized '''
+    # NOTE: The pixels are either given as numpy array or written by a function,
+    #       which receives the target array of shape (height, width, channels).
+    #       The rows of the target array may be padded.
 
-    dumps_list.append(_encode_type_num(CBOR_BYTES, len(val)))
-    dumps_list.append(val.tobytes())
-    #print("MEMORYVIEW BYTES TOOK: ", (time.time() - start) * 1000)
-    return
+    def __init__(self, pixels, image_shape, padding):
+        self.pixels = pixels
+        self.image_shape = image_shape
+        self.padding = padding
 
+    def __len__(self):
+        return self.image_shape[0] * (self.image_shape[1] * self.image_shape[2] + self.padding)
 
+    def to_buffer(self):
+        ''' return the padded rows as a contiguous numpy array '''
+        if not self.padding and not callable(self.pixels): return np.ascontiguousarray(self.pixels)
 
-def dumps_bitmap(val, image_shape):
-    global dumps_list
+        target = np.empty((self.image_shape[0], self.image_shape[1] * self.image_shape[2] + self.padding), dtype=np.uint8)
+        self.write(target)
+        return target
 
-    import time
-    start = time.time()
+    def write_into(self, view):
+        ''' write the padded rows into the given memoryview in a single pass '''
+        self.write(np.frombuffer(view, dtype=np.uint8, count=len(self)).reshape((self.image_shape[0], -1)))
 
-    # Bitmap file header
-    BMP_ID      = b"BM"
-    SIZE_HDR    = 14
-    SIZE_DIB    = 40
-    HEIGHT      = image_shape[0]
-    WIDTH       = image_shape[1]
-    OFFSET      = SIZE_HDR+SIZE_DIB
-    # Bitmap image header
-    CHANNELS    = image_shape[2]
-    PLANES      = 1
-    BPC         = 8                 # Bits per component
-    BPP         = CHANNELS*BPC      # Bits per pixel
-    COMPRESSION = 0
-    SIZE_IMG    = WIDTH*HEIGHT*CHANNELS
-    SIZE_FIL    = OFFSET+SIZE_IMG
+    def write(self, target):
+        ''' write the padded rows into the given numpy array of shape (height, padded row size) '''
+        size_row = self.image_shape[1] * self.image_shape[2]
+        if self.padding: target[:, size_row:] = 0
 
-    head = BMP_ID + struct.pack('IHHIIIIHHIIIIII', SIZE_FIL,0,0,OFFSET,SIZE_DIB,WIDTH,HEIGHT,PLANES,BPP,COMPRESSION,0,0,0,0,0)
+        pixels = target[:, :size_row].reshape(self.image_shape)
+        if callable(self.pixels): self.pixels(pixels)
+        else: pixels[...] = self.pixels.reshape(self.image_shape)
 
-    # add header to the CBOR encoding list
-    dumps_list.append(_encode_type_num(CBOR_BYTES, len(head) + val.size))
-    dumps_list.append(head)
 
-    # add zero padding to each row, since this is required by the BMP format
-    if ((WIDTH * 3) % 4): dumps_list.append(np.pad(val.reshape((HEIGHT, WIDTH * 3)), ((0, 0), (0, 4 - (WIDTH * 3) % 4)), 'constant'))
-    else: dumps_list.append(val)
+# NOTE: This is a modification to the original CBOR:
+# - the encoder collects all serialized parts in a list and joins them in the
+#   end to save time
+# - the state is kept in an encoder instance instead of module-global
+#   variables, so that several threads can encode at the same time (each
+#   thread must use its own instance)
+class CBOREncoder(object):
+    ''' CBOR encoder with its own list of serialized parts and its own frame buffer '''
+
+    # encoded strings, which are shared by all encoders
+    # NOTE: The commands sent to Looking Glass Bridge always use the same map
+    #       keys and values (e.g., 'cmd', 'show', 'settings'), so their encoding
+    #       is cached instead of being created for every message
+    string_cache = {}
+    string_cache_size = 1024
+    string_cache_length = 64
+
+    def __init__(self, sort_keys=False):
+        self.sort_keys = sort_keys
+        self.parts = []             # serialized parts of the current message
+        self.buffer = bytearray()   # reusable buffer for encode_into()
+
+    def encode(self, ob, image_shape=None):
+        ''' serialize the object and return the message as bytes '''
+        try:
+            self.dump(ob, image_shape)
+            return b''.join([part.to_buffer() if isinstance(part, BitmapRows) else part for part in self.parts])
+        finally:
+            self.parts.clear()
+
+    def encode_into(self, ob, image_shape=None, buffer=None):
+        ''' serialize the object into the buffer and return a memoryview of the message '''
+        # NOTE: This is a modification to the original CBOR:
+        # - the pixel rows of a bitmap are copied directly into the buffer instead
+        #   of joining all parts into a new bytes object
+        # - the buffer is only enlarged, if the message does not fit into it, so
+        #   that it can be reused for all frames of the same size
+        if buffer is None: buffer = self.buffer
+
+        try:
+            self.dump(ob, image_shape)
+
+            # enlarge the buffer, if required
+            # NOTE: This fails, if a memoryview of a previous message was not released
+            size = sum(len(part) for part in self.parts)
+            if len(buffer) < size: buffer.extend(bytes(size - len(buffer)))
+
+            # copy the parts into the buffer
+            view = memoryview(buffer)[:size]
+            position = 0
+            for part in self.parts:
+                if isinstance(part, BitmapRows):
+                    part.write_into(view[position:position + len(part)])
+                else:
+                    view[position:position + len(part)] = part
+                position += len(part)
+
+            return view
+
+        finally:
+            # release the references to the serialized data
+            self.parts.clear()
+
+    def dump(self, ob, image_shape=None):
+        ''' append the serialized object to the list of parts '''
+        if ob is None:
+            self.parts.append(struct.pack('B', CBOR_NULL))
+        elif isinstance(ob, bool):
+            self.dump_bool(ob)
+        elif _is_stringish(ob):
+            self.dump_string(ob)
+        elif type(ob) == memoryview:
+            self.dump_memoryview(ob)
+        elif (type(ob) == np.ndarray or callable(ob)) and (not image_shape is None):
+            # NOTE: A function, which writes the pixels into the given array, can
+            #       be passed instead of the numpy array
+            self.dump_bitmap(ob, image_shape)
+        elif isinstance(ob, (list, tuple)):
+            self.dump_array(ob, image_shape)
+        # TODO: accept other enumerables and emit a variable length array
+        elif isinstance(ob, dict):
+            self.dump_dict(ob, image_shape)
+        elif isinstance(ob, float):
+            self.dump_float(ob)
+        elif _is_intish(ob):
+            self.dump_int(ob)
+        elif isinstance(ob, Tag):
+            self.dump_tag(ob, image_shape)
+        else:
+            raise Exception("don't know how to cbor serialize object of type %s", type(ob))
+
+    def dump_int(self, val):
+        "append bytes representing int val in CBOR"
+        if val >= 0:
+            # CBOR_UINT is 0, so I'm lazy/efficient about not OR-ing it in.
+            if val <= 23:
+                self.parts.append(struct.pack('B', val))
+                return
+            if val <= 0x0ff:
+                self.parts.append(struct.pack('BB', CBOR_UINT8_FOLLOWS, val))
+                return
+            if val <= 0x0ffff:
+                self.parts.append(struct.pack('!BH', CBOR_UINT16_FOLLOWS, val))
+                return
+            if val <= 0x0ffffffff:
+                self.parts.append(struct.pack('!BI', CBOR_UINT32_FOLLOWS, val))
+                return
+            if val <= 0x0ffffffffffffffff:
+                self.parts.append(struct.pack('!BQ', CBOR_UINT64_FOLLOWS, val))
+                return
+            outb = _dumps_bignum_to_bytearray(val)
+            self.parts.append(_CBOR_TAG_BIGNUM_BYTES + _encode_type_num(CBOR_BYTES, len(outb)) + outb)
+            return
+        val = -1 - val
+        self.parts.append(_encode_type_num(CBOR_NEGINT, val))
 
-    # print("NUMPY CONVERSION WITH SHAPE %s TOOK: %.3f" % (image_shape, (time.time() - start) * 1000))
-    return
+    def dump_float(self, val):
+        self.parts.append(struct.pack("!Bd", CBOR_FLOAT64, val))
 
+    def dump_string(self, val, is_text=None, is_bytes=None):
 
-def dumps_array(arr, sort_keys=False):
-    head = _encode_type_num(CBOR_ARRAY, len(arr))
-    parts = [dumps_list.append(dumps(x, sort_keys=sort_keys)) for x in arr]
-    return head + b''.join(parts)
+        # use the cached encoding of short strings
+        encoded = CBOREncoder.string_cache.get(val) if _is_unicode(val) else None
+        if encoded is not None:
+            self.parts.append(encoded)
+            return
 
+        original = val
+        if type(val) == type(bytes()):
+            is_bytes = True
+        if _is_unicode(val):
+            val = val.encode('utf8')
+            is_text = True
+            is_bytes = False
+        if (is_bytes) or not (is_text == True):
+            self.parts.append(_encode_type_num(CBOR_BYTES, len(val)))
+            self.parts.append(val)
+            return
 
-if _IS_PY3:
-    def dumps_dict(d, sort_keys=False, image_shape=None):
-        global dumps_list
-
-        import time
-        start = time.time()
-        head = _encode_type_num(CBOR_MAP, len(d))
-        dumps_list.append(head)
-        if sort_keys:
+        encoded = _encode_type_num(CBOR_TEXT, len(val)) + val
+        self.parts.append(encoded)
+
+        # cache the encoding of short strings
+        # NOTE: Concurrent updates are safe, since a dict item assignment is atomic
+        if len(val) <= CBOREncoder.string_cache_length and len(CBOREncoder.string_cache) < CBOREncoder.string_cache_size:
+            CBOREncoder.string_cache[original] = encoded
+
+    def dump_memoryview(self, val):
+        self.parts.append(_encode_type_num(CBOR_BYTES, len(val)))
+        self.parts.append(val.tobytes())
+
+    def dump_bitmap(self, val, image_shape):
+
+        # Bitmap file header
+        BMP_ID      = b"BM"
+        SIZE_HDR    = 14
+        SIZE_DIB    = 40
+        HEIGHT      = image_shape[0]
+        WIDTH       = image_shape[1]
+        OFFSET      = SIZE_HDR+SIZE_DIB
+        # Bitmap image header
+        CHANNELS    = image_shape[2]
+        PLANES      = 1
+        BPC         = 8                 # Bits per component
+        BPP         = CHANNELS*BPC      # Bits per pixel
+        COMPRESSION = 0
+        SIZE_ROW    = WIDTH*CHANNELS
+        PADDING     = (4 - SIZE_ROW % 4) % 4
+        SIZE_IMG    = (SIZE_ROW+PADDING)*HEIGHT
+        SIZE_FIL    = OFFSET+SIZE_IMG
+
+        head = BMP_ID + struct.pack('IHHIIIIHHIIIIII', SIZE_FIL,0,0,OFFSET,SIZE_DIB,WIDTH,HEIGHT,PLANES,BPP,COMPRESSION,0,0,0,0,0)
+
+        # add header to the CBOR encoding list
+        self.parts.append(_encode_type_num(CBOR_BYTES, len(head) + SIZE_IMG))
+        self.parts.append(head)
+
+        # add the pixel rows, which are zero padded to a multiple of 4 bytes when
+        # they are serialized, since this is required by the BMP format
+        self.parts.append(BitmapRows(val, (HEIGHT, WIDTH, CHANNELS), PADDING))
+
+    def dump_array(self, arr, image_shape=None):
+        self.parts.append(_encode_type_num(CBOR_ARRAY, len(arr)))
+        for x in arr:
+            self.dump(x, image_shape)
+
+    def dump_dict(self, d, image_shape=None):
+        self.parts.append(_encode_type_num(CBOR_MAP, len(d)))
+        if self.sort_keys:
             for k in sorted(d.keys()):
-                v = d[k]
-                dumps(k, sort_keys=sort_keys, image_shape=image_shape)
-                dumps(v, sort_keys=sort_keys, image_shape=image_shape)
+                self.dump(k, image_shape)
+                self.dump(d[k], image_shape)
         else:
             for k,v in d.items():
-                dumps(k, sort_keys=sort_keys, image_shape=image_shape)
-                dumps(v, sort_keys=sort_keys, image_shape=image_shape)
-        #print("DICT CONVERSION TOOK: ", (time.time() - start) * 1000)
-        return
-else:
-    def dumps_dict(d, sort_keys=False):
-        head = _encode_type_num(CBOR_MAP, len(d))
-        parts = [head]
-        if sort_keys:
-            for k in sorted(d.iterkeys()):
-                v = d[k]
-                parts.append(dumps(k, sort_keys=sort_keys))
-                parts.append(dumps(v, sort_keys=sort_keys))
-        else:
-            for k,v in d.iteritems():
-                parts.append(dumps(k, sort_keys=sort_keys))
-                parts.append(dumps(v, sort_keys=sort_keys))
-        return b''.join(parts)
-
-
-def dumps_bool(b):
-    global dumps_list
-
-    if b:
-        dumps_list.append(struct.pack('B', CBOR_TRUE))
-    else:
-        dumps_list.append(struct.pack('B', CBOR_FALSE))
-
-
-def dumps_tag(t, sort_keys=False):
-    return _encode_type_num(CBOR_TAG, t.tag) + dumps(t.value, sort_keys=sort_keys)
-
-
-if _IS_PY3:
-    def _is_stringish(x):
-        return isinstance(x, (str, bytes))
-    def _is_intish(x):
-        return isinstance(x, int)
-else:
-    def _is_stringish(x):
-        return isinstance(x, (str, basestring, bytes, unicode))
-    def _is_intish(x):
-        return isinstance(x, (int, long))
+                self.dump(k, image_shape)
+                self.dump(v, image_shape)
 
+    def dump_bool(self, b):
+        if b:
+            self.parts.append(struct.pack('B', CBOR_TRUE))
+        else:
+            self.parts.append(struct.pack('B', CBOR_FALSE))
 
+    def dump_tag(self, t, image_shape=None):
+        self.parts.append(_encode_type_num(CBOR_TAG, t.tag))
+        self.dump(t.value, image_shape)
 
-# this variable is used to prevent nested dumps() calls from serializing too early
-# (i.e., only the level = 0 call should serialize the dumps_list)
-level = -1
 
 def dumps(ob, sort_keys=False, image_shape=None):
-    global dumps_list, level
-    #print(type(ob))
-
-    import time
-    start = time.time()
-
-    if level == -1:
-        dumps_list.clear()
-
-    # update caller level
-    level += 1
-
-    if ob is None:
-        dumps_list.append(struct.pack('B', CBOR_NULL))
-    elif isinstance(ob, bool):
-        result = dumps_bool(ob)
-    elif _is_stringish(ob):
-        result = dumps_string(ob)
-    elif type(ob) == memoryview:
-        result = dumps_memoryview(ob)
-    elif type(ob) == np.ndarray and (not image_shape is None):
-        result = dumps_bitmap(ob, image_shape)
-    elif isinstance(ob, (list, tuple)):
-        result = dumps_array(ob, sort_keys=sort_keys)
-    # TODO: accept other enumerables and emit a variable length array
-    elif isinstance(ob, dict):
-        result = dumps_dict(ob, sort_keys=sort_keys, image_shape=image_shape)
-    elif isinstance(ob, float):
-        result = dumps_float(ob)
-    elif _is_intish(ob):
-        result = dumps_int(ob)
-    elif isinstance(ob, Tag):
-        result = dumps_tag(ob, sort_keys=sort_keys)
-    else:
-        raise Exception("don't know how to cbor serialize object of type %s", type(ob))
-
-
-    if level == 0:
-
-        # reset caller level
-        level = -1
+    ''' serialize the object and return the message as bytes '''
+    return CBOREncoder(sort_keys=sort_keys).encode(ob, image_shape=image_shape)
 
-        return b''.join(dumps_list)
 
-        #print("COMPLETE CONVERSION TOOK: ", (time.time() - start) * 1000)
-    else:
-        level -= 1
-
-        return result
+def dumps_into(ob, buffer, sort_keys=False, image_shape=None):
+    ''' serialize the object into the given bytearray and return a memoryview of the message '''
+    return CBOREncoder(sort_keys=sort_keys).encode_into(ob, image_shape=image_shape, buffer=buffer)
 
 
 # same basic signature as json.dump, but with no options (yet)
@@ -401,14 +433,13 @@ class Tag(object):
         return (self.tag == other.tag) and (self.value == other.value)
 
 
-def loads(data):
+def loads(data, zero_copy=False):
     """
     Parse CBOR bytes and return Python objects.
     """
     if data is None:
         raise ValueError("got None for buffer to decode in loads")
-    fp = StringIO(data)
-    return _loads(fp)[0]
+    return CBORDecoder(zero_copy=zero_copy).decode(data)
 
 
 def load(fp):
@@ -638,6 +669,175 @@ else:
         return out
 
 
+# NOTE: This is a modification to the original CBOR:
+# - the decoder walks the message with an offset cursor instead of reading
+#   single bytes from a file-like object
+# - the values following the initial byte are read with precompiled structs
+# - short text strings (e.g., the keys of maps) are decoded without recursion
+# - byte strings can be returned as zero-copy memoryview slices of the message
+_STRUCT_UINT16 = struct.Struct('!H')
+_STRUCT_UINT32 = struct.Struct('!I')
+_STRUCT_UINT64 = struct.Struct('!Q')
+_STRUCT_FLOAT32 = struct.Struct('!f')
+_STRUCT_FLOAT64 = struct.Struct('!d')
+
+class CBORDecoder(object):
+    ''' CBOR decoder, which reads the message with an offset cursor '''
+
+    def __init__(self, zero_copy=False):
+        self.zero_copy = zero_copy      # if True, byte strings are returned as memoryview slices of the message
+
+    def decode(self, data):
+        ''' parse the CBOR message and return the Python object '''
+
+        # text strings and numbers are read from a bytes object, which is faster
+        # than reading them from a memoryview
+        raw = data if type(data) == bytes else bytes(data)
+
+        # NOTE: If zero_copy is True, the returned slices still refer to the
+        #       message, so the message is not copied in that case
+        view = None
+        if self.zero_copy:
+            view = memoryview(data).cast('B')
+            if type(data) != bytes: raw = view
+
+        try:
+            return _decode_item(raw, view, 0, 0)[0]
+        except (IndexError, struct.error):
+            raise EOFError()
+
+
+def _decode_item(raw, view, offset, depth):
+    "return (object, offset of the next item)"
+    if depth > _MAX_DEPTH:
+        raise Exception("hit CBOR loads recursion depth limit")
+
+    tb = raw[offset]
+    offset += 1
+
+    # short text strings
+    if 0x60 <= tb <= 0x77:
+        end = offset + tb - CBOR_TEXT
+        if end > len(raw): raise EOFError()
+        return str(raw[offset:end], 'utf8'), end
+
+    # Some special cases of CBOR_7 best handled by special struct.unpack logic here
+    if tb == CBOR_FLOAT64:
+        return _STRUCT_FLOAT64.unpack_from(raw, offset)[0], offset + 8
+
+    tag = tb & CBOR_TYPE_MASK
+    aux = tb & CBOR_INFO_BITS
+
+    if tag == CBOR_7:
+        if tb == CBOR_TRUE:
+            return True, offset
+        if tb == CBOR_FALSE:
+            return False, offset
+        if tb == CBOR_NULL or tb == CBOR_UNDEFINED:
+            return None, offset
+        if tb == CBOR_FLOAT32:
+            return _STRUCT_FLOAT32.unpack_from(raw, offset)[0], offset + 4
+        if tb == CBOR_FLOAT16:
+            hibyte, lowbyte = raw[offset], raw[offset + 1]
+            exp = (hibyte >> 2) & 0x1F
+            mant = ((hibyte & 0x03) << 8) | lowbyte
+            if exp == 0:
+                val = mant * (2.0 ** -24)
+            elif exp == 31:
+                if mant == 0:
+                    val = float('Inf')
+                else:
+                    val = float('NaN')
+            else:
+                val = (mant + 1024.0) * (2 ** (exp - 25))
+            if hibyte & 0x80:
+                val = -1.0 * val
+            return val, offset + 2
+        raise ValueError("unknown cbor tag 7 byte: {:02x}".format(tb))
+
+    # read the value following the initial byte
+    if aux >= CBOR_UINT8_FOLLOWS:
+        if aux == CBOR_UINT8_FOLLOWS:
+            aux = raw[offset]
+            offset += 1
+        elif aux == CBOR_UINT16_FOLLOWS:
+            aux = _STRUCT_UINT16.unpack_from(raw, offset)[0]
+            offset += 2
+        elif aux == CBOR_UINT32_FOLLOWS:
+            aux = _STRUCT_UINT32.unpack_from(raw, offset)[0]
+            offset += 4
+        elif aux == CBOR_UINT64_FOLLOWS:
+            aux = _STRUCT_UINT64.unpack_from(raw, offset)[0]
+            offset += 8
+        elif aux == CBOR_VAR_FOLLOWS:
+            aux = None
+        else:
+            raise ValueError("bogus tag {0:02x}".format(tb))
+
+    if tag == CBOR_MAP:
+        ob = {}
+        if aux is None:
+            while raw[offset] != CBOR_BREAK:
+                key, offset = _decode_item(raw, view, offset, depth + 1)
+                ob[key], offset = _decode_item(raw, view, offset, depth + 1)
+            return ob, offset + 1
+        for i in range(aux):
+            # decode short text keys without recursion
+            tb = raw[offset]
+            if 0x60 <= tb <= 0x77:
+                end = offset + 1 + tb - CBOR_TEXT
+                if end > len(raw): raise EOFError()
+                key = str(raw[offset + 1:end], 'utf8')
+                offset = end
+            else:
+                key, offset = _decode_item(raw, view, offset, depth + 1)
+            ob[key], offset = _decode_item(raw, view, offset, depth + 1)
+        return ob, offset
+    elif tag == CBOR_UINT:
+        return aux, offset
+    elif tag == CBOR_TEXT:
+        ob, offset = _decode_bytes(raw, None, offset, aux, CBOR_TEXT)
+        return str(ob, 'utf8'), offset
+    elif tag == CBOR_ARRAY:
+        ob = []
+        if aux is None:
+            while raw[offset] != CBOR_BREAK:
+                subob, offset = _decode_item(raw, view, offset, depth + 1)
+                ob.append(subob)
+            return ob, offset + 1
+        for i in range(aux):
+            subob, offset = _decode_item(raw, view, offset, depth + 1)
+            ob.append(subob)
+        return ob, offset
+    elif tag == CBOR_NEGINT:
+        return -1 - aux, offset
+    elif tag == CBOR_BYTES:
+        ob, offset = _decode_bytes(raw, view, offset, aux, CBOR_BYTES)
+        return (ob.tobytes() if type(ob) == memoryview and view is None else ob), offset
+    elif tag == CBOR_TAG:
+        ob, offset = _decode_item(raw, None, offset, depth + 1)
+        # attempt to interpet the tag and the value into a Python object.
+        return tagify(ob, aux), offset
+
+
+def _decode_bytes(raw, view, offset, aux, btag):
+    "return (byte string, offset of the next item)"
+    # simple case
+    if aux is not None:
+        end = offset + aux
+        if end > len(raw): raise EOFError()
+        return (view if view is not None else raw)[offset:end], end
+
+    # read chunks of bytes
+    chunklist = []
+    while raw[offset] != CBOR_BREAK:
+        tb = raw[offset]
+        assert tb & CBOR_TYPE_MASK == btag, 'variable length value contains unexpected component'
+        chunk, offset = _decode_item(raw, None, offset, 0)
+        chunklist.append(chunk.encode('utf8') if btag == CBOR_TEXT else chunk)
+    return b''.join(chunklist), offset + 1
+
+
 def tagify(ob, aux):
     # TODO: make this extensible?
     # cbor.register_tag_handler(tagnumber, tag_handler)
@@ -19,6 +19,9 @@
 # EXTERNAL PACKAGE DEPENDENCIES
 ###################################################
 from enum import Enum
+import io, threading
+import numpy as np
+import cv2
 
 # INTERNAL PACKAGE DEPENDENCIES
 ###################################################
@@ -74,7 +77,7 @@ class LightfieldImage(object):
         raise TypeError("'%s' is no valid lightfield image type." % type)
 
     @classmethod
-    def open(cls, filepath, type, **kwargs):
+    def open(cls, filepath, type, lazy=False, **kwargs):
         ''' open a lightfield image object file of specified format from disk '''
 
         # try to find the class for the specified format, if it exists
@@ -85,7 +88,7 @@ class LightfieldImage(object):
             lightfield = LightfieldImageFormat[0](**kwargs)
 
             # load the image
-            lightfield.load(filepath)
+            lightfield.load(filepath, lazy=lazy)
 
             # return the lightfield image instance of the specified format
             return lightfield
@@ -112,9 +115,33 @@ class LightfieldImage(object):
         raise TypeError("'%s' is no valid lightfield image type." % type)
 
     @classmethod
-    def convert(self, lightfield, target_format):
+    def convert(cls, lightfield, target_format):
         ''' convert a lightfield image object to another type '''
-        pass
+
+        # if a decoder format is given, the lightfield image is converted as a whole
+        if LightfieldImage.decoderformat.is_valid(target_format):
+
+            # return the decoded lightfield image
+            return lightfield.decode(target_format)
+
+        # if a view format is given, the views are converted into a new
+        # lightfield image of the same type
+        elif LightfieldView.formats.is_valid(target_format):
+
+            # create the new lightfield image with the same metadata
+            converted = type(lightfield)()
+            converted.metadata = dict(lightfield.metadata)
+            converted.colormode = lightfield.colormode
+            converted.colorchannels = lightfield.colorchannels
+
+            # convert the views
+            # NOTE: Views share their buffer with the original views, if possible
+            converted.set_views([v['view'].convert(target_format) for v in lightfield.views], target_format)
+
+            # return the converted lightfield image
+            return converted
+
+        raise TypeError("'%s' is no valid lightfield image or view format." % target_format)
 
 
 
@@ -127,6 +154,7 @@ class LightfieldView(object):
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     __format = None                 # format of this LightfieldView instance
     __data = None                   # image data of this view in the specified format
+    __loader = None                 # callable which returns the image data of a lazily loaded view
 
 
 
@@ -156,11 +184,55 @@ class LightfieldView(object):
         ''' verify if a given object is an instance of this class '''
         return isinstance(object, cls)
 
+    @classmethod
+    def convert_data(cls, data, source_format, target_format):
+        ''' convert image data between the view formats '''
+        # NOTE: Pillow only maps the buffer of C-contiguous RGBA arrays. RGB
+        #       arrays and all other conversions copy the data, so changes of
+        #       the source data must not be expected in the converted data.
+        if source_format == target_format: return data
+
+        # convert the data to a numpy array
+        if source_format == LightfieldView.formats.pil_image:
+            array = np.asarray(data)
+
+        elif source_format == LightfieldView.formats.bytesio:
+            array = cv2.imdecode(np.frombuffer(data.getbuffer(), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            if array is None: raise TypeError("The BytesIO object does not contain a supported image.")
+
+            # convert OpenCV's BGR(A) to RGB(A)
+            if array.ndim == 2:         array = cv2.cvtColor(array, cv2.COLOR_GRAY2RGB)
+            elif array.shape[2] == 3:   array = cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
+            else:                       array = cv2.cvtColor(array, cv2.COLOR_BGRA2RGBA)
+
+        else:
+            array = data
+
+        # convert the numpy array to the target format
+        if target_format == LightfieldView.formats.pil_image:
+            from PIL import Image
+
+            mode = 'RGBA' if array.shape[2] == 4 else 'RGB'
+            if not array.flags['C_CONTIGUOUS']: array = np.ascontiguousarray(array)
+
+            # Pillow maps the buffer of RGBA arrays and copies RGB arrays
+            return Image.frombuffer(mode, (array.shape[1], array.shape[0]), array, 'raw', mode, 0, 1)
+
+        elif target_format == LightfieldView.formats.bytesio:
+
+            # encode as PNG (OpenCV expects BGR(A))
+            success, buffer = cv2.imencode('.png', cv2.cvtColor(array, cv2.COLOR_RGBA2BGRA if array.shape[2] == 4 else cv2.COLOR_RGB2BGR))
+            if not success: raise TypeError("The image data could not be encoded.")
+
+            return io.BytesIO(buffer)
+
+        return array
+
 
 
     # INSTANCE METHODS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-    def __init__(self, data, format):
+    def __init__(self, data, format, loader=None):
         ''' initialize the view and pass data in '''
         # if a valid format was passed
         if LightfieldView.formats.is_valid(format):
@@ -169,12 +241,32 @@ class LightfieldView(object):
             self.data = data
             self.format = format
 
+            # if the view shall be loaded lazily, the loader is called each time
+            # the data is accessed until data is assigned to the view
+            self.loader = loader
+
         else:
 
             raise TypeError("'%s' is no valid view format." % format)
 
 
 
+    def convert(self, format):
+        ''' return a LightfieldView with the image data of this view in the given format '''
+
+        # if a valid format was passed
+        if LightfieldView.formats.is_valid(format):
+
+            # nothing to convert
+            if format == self.format: return self
+
+            # create a new view with the converted data
+            return LightfieldView(LightfieldView.convert_data(self.data, self.format, format), format)
+
+        raise TypeError("'%s' is no valid view format." % format)
+
+
+
     # CLASS PROPERTIES
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     @property
@@ -185,13 +277,26 @@ class LightfieldView(object):
     def format(self, value):
         self.__format = value
 
+    # NOTE: If the view belongs to a lightfield image and its data is
+    #       modified in place, the image's update_view() must be called.
+    #       Otherwise cached outputs of the image are not updated.
     @property
     def data(self):
+        if self.__loader: return self.__loader()
         return self.__data
 
     @data.setter
     def data(self, value):
         self.__data = value
+        self.__loader = None
+
+    @property
+    def loader(self):
+        return self.__loader
+
+    @loader.setter
+    def loader(self, value):
+        self.__loader = value
 
 
 class BaseLightfieldImageFormat(object):
@@ -199,6 +304,8 @@ class BaseLightfieldImageFormat(object):
     # PRIVATE MEMBERS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     __views = None              # list of LightfieldView objects belonging to this lightfield in the format {view: LightfieldView instance, updated: Boolean}
+    __views_lock = None         # lock for the updated status of the views
+    __views_revision = 0        # counter which is incremented on each change of the views (used to invalidate cached outputs)
     __metadata = None           # metadata of the lightfield format
     __colormode = None          # colormode of the image data
     __colorchannels = None      # number of color channels in the image data
@@ -239,6 +346,7 @@ class BaseLightfieldImageFormat(object):
 
                     # store the format
                     self.views_format = format
+                    self.views_revision += 1
 
                     # return the list of views
                     return self.views
@@ -276,6 +384,7 @@ class BaseLightfieldImageFormat(object):
 
             # store the format
             self.views_format = view.format
+            self.views_revision += 1
 
             # return the list of views
             return self.views
@@ -308,6 +417,7 @@ class BaseLightfieldImageFormat(object):
 
             # store the format
             self.views_format = view.format
+            self.views_revision += 1
 
             # return the list of views
             return self.views
@@ -317,6 +427,7 @@ class BaseLightfieldImageFormat(object):
     def remove_view(self, index):
         ''' remove a LightfieldView object from the list of views '''
         self.views.pop(index)
+        self.views_revision += 1
 
         # return the list of views
         return self.views
@@ -330,16 +441,41 @@ class BaseLightfieldImageFormat(object):
 
     def get_view_data(self, updated=None, reset_updated=False):
         ''' return the image data of all views as a list of the views image data '''
-        if updated != None: views = [v['view'].data for v in self.views if v['updated'] == updated]
-        else:               views = [v['view'].data for v in self.views]
+        # NOTE: Reading and resetting the updated status is done under a lock,
+        #       so that no update of another thread gets lost in between
+        with self.views_lock:
+            if updated != None: views = [v['view'].data for v in self.views if v['updated'] == updated]
+            else:               views = [v['view'].data for v in self.views]
 
-        # if the updated status shall be reset, do that
-        if reset_updated == True:
-            for v in self.views: v['updated'] = False
+            # if the updated status shall be reset, do that
+            if reset_updated == True:
+                for v in self.views: v['updated'] = False
 
         # return the list of view data
         return views
 
+    def get_updated_views(self, reset_updated=True):
+        ''' return the indices of all views that were updated and reset their status '''
+        with self.views_lock:
+            indices = [i for i, v in enumerate(self.views) if v['updated'] == True]
+
+            # if the updated status shall be reset, do that
+            if reset_updated == True:
+                for i in indices: self.views[i]['updated'] = False
+
+        # return the list of view indices
+        return indices
+
+    def update_view(self, index, data=None):
+        ''' mark the view at the given index as updated and optionally replace its image data '''
+        with self.views_lock:
+            if data is not None: self.views[index]['view'].data = data
+            self.views[index]['updated'] = True
+            self.views_revision += 1
+
+        # return the list of views
+        return self.views
+
 
 
 
@@ -354,12 +490,14 @@ class BaseLightfieldImageFormat(object):
 
         # initialize instance properties
         self.views = []
+        self.views_lock = threading.Lock()
+        self.views_revision = 0
         self.metadata = {}
         self.colormode = 'RGBA'
         self.colorchannels = 4
 
-    def load(self, filepath):
-        ''' load the lightfield from a file '''
+    def load(self, filepath, lazy=False):
+        ''' load the lightfield from a file (lazy: load the view data on first access) '''
         pass
 
     def from_buffer(self, data):
@@ -392,6 +530,22 @@ class BaseLightfieldImageFormat(object):
     def views(self, value):
         self.__views = value
 
+    @property
+    def views_lock(self):
+        return self.__views_lock
+
+    @views_lock.setter
+    def views_lock(self, value):
+        self.__views_lock = value
+
+    @property
+    def views_revision(self):
+        return self.__views_revision
+
+    @views_revision.setter
+    def views_revision(self, value):
+        self.__views_revision = value
+
     @property
     def views_format(self):
         return self.__views_format
@@ -19,3 +19,6 @@
 from pylightio.lookingglass.devices import *
 from pylightio.lookingglass.services import *
 from pylightio.lookingglass.lightfields import *
+from pylightio.lookingglass.interleaver import *
+from pylightio.lookingglass.emulator import *
+from pylightio.lookingglass.sinks import *
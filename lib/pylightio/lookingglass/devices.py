@@ -57,7 +57,7 @@ class LookingGlassDeviceMixin(object):
         # call the initialization procedure of the BaseClass
         super().__init__(service, configuration)
 
-    def display(self, lightfield, flip_views=False, aspect=None, invert=None, custom_decoder=None):
+    def display(self, lightfield, flip_views=False, aspect=None, invert=None, custom_decoder=None, cache_key=None):
         ''' display a given lightfield image object on the device '''
         # NOTE: This method should only do validity checks.
         #       Then call service methods to display the lightfield on the device.
@@ -75,7 +75,7 @@ class LookingGlassDeviceMixin(object):
                 logger.info("Requesting '%s' to display the lightfield on '%s' ..." % (self.service, self))
 
                 # request the service to display the lightfield on the device
-                if self.service.display(self, lightfield, flip_views=flip_views, aspect=aspect, invert=invert, custom_decoder=custom_decoder):
+                if self.service.display(self, lightfield, flip_views=flip_views, aspect=aspect, invert=invert, custom_decoder=custom_decoder, cache_key=cache_key):
 
                     # if that is successful, remember the lightfield for this device
                     self.lightfield = lightfield
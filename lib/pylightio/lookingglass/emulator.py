@@ -0,0 +1,369 @@
+# ###################### BEGIN LICENSE BLOCK ###########################
+#
+# Copyright © 2021 Christian Stolze
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# ####################### END LICENSE BLOCK ############################
+
+# EXTERNAL PACKAGE DEPENDENCIES
+###################################################
+import os, copy, json, threading, collections, itertools
+import pynng, cv2
+import numpy as np
+
+# debugging
+import time
+
+# INTERNAL PACKAGE DEPENDENCIES
+###################################################
+from pylightio.managers.devices import BaseDeviceType
+from pylightio.lookingglass.devices import LookingGlassDeviceMixin
+from pylightio.lookingglass.services import LookingGlassBridge
+from pylightio.external import cbor
+
+# PREPARE LOGGING
+###################################################
+import logging
+
+# get the library logger
+logger = logging.getLogger('pyLightIO')
+
+
+
+# LOOKING GLASS BRIDGE EMULATOR
+###################################################
+# the following class is a stand-in for the Looking Glass Bridge app. It listens
+# on a pynng Rep0 socket, answers the CBOR commands of the LookingGlassBridge
+# service with the emulated configurations of the device types and records the
+# received quilts. That way the display pipeline can be tested and benchmarked
+# without a Looking Glass. By default, it listens on a private address, which
+# must be passed to the LookingGlassBridge service, so that it neither takes
+# over the address of Looking Glass Bridge nor collides with it.
+class LookingGlassBridgeEmulator(object):
+
+    # PRIVATE MEMBERS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    __address = None            # address the emulator listens on
+    __socket = None             # NNG Rep0 socket
+    __workers = None            # threads, which answer the requests (one NNG context each)
+    __devices = None            # configurations of the emulated devices
+    __frames = None             # the recorded quilts and commands (oldest first)
+    __cache = None              # the cached quilts in the format {name: {'device': int, 'settings': dict, 'format': str, 'size': int}}
+    __lock = None               # condition, which protects the recorded frames and the cache
+    __instances = itertools.count() # counter for the default addresses of the emulators of this process
+
+
+    # DEFINE PUBLIC CLASS ATTRIBUTES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # calibration values, which are not part of the emulated configurations of
+    # the device types, but are required to display a quilt
+    default_calibration = {'pitch': 49.8, 'slope': -5.4, 'center': 0.0, 'fringe': 0.0, 'flipSubp': 0.0, 'verticalAngle': 0.0}
+
+
+    # INSTANCE METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __init__(self, address = None, devices = None, version = "2.0.0", workers = 4, latency = 0.0, acknowledge = True, decode_quilts = False, max_frames = 256):
+        ''' create the emulator for the given device types or configurations (by default one device of each type) '''
+        ''' if no address is given, a private address is used, which can be obtained from the address property '''
+
+        if address is None: address = 'ipc:///tmp/pylightio-emulator-%i-%i.ipc' % (os.getpid(), next(LookingGlassBridgeEmulator.__instances))
+        self.__address = address
+        self.version = version
+        self.latency = latency
+        self.acknowledge = acknowledge
+        self.decode_quilts = decode_quilts
+        self.workers = workers
+
+        self.__frames = collections.deque(maxlen=max_frames)
+        self.__cache = {}
+        self.__lock = threading.Condition()
+
+        # create the configurations of the emulated devices
+        if devices is None: devices = [DeviceType for DeviceType in BaseDeviceType.__subclasses__() if issubclass(DeviceType, LookingGlassDeviceMixin) and DeviceType.emulated_configuration]
+        self.__devices = []
+        for index, device in enumerate(devices):
+
+            configuration = copy.deepcopy(device if isinstance(device, dict) else device.emulated_configuration)
+
+            # the devices are numbered like the devices connected to Looking Glass Bridge
+            configuration['index'] = index
+            configuration['calibration'] = dict(self.default_calibration, **configuration['calibration'])
+            if [d for d in self.__devices if d['calibration']['serial'] == configuration['calibration']['serial']]:
+                configuration['calibration']['serial'] = "%s-%i" % (configuration['calibration']['serial'], index)
+
+            self.__devices.append(configuration)
+
+    def start(self):
+        ''' start listening for requests '''
+
+        if self.__socket is None:
+
+            self.__socket = pynng.Rep0(listen=self.__address)
+            self.__workers = [threading.Thread(target=self.__serve, args=(self.__socket.new_context(),), name='pyLightIO-emulator', daemon=True) for i in range(max(self.workers, 1))]
+            for worker in self.__workers: worker.start()
+
+            logger.info("Started Looking Glass Bridge emulator on '%s' with %i devices." % (self.__address, len(self.__devices)))
+
+        return self
+
+    def stop(self):
+        ''' stop listening for requests '''
+
+        if self.__socket is not None:
+
+            # closing the socket cancels the requests the workers wait for
+            self.__socket.close()
+            for worker in self.__workers: worker.join()
+
+            self.__socket, self.__workers = None, None
+
+            logger.info("Stopped Looking Glass Bridge emulator on '%s'." % self.__address)
+
+    def wait_for_frames(self, count, timeout = None):
+        ''' wait until the given number of frames was recorded and return True if that happened before the timeout (in s) '''
+        with self.__lock:
+            return self.__lock.wait_for(lambda: len(self.__frames) >= count, timeout)
+
+    def clear_frames(self):
+        ''' forget the recorded frames '''
+        with self.__lock:
+            self.__frames.clear()
+
+    def throughput(self, command = 'show'):
+        ''' return the number of frames per second and bytes per second of the recorded frames with the given command '''
+
+        with self.__lock:
+            frames = [frame for frame in self.__frames if frame['command'] == command]
+
+        # at least two frames are required to measure the time in between
+        if len(frames) < 2: return 0.0, 0.0
+
+        duration = frames[-1]['received'] - frames[0]['received']
+        if duration <= 0: return 0.0, 0.0
+
+        return (len(frames) - 1) / duration, sum(frame['size'] for frame in frames[1:]) / duration
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __del__(self):
+        ''' stop listening, if the emulator is deleted '''
+        self.stop()
+
+
+    # PRIVATE INSTANCE METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __serve(self, context):
+        ''' answer the requests received with the given NNG context until the socket is closed '''
+
+        while True:
+
+            try:
+                message = context.recv()
+            except pynng.exceptions.Closed:
+                break
+
+            received = time.time()
+
+            # decode the message and handle the command
+            try:
+                request = cbor.loads(message)
+                response, frame = self.__handle(request['cmd'], request.get('bin'))
+            except Exception as e:
+                logger.warning("Looking Glass Bridge emulator received an invalid message: %s" % e)
+                response, frame = {'error': LookingGlassBridge.service_error.ERR_BADCBOR.value}, None
+
+            # simulate the time Looking Glass Bridge needs to show a quilt
+            if frame is not None and frame['command'] == 'show' and self.latency: time.sleep(self.latency)
+
+            # record the frame
+            if frame is not None:
+                frame.update({'received': received, 'length': len(message), 'error': response['error']})
+                with self.__lock:
+                    self.__frames.append(frame)
+                    self.__lock.notify_all()
+
+            # older versions of Looking Glass Bridge do not answer SHOW commands
+            if frame is not None and frame['command'] == 'show' and not self.acknowledge: continue
+
+            try:
+                context.send(cbor.dumps(response))
+            except pynng.exceptions.Closed:
+                break
+
+        # NOTE: The context must be closed before it is garbage collected,
+        #       since the socket was closed already
+        try:
+            context.close()
+        except pynng.exceptions.Closed:
+            pass
+
+    def __handle(self, command, bindata):
+        ''' return the response to the given command and the recorded frame (or None) '''
+
+        # register the client
+        if 'init' in command:
+            return {'error': LookingGlassBridge.service_error.ERR_NOERROR.value, 'version': self.version}, None
+
+        # return the calibrations of the devices
+        elif 'info' in command:
+            return {'error': LookingGlassBridge.service_error.ERR_NOERROR.value, 'version': self.version, 'devices': [self.__get_device_info(device) for device in self.__devices]}, None
+
+        # show a quilt
+        elif 'show' in command:
+            return self.__show(command['show'], bindata)
+
+        # cache a quilt
+        elif 'cache' in command:
+            return self.__cache_quilt(command['cache'], bindata)
+
+        # hide the quilt or show the logo quilt
+        elif 'hide' in command or 'wipe' in command:
+            name = 'hide' if 'hide' in command else 'wipe'
+            target = command[name].get('targetDisplay', command.get('targetDisplay'))
+            return {'error': self.__check_device(target)}, {'command': name, 'device': target, 'format': None, 'size': 0}
+
+        return {'error': LookingGlassBridge.service_error.ERR_BADCOMMAND.value}, None
+
+    def __show(self, show, bindata):
+        ''' handle the SHOW command '''
+
+        target = show.get('targetDisplay')
+        frame = {'command': 'show', 'device': target, 'source': show.get('source'), 'settings': show.get('quilt', {}).get('settings'), 'format': None, 'size': 0}
+
+        # check the device
+        error = self.__check_device(target)
+        if error: return {'error': error}, frame
+
+        # quilt from the binary data of the message
+        if show.get('source') == 'bindata':
+            frame.update(self.__read_quilt(bindata))
+            if frame['format'] is None: return {'error': LookingGlassBridge.service_error.ERR_NOIMAGE.value}, frame
+
+        # quilt from the cache
+        elif show.get('source') == 'cache':
+            frame['name'] = show.get('quilt', {}).get('name')
+            with self.__lock:
+                if not frame['name'] in self.__cache: return {'error': LookingGlassBridge.service_error.ERR_NOTINCACHE.value}, frame
+                frame['format'], frame['size'] = self.__cache[frame['name']]['format'], self.__cache[frame['name']]['size']
+
+        # otherwise the demo quilt is shown
+        else:
+            frame['source'] = 'demo'
+
+        return {'error': LookingGlassBridge.service_error.ERR_NOERROR.value}, frame
+
+    def __cache_quilt(self, cache, bindata):
+        ''' handle the CACHE command '''
+
+        target = cache.get('targetDisplay')
+        frame = {'command': 'cache', 'device': target, 'name': cache.get('quilt', {}).get('name'), 'settings': cache.get('quilt', {}).get('settings'), 'format': None, 'size': 0}
+
+        # check the device and the image
+        error = self.__check_device(target)
+        if error: return {'error': error}, frame
+
+        frame.update(self.__read_quilt(bindata))
+        if frame['format'] is None: return {'error': LookingGlassBridge.service_error.ERR_NOIMAGE.value}, frame
+
+        # remember the quilt
+        with self.__lock:
+            self.__cache[frame['name']] = {'device': target, 'settings': frame['settings'], 'format': frame['format'], 'size': frame['size']}
+
+        return {'error': LookingGlassBridge.service_error.ERR_NOERROR.value}, frame
+
+    def __check_device(self, target):
+        ''' return the error code for the given device index '''
+        if target is None or any(device['index'] == target for device in self.__devices): return LookingGlassBridge.service_error.ERR_NOERROR.value
+        return LookingGlassBridge.service_error.ERR_LKGNOTFOUND.value
+
+    def __read_quilt(self, bindata):
+        ''' return the format and size of the given image data (and the decoded image, if required) '''
+
+        data = bytes(bindata) if bindata else b''
+
+        # detect the image format from the file signature
+        format = None
+        if data[:2] == b'BM': format = 'bmp'
+        elif data[:8] == b'\x89PNG\r\n\x1a\n': format = 'png'
+        elif data[:3] == b'\xff\xd8\xff': format = 'jpeg'
+
+        quilt = {'format': format, 'size': len(data)}
+
+        # decode the image
+        if format and self.decode_quilts:
+            quilt['image'] = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            if quilt['image'] is None: quilt['format'] = None
+
+        return quilt
+
+    @staticmethod
+    def __get_device_info(configuration):
+        ''' return the device in the format of the INFO response of Looking Glass Bridge '''
+
+        # NOTE: Looking Glass Bridge sends the calibration values as value
+        #       objects and the default quilt as JSON string
+        device = copy.deepcopy(configuration)
+        device['calibration'] = {key: {'value': value} if isinstance(value, (int, float)) and not isinstance(value, bool) else value for key, value in device['calibration'].items()}
+        device['defaultQuilt'] = json.dumps(device['defaultQuilt'])
+
+        return device
+
+
+    # CLASS PROPERTIES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @property
+    def address(self):
+        return self.__address
+
+    @address.setter
+    def address(self, value):
+        pass
+
+    @property
+    def devices(self):
+        return copy.deepcopy(self.__devices)
+
+    @devices.setter
+    def devices(self, value):
+        pass
+
+    @property
+    def frames(self):
+        with self.__lock:
+            return list(self.__frames)
+
+    @frames.setter
+    def frames(self, value):
+        pass
+
+    @property
+    def cache(self):
+        with self.__lock:
+            return dict(self.__cache)
+
+    @cache.setter
+    def cache(self, value):
+        pass
+
+    @property
+    def running(self):
+        return self.__socket is not None
+
+    @running.setter
+    def running(self, value):
+        pass
@@ -0,0 +1,286 @@
+# ###################### BEGIN LICENSE BLOCK ###########################
+#
+# Copyright © 2021 Christian Stolze
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# ####################### END LICENSE BLOCK ############################
+
+# EXTERNAL PACKAGE DEPENDENCIES
+###################################################
+import os, re, json, hashlib
+import numpy as np
+
+# debugging
+import time
+
+# INTERNAL PACKAGE DEPENDENCIES
+###################################################
+from pylightio.formats import *
+from pylightio.lookingglass.lightfields import LookingGlassQuilt
+
+# PREPARE LOGGING
+###################################################
+import logging
+
+# get the library logger
+logger = logging.getLogger('pyLightIO')
+
+
+
+# LENTICULAR INTERLEAVER FOR LOOKING GLASS DEVICES
+###################################################
+# the following class converts a LookingGlassQuilt into the native image of a
+# Looking Glass device, i.e., the image with the subpixel-interleaved views that
+# is shown on the LCD panel behind the lenticular lens. It implements the
+# lenticular shader of Looking Glass Bridge on the CPU.
+class LookingGlassInterleaver(object):
+
+    # PRIVATE MEMBERS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    __calibration = None        # calibration of the device incl. the derived values
+    __gather_maps = None        # gather index for each quilt layout in the format {(rows, columns, view_height, view_width, colorchannels, flip_views): numpy array}
+    __calibration_hash = None   # hash of the calibration values, which identifies the gather indices on disk
+
+
+    # DEFINE PUBLIC CLASS ATTRIBUTES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # calibration values required for the interleaving
+    required_calibration = ['screenW', 'screenH', 'pitch', 'tilt', 'center', 'subp', 'ri', 'bi', 'invView']
+
+    # number of panel rows processed at once when the gather index is created
+    # (limits the memory used by the float arrays of the calculation)
+    chunk_rows = 256
+
+    # directory in which the gather indices are cached across sessions
+    # (if None, the gather indices are only kept in memory)
+    cache_path = None
+
+
+    # CLASS METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @classmethod
+    def from_device(cls, device):
+        ''' create an interleaver for the calibration of the given device '''
+        return cls(device.calibration)
+
+
+    # INSTANCE METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __init__(self, calibration):
+        ''' create the interleaver for the given device calibration '''
+
+        # if all required values are in the calibration
+        # NOTE: The derived values are calculated by the service when the
+        #       calibration is requested from the device
+        missing = [key for key in LookingGlassInterleaver.required_calibration if not key in calibration]
+        if not missing:
+
+            # store a copy of the calibration
+            self.calibration = dict(calibration)
+            self.__gather_maps = {}
+
+            # hash all calibration values, so that cached gather indices are
+            # invalidated if anything in the calibration changes
+            self.__calibration_hash = hashlib.sha1(json.dumps(self.calibration, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+            return
+
+        raise ValueError("The calibration is missing the following values: %s" % missing)
+
+    def interleave(self, lightfield, flip_views=False, out=None):
+        ''' return the native image of the device for the given LookingGlassQuilt '''
+
+        # if the lightfield is a LookingGlassQuilt
+        if type(lightfield) == LookingGlassQuilt:
+
+            start = time.time()
+
+            # get the view stack of the quilt
+            quilt_np = lightfield.decode(LightfieldImage.decoderformat.numpyarray)
+
+            # get the gather index for the layout of this quilt
+            gather_map = self.get_gather_map(lightfield.metadata['rows'], lightfield.metadata['columns'], lightfield.metadata['view_height'], lightfield.metadata['view_width'], lightfield.colorchannels, flip_views)
+
+            # gather the subpixels from the quilt
+            # NOTE: mode='clip' prevents the bound check and the buffering of
+            #       the output array
+            native = np.take(quilt_np.reshape(-1), gather_map, out=out, mode='clip')
+
+            logger.debug(" [#] Interleaved quilt of shape %s to native image of shape %s in %.3f ms." % (quilt_np.shape, native.shape, (time.time() - start) * 1000))
+
+            return native
+
+        raise TypeError("The lightfield image of type '%s' can not be interleaved. Only '%s' is supported." % (type(lightfield), LookingGlassQuilt))
+
+    def get_gather_map(self, rows, columns, view_height, view_width, colorchannels, flip_views=False):
+        ''' return the gather index for the given quilt layout and create it, if required '''
+
+        key = (rows, columns, view_height, view_width, colorchannels, flip_views)
+        if not key in self.__gather_maps:
+
+            # try to load the gather index from the cache on disk
+            self.__gather_maps[key] = self.__load_gather_map(key)
+            if self.__gather_maps[key] is None:
+
+                start = time.time()
+                self.__gather_maps[key] = self.create_gather_map(*key)
+
+                logger.info("Created gather index of shape %s for quilt layout %s in %.3f ms." % (self.__gather_maps[key].shape, key, (time.time() - start) * 1000))
+
+                # store the gather index in the cache on disk
+                self.__save_gather_map(key, self.__gather_maps[key])
+
+        return self.__gather_maps[key]
+
+    def create_gather_map(self, rows, columns, view_height, view_width, colorchannels, flip_views=False):
+        ''' calculate the index of the quilt subpixel for each subpixel of the native image '''
+        # NOTE: The index refers to the flattened view stack of a LookingGlassQuilt,
+        #       which has the shape (rows, view_height, columns, view_width, colorchannels)
+        #       and starts with the bottom row of views. The native image has the
+        #       shape (screenH, screenW, 3) and starts with the top row of pixels.
+
+        width, height = int(self.calibration['screenW']), int(self.calibration['screenH'])
+        total_views = rows * columns
+
+        # use 32 bit integers, if the view stack is small enough
+        dtype = np.int32 if rows * view_height * columns * view_width * colorchannels < 2**31 else np.int64
+        gather_map = np.empty((height, width, 3), dtype=dtype)
+
+        # texture coordinates of the pixel centers (x from left to right)
+        u = (np.arange(width, dtype=np.float64) + 0.5) / width
+
+        # column of the pixel within a view (the same for all views)
+        view_x = np.minimum((u * view_width).astype(dtype), view_width - 1)
+
+        # the red and blue subpixel are sampled at the subpixel positions given by the calibration
+        # NOTE: The green subpixel is always sampled at the center subpixel position
+        subpixels = [(self.calibration['ri'], 0), (1, 1), (self.calibration['bi'], 2)]
+
+        # process the panel in chunks of rows
+        for first in range(0, height, LookingGlassInterleaver.chunk_rows):
+            last = min(first + LookingGlassInterleaver.chunk_rows, height)
+
+            # texture coordinates of the pixel centers (y from bottom to top)
+            v = (height - np.arange(first, last, dtype=np.float64) - 0.5) / height
+
+            # row of the pixel within a view
+            view_y = np.minimum((v * view_height).astype(dtype), view_height - 1)
+            if flip_views: view_y = view_height - 1 - view_y
+
+            for channel, (subpixel, component) in enumerate(subpixels):
+
+                # position on the lenticular lens, which determines the view
+                z = (u[np.newaxis, :] + subpixel * self.calibration['subp'] + v[:, np.newaxis] * self.calibration['tilt']) * self.calibration['pitch'] - self.calibration['center']
+                z = np.mod(z, 1.0)
+                if self.calibration['invView']: z = 1.0 - z
+
+                # view index and its position in the view stack
+                view = np.minimum((z * total_views).astype(dtype), total_views - 1)
+                view_row, view_column = np.divmod(view, columns)
+
+                # flat index of the subpixel in the view stack
+                gather_map[first:last, :, channel] = (((view_row * view_height + view_y[:, np.newaxis]) * columns + view_column) * view_width + view_x[np.newaxis, :]) * colorchannels + component
+
+        return gather_map
+
+    def clear(self):
+        ''' free all gather indices '''
+        self.__gather_maps.clear()
+
+
+    # PRIVATE INSTANCE METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __get_cache_prefix(self):
+        ''' return the file name prefix of all cached gather indices of this device '''
+        return re.sub(r'[^A-Za-z0-9_-]', '_', str(self.calibration.get('serial', 'unknown'))) + '_'
+
+    def __get_cache_filepath(self, key):
+        ''' return the file path of the cached gather index for the given quilt layout '''
+        return os.path.join(LookingGlassInterleaver.cache_path, "%s%s_%ix%i_%ix%ix%i%s.npy" % (self.__get_cache_prefix(), self.__calibration_hash, key[1], key[0], key[3], key[2], key[4], '_flipped' if key[5] else ''))
+
+    def __load_gather_map(self, key):
+        ''' load the gather index for the given quilt layout from the cache on disk '''
+
+        # if the cache on disk is used and the gather index was cached
+        if LookingGlassInterleaver.cache_path and os.path.exists(self.__get_cache_filepath(key)):
+
+            try:
+
+                # memory-map the gather index
+                gather_map = np.load(self.__get_cache_filepath(key), mmap_mode='r')
+                if gather_map.shape == (self.height, self.width, 3):
+
+                    logger.info("Loaded cached gather index for quilt layout %s from '%s'." % (key, self.__get_cache_filepath(key)))
+
+                    return gather_map
+
+            except (OSError, ValueError):
+
+                logger.warning("The cached gather index '%s' could not be read." % self.__get_cache_filepath(key))
+
+        return None
+
+    def __save_gather_map(self, key, gather_map):
+        ''' store the gather index for the given quilt layout in the cache on disk '''
+
+        # if the cache on disk is used
+        if LookingGlassInterleaver.cache_path:
+
+            try:
+
+                os.makedirs(LookingGlassInterleaver.cache_path, exist_ok=True)
+
+                # remove gather indices of this device that were created for a different calibration
+                for file_name in os.listdir(LookingGlassInterleaver.cache_path):
+                    if file_name.startswith(self.__get_cache_prefix()) and not file_name.startswith(self.__get_cache_prefix() + self.__calibration_hash):
+                        os.remove(os.path.join(LookingGlassInterleaver.cache_path, file_name))
+                        logger.info("Removed outdated gather index '%s'." % file_name)
+
+                # write to a temporary file first, so that no incomplete file is
+                # loaded by another process
+                filepath = self.__get_cache_filepath(key)
+                with open(filepath + '.tmp', 'wb') as file:
+                    np.save(file, gather_map)
+                os.replace(filepath + '.tmp', filepath)
+
+            except OSError:
+
+                logger.warning("The gather index could not be cached in '%s'." % LookingGlassInterleaver.cache_path)
+
+
+    # CLASS PROPERTIES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @property
+    def calibration(self):
+        return self.__calibration
+
+    @calibration.setter
+    def calibration(self, value):
+        self.__calibration = value
+
+    @property
+    def width(self):
+        return int(self.calibration['screenW'])
+
+    @width.setter
+    def width(self, value):
+        pass
+
+    @property
+    def height(self):
+        return int(self.calibration['screenH'])
+
+    @height.setter
+    def height(self, value):
+        pass
@@ -18,8 +18,12 @@
 
 # EXTERNAL PACKAGE DEPENDENCIES
 ###################################################
-import io, os
+import io, os, re, threading
+import functools
+import concurrent.futures
+import collections
 import numpy as np
+import cv2
 
 # debuging
 import time
@@ -46,11 +50,53 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
     # PRIVATE ATTRIBUTES
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    __merged_numpy = None   # a numpy array which holds all the view data
+    __merged_numpy = None   # contiguous view stack of shape (rows, view_height, columns, view_width, colorchannels) which holds all the view data
+    __view_slots = None     # list of subarrays of the view stack, one for each view
+    __updated_views = []    # indices of the views merged by the last call of decode()
+    __output_cache = None   # cached outputs of decode() in the format {(decoderformat, flip_views): (views revision, output)}
+
+    __lazy_cache = collections.OrderedDict()    # decoded images of lazily loaded quilts in the format {(filepath, mtime, size, colorchannels): numpy array}
+    __lazy_cache_size = 0                       # number of bytes used by the decoded images
+    __lazy_cache_lock = threading.Lock()        # lock for the cache of decoded images
+
+    __save_executor = None                      # worker threads which encode and write quilts saved with save_async()
 
 
     # DEFINE PUBLIC CLASS ATTRIBUTES
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # maximum number of bytes the decoded images of lazily loaded quilts may use
+    # NOTE: Memory-mapped quilts (.npy and .raw files) are not counted, since
+    #       their pages are managed by the operating system
+    lazy_memory_limit = 1024 * 1024 * 1024
+
+
+    # supported file formats for saving quilts
+    class fileformats(Enum):
+        png = 1                 # PNG image (lossless)
+        jpeg = 2                # JPEG image (lossy, no alpha channel)
+        webp = 3                # WebP image (lossy or lossless with quality > 100)
+        exr = 4                 # OpenEXR image (32 bit float)
+        raw = 5                 # raw RGB(A) pixel data without header
+
+        @classmethod
+        def to_list(cls):
+            return list(map(lambda enum: enum, cls))
+
+        @classmethod
+        def is_valid(cls, value):
+            ''' check if a given value is a member of this class '''
+            return (value in cls.to_list())
+
+        @classmethod
+        def from_extension(cls, extension):
+            ''' return the file format for the given file extension '''
+            return {'.png': cls.png, '.jpg': cls.jpeg, '.jpeg': cls.jpeg, '.webp': cls.webp, '.exr': cls.exr, '.raw': cls.raw}.get(extension.lower())
+
+        @property
+        def extension(self):
+            ''' the default file extension of this file format '''
+            return {1: '.png', 2: '.jpg', 3: '.webp', 4: '.exr', 5: '.raw'}[self.value]
+
     # supported quilt formats
     class formats:
 
@@ -121,6 +167,9 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
         # first make the mandatory call to the __init__ method of the base class
         super().__init__()
 
+        # cached outputs of decode()
+        self.__output_cache = {}
+
         # if no quilt format id was passed
         if not id:
 
@@ -154,49 +203,64 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
             self.metadata['columns'] = LookingGlassQuilt.formats.get(id)['columns']
             self.metadata['count'] = LookingGlassQuilt.formats.get(id)['total_views']
 
+            # create the view stack and a LightfieldView for each of its views
+            # NOTE: The view data of each LightfieldView is a subarray of the
+            #       view stack. Data written to the views therefore directly
+            #       ends up in the quilt. After writing in place, update_view()
+            #       must be called, since the Pillow and BytesIO outputs of
+            #       decode() are cached until a view is updated.
+            self.__allocate_view_stack()
+            for slot in self.__view_slots:
+                self.append_view(slot, LightfieldView.formats.numpyarray)
+
         else:
 
             raise TypeError("There is no quilt format with the id '%i'. Please choose one of the following: %s" % (id, LookingGlassQuilt.formats.get()))
 
-    def load(self, filepath):
+    def load(self, filepath, lazy=False):
         ''' load the quilt file from the given path and convert to numpy views '''
         if os.path.exists(filepath):
 
+            # if the quilt shall be loaded lazily
+            if lazy: return self.__load_lazy(filepath)
+
             start = time.time()
-            # use PIL to load the image from disk
+            # numpy arrays and raw pixel data are read directly, all other
+            # formats are decoded by OpenCV
             # NOTE: This makes nearly all of the execution time of the load() method
-            # ToDo: replace PIL with OpenCV call, since we don't need both
-            quilt_image = Image.open(filepath)
-            if quilt_image:
+            quilt_np = self.__read_array(filepath)
+            if quilt_np is None: quilt_np = LookingGlassQuilt.__read_image(filepath)
+            if quilt_np is not None:
 
                 # try to detect quilt from quilt name
                 found = self.__detect_from_quilt_suffix(os.path.basename(filepath))
                 if not found:
                     # otherwise try to detect it from the quilt dimensions
-                    found = self.__detect_from_quilt_dimensions(quilt_width = quilt_image.width, quilt_height = quilt_image.height)
+                    found = self.__detect_from_quilt_dimensions(quilt_width = quilt_np.shape[1], quilt_height = quilt_np.shape[0])
 
                 # if no fitting quilt format was found
                 if not found: raise TypeError("The loaded image is not in a supported format. Please check the image dimensions.")
 
-                # TODO: This takes 0.5 to 1.5 s ... is there a faster way?
-                # convert it to a numpy array
-                quilt_np = np.asarray(quilt_image, dtype=np.uint8)
                 # crop the image in case, the size is incorrect due to rounding
                 # errors
                 quilt_np = quilt_np[0:(self.metadata['rows'] * self.metadata['view_height']), 0:(self.metadata['columns'] * self.metadata['view_width']), :]
 
-                # store the colormode
-                self.colormode = quilt_image.mode
-
                 # store the size and color depth in the meta data of the instance
                 self.metadata['quilt_height'], self.metadata['quilt_width'], self.colorchannels = quilt_np.shape
 
-                # then we reshape the quilt into the array of individual views ...
-                views = np.flip(quilt_np.reshape(self.metadata['rows'], self.metadata['view_height'], self.metadata['columns'], self.metadata['view_width'], self.colorchannels).swapaxes(1, 2), 0).reshape(self.metadata['count'], self.metadata['view_height'], self.metadata['view_width'], self.colorchannels)
+                # store the colormode
+                self.colormode = 'RGBA' if self.colorchannels == 4 else 'RGB'
+
+                # then we copy the quilt into the view stack ...
+                self.__allocate_view_stack()
+                self.__merged_numpy[...] = np.flip(quilt_np.reshape(self.metadata['rows'], self.metadata['view_height'], self.metadata['columns'], self.metadata['view_width'], self.colorchannels), 0)
+
+                # ... and add each view of the stack as a numpyarray view to the LookingGlassQuilt
+                self.views = []
+                for slot in self.__view_slots:
+                    view = self.append_view(slot, LightfieldView.formats.numpyarray)
 
-                # add each view image data array as a numpyarray view to the LookingGlassQuilt
-                for data in views:
-                    view = self.append_view(data, LightfieldView.formats.numpyarray)
+                logger.debug(" [#] Loaded quilt of shape %s in %.3f ms." % (quilt_np.shape, (time.time() - start) * 1000))
 
                 return True
 
@@ -235,22 +299,49 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
             # store the size and color depth in the meta data of the instance
             self.metadata['quilt_height'], self.metadata['quilt_width'], self.colorchannels = quilt_np.shape
 
-            # then we reshape the quilt into the array of individual views ...
-            views = np.flip(quilt_np.reshape(self.metadata['rows'], self.metadata['view_height'], self.metadata['columns'], self.metadata['view_width'], self.colorchannels).swapaxes(1, 2), 0).reshape(self.metadata['count'], self.metadata['view_height'], self.metadata['view_width'], self.colorchannels)
+            # then we copy the quilt into the view stack ...
+            self.__allocate_view_stack()
+            self.__merged_numpy[...] = np.flip(quilt_np.reshape(self.metadata['rows'], self.metadata['view_height'], self.metadata['columns'], self.metadata['view_width'], self.colorchannels), 0)
 
-            # add each view image data array as a numpyarray view to the LookingGlassQuilt
-            for data in views:
+            # ... and add each view of the stack as a numpyarray view to the LookingGlassQuilt
+            self.views = []
+            for slot in self.__view_slots:
 
-                view = self.append_view(data, LightfieldView.formats.numpyarray)
+                view = self.append_view(slot, LightfieldView.formats.numpyarray)
 
             return True
 
         raise FileNotFoundError("The data block needs to be of type '%s'" % np.ndarray)
 
-    def save(self, filepath, format):
-        ''' save the lightfield image in its specific format to a disk file '''
+    def save(self, filepath, format=None, flip_views=False, quality=None, add_suffix=True, aspect=None):
+        ''' save the quilt in the given file format to a disk file and return the file path '''
 
-        pass
+        start = time.time()
+
+        # prepare the image and the encoder parameters
+        filepath, format, image, params = self.__prepare_save(filepath, format, flip_views, quality, add_suffix, aspect)
+
+        # encode the image and write it to disk
+        LookingGlassQuilt.__write_image(filepath, format, image, params)
+
+        logger.debug(" [#] Saved quilt of shape %s to '%s' in %.3f ms." % (image.shape, filepath, (time.time() - start) * 1000))
+
+        return filepath
+
+    def save_async(self, filepath, format=None, flip_views=False, quality=None, add_suffix=True, aspect=None):
+        ''' save the quilt on a worker thread and return a future of the file path '''
+
+        # prepare the image and the encoder parameters
+        # NOTE: This copies the quilt, so the views can be modified while the
+        #       image is encoded in the background
+        filepath, format, image, params = self.__prepare_save(filepath, format, flip_views, quality, add_suffix, aspect)
+
+        # create the worker threads on first use
+        if LookingGlassQuilt.__save_executor is None:
+            LookingGlassQuilt.__save_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='pyLightIO-save')
+
+        # encode the image and write it to disk on a worker thread
+        return LookingGlassQuilt.__save_executor.submit(LookingGlassQuilt.__write_image, filepath, format, image, params)
 
     def delete(self, lightfield):
         ''' delete the given lightfield image object '''
@@ -263,13 +354,24 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
         # if the given list has the correct length for this quilt
         if len(list) == self.metadata['count']:
 
+            # remove the current views, since all of them are replaced
+            self.views = []
+
             # and then call the base class function
+            # NOTE: The view data is moved into the view stack on the next
+            #       call of decode()
             return super().set_views(list, format)
 
         raise ValueError("Invalid view set. %i views were passed, but %i were required." % (len(list), self.metadata['count']))
 
     def decode(self, format, flip_views=False, custom_decoder = None):
         ''' return the lightfield image object in a specific format '''
+        # NOTE: The numpy array output shares its buffer with the views. The
+        #       Pillow output with flipped views is created on each call (and
+        #       maps the buffer only for RGBA quilts). All other outputs are
+        #       copies, which are cached until update_view() is called. Views
+        #       that were written in place without a call of update_view()
+        #       are therefore missing in these outputs.
 
         # if a custom decoder function is passed
         if custom_decoder:
@@ -278,7 +380,7 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
             views = self.get_view_data()
 
             # call this function
-            quilt = custom_decoder(views, views_format, format)
+            quilt = custom_decoder(views, self.views_format, format)
 
             # return the quilt data
             return quilt
@@ -287,22 +389,32 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
         # TODO: HERE IS THE PLACE TO DEFINE STANDARD CONVERSIONS THAT CAN BE
         #       USED IN MULTIPLE PROGRAMMS
 
-        # if the image shall be returned as numpy array
-        if format == LightfieldImage.decoderformat.numpyarray:
+        # if the views are in a supported format
+        if LightfieldView.formats.is_valid(self.views_format):
 
-            # if the views are in a numpy array format
-            if self.views_format == LightfieldView.formats.numpyarray:
+            # if the image shall be returned as numpy array
+            if format == LightfieldImage.decoderformat.numpyarray:
 
-                # create a numpy quilt from numpy views
+                # create a numpy quilt from the views
                 quilt_numpy = self.__from_views_to_quilt_numpy(flip_views=flip_views)
 
                 # return the numpy array of the quilt
                 return quilt_numpy
 
-            # otherwise raise exception
-            raise TypeError("The given views format '%s' is not supported." % self.views_format)
+            # if the image shall be returned as Pillow image
+            elif format == LightfieldImage.decoderformat.pil_image:
+
+                # return the Pillow image of the quilt
+                return self.__from_views_to_quilt_pil(flip_views=flip_views)
+
+            # if the image shall be returned as BytesIO object
+            elif format == LightfieldImage.decoderformat.bytesio:
+
+                # return the PNG encoded quilt
+                return self.__from_views_to_quilt_bytesio(flip_views=flip_views)
 
         # otherwise raise exception
+        if not LightfieldView.formats.is_valid(self.views_format): raise TypeError("The given views format '%s' is not supported." % self.views_format)
         raise TypeError("The requested lightfield format '%s' is not supported." % format)
 
 
@@ -320,18 +432,19 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
         if quilt_name:
 
             # try to extract some metadata information from the quiltname
+            # NOTE: The format convention is "quiltname_qs{columns}x{rows}a{aspect}"
             try:
 
-                rows = int(re.search('_qs(\d+)x(\d+)a(\d+.?\d*)', quilt_name).group(1))
-                columns = int(re.search('_qs(\d+)x(\d+)a(\d+.?\d*)', quilt_name).group(2))
+                columns = int(re.search('_qs(\d+)x(\d+)a(\d+.?\d*)', quilt_name).group(1))
+                rows = int(re.search('_qs(\d+)x(\d+)a(\d+.?\d*)', quilt_name).group(2))
                 aspect = float(re.search('_qs(\d+)x(\d+)a(\d+.?\d*)', quilt_name).group(3))
 
             except AttributeError:
 
                 try:
 
-                    rows = int(re.search('_qs(\d+)x(\d+).', quilt_name).group(1))
-                    columns = int(re.search('_qs(\d+)x(\d+).', quilt_name).group(2))
+                    columns = int(re.search('_qs(\d+)x(\d+).', quilt_name).group(1))
+                    rows = int(re.search('_qs(\d+)x(\d+).', quilt_name).group(2))
 
                 except AttributeError:
 
@@ -397,64 +510,370 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
 
         return False
 
+    # PRIVATE INSTANCE METHODS: LAZY LOADING
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __load_lazy(self, filepath):
+        ''' open the quilt file without reading the pixel data and create views which load on first access '''
+
+        start = time.time()
+
+        # numpy arrays and raw pixel data are memory-mapped in copy-on-write mode
+        quilt_np = self.__read_array(filepath, mmap=True)
+        if quilt_np is not None:
+
+            quilt_height, quilt_width, colorchannels = quilt_np.shape
+
+        # compressed images are decoded on the first access of a view
+        else:
+
+            quilt_height, quilt_width, colorchannels = LookingGlassQuilt.__read_image_shape(filepath)
+
+        # try to detect quilt from quilt name
+        found = self.__detect_from_quilt_suffix(os.path.basename(filepath))
+        if not found:
+            # otherwise try to detect it from the quilt dimensions
+            found = self.__detect_from_quilt_dimensions(quilt_width = quilt_width, quilt_height = quilt_height)
+
+        # if no fitting quilt format was found
+        if not found: raise TypeError("The loaded image is not in a supported format. Please check the image dimensions.")
+
+        # store the size and color depth in the meta data of the instance
+        # NOTE: the image is cropped in case, the size is incorrect due to rounding
+        self.metadata['quilt_height'], self.metadata['quilt_width'], self.colorchannels = self.metadata['rows'] * self.metadata['view_height'], self.metadata['columns'] * self.metadata['view_width'], colorchannels
+        self.colormode = 'RGBA' if self.colorchannels == 4 else 'RGB'
+
+        # the decoded image is cached for the file in its current state, so that
+        # a file overwritten later is not served from the cache
+        file_stat = os.stat(filepath)
+        cache_key = (filepath, file_stat.st_mtime_ns, file_stat.st_size, self.colorchannels)
+
+        # add the views as zero-copy slices of the image (starting at the bottom left)
+        self.views = []
+        for i in range(self.metadata['count']):
+
+            # if the image is memory-mapped
+            if quilt_np is not None:
+
+                # the pages of the view are only read from disk if the view is accessed
+                view = self.append_view(LookingGlassQuilt.__slice_view(quilt_np, self.metadata, i), LightfieldView.formats.numpyarray)
+
+            else:
+
+                # the view is sliced from the decoded image on each access
+                view = self.append_view(LightfieldView(None, LightfieldView.formats.numpyarray, loader=functools.partial(LookingGlassQuilt.__load_lazy_view, cache_key, dict(self.metadata), i)))
+
+        logger.debug(" [#] Opened quilt '%s' for lazy loading in %.3f ms." % (filepath, (time.time() - start) * 1000))
+
+        return True
+
+    def __read_array(self, filepath, mmap=False):
+        ''' read a numpy array or raw pixel data file as RGB(A) numpy array or return None for other formats '''
+
+        # numpy arrays store their shape and type in the file header
+        if filepath.lower().endswith('.npy'):
+
+            quilt_np = np.load(filepath, mmap_mode='c' if mmap else None)
+            if quilt_np.ndim != 3 or quilt_np.dtype != np.uint8: raise TypeError("The quilt array must be of type uint8 and shape (height, width, colorchannels), but '%s' has type %s and shape %s." % (filepath, quilt_np.dtype, quilt_np.shape))
+
+            return quilt_np
+
+        # raw files have no header, so the quilt format and the image size
+        # must be given by the quilt suffix of the file name
+        elif filepath.lower().endswith('.raw'):
+
+            if not self.__detect_from_quilt_suffix(os.path.basename(filepath)): raise TypeError("The quilt format of the raw file '%s' could not be detected. Please add a quilt suffix to the file name." % filepath)
+
+            quilt_height, quilt_width = self.metadata['rows'] * self.metadata['view_height'], self.metadata['columns'] * self.metadata['view_width']
+            colorchannels = os.path.getsize(filepath) // (quilt_height * quilt_width)
+            if not colorchannels in (3, 4) or os.path.getsize(filepath) != quilt_height * quilt_width * colorchannels: raise TypeError("The size of the raw file '%s' does not fit the detected quilt format." % filepath)
+
+            if mmap: return np.memmap(filepath, dtype=np.uint8, mode='c', shape=(quilt_height, quilt_width, colorchannels))
+            return np.fromfile(filepath, dtype=np.uint8).reshape(quilt_height, quilt_width, colorchannels)
+
+        return None
+
+    @classmethod
+    def __load_lazy_view(cls, cache_key, metadata, index):
+        ''' return the view with the given index from the decoded image of a lazily loaded quilt '''
+        filepath, colorchannels = cache_key[0], cache_key[3]
+
+        with cls.__lazy_cache_lock:
+
+            # if the image was already decoded, mark it as recently used
+            quilt_np = cls.__lazy_cache.get(cache_key)
+            if quilt_np is not None: cls.__lazy_cache.move_to_end(cache_key)
+
+        # otherwise decode the image
+        # NOTE: This happens outside of the lock, so that multiple quilts can be
+        #       decoded in parallel
+        if quilt_np is None:
+
+            start = time.time()
+            quilt_np = cls.__read_image(filepath, colorchannels)
+            if quilt_np is None: raise TypeError("The quilt image '%s' could not be opened. The image format is not supported." % filepath)
+
+            logger.debug(" [#] Decoded lazily loaded quilt '%s' in %.3f ms." % (filepath, (time.time() - start) * 1000))
+
+            with cls.__lazy_cache_lock:
+
+                # evict the least recently used images until the new one fits into the memory limit
+                while cls.__lazy_cache and cls.__lazy_cache_size + quilt_np.nbytes > cls.lazy_memory_limit:
+                    cls.__lazy_cache_size -= cls.__lazy_cache.popitem(last=False)[1].nbytes
+
+                # store the decoded image, if it was not decoded by another thread in between
+                if not cache_key in cls.__lazy_cache:
+                    cls.__lazy_cache[cache_key] = quilt_np
+                    cls.__lazy_cache_size += quilt_np.nbytes
+
+        return cls.__slice_view(quilt_np, metadata, index)
+
+    @staticmethod
+    def __slice_view(quilt_np, metadata, index):
+        ''' return the view with the given index as a zero-copy slice of the quilt '''
+        row, column = metadata['rows'] - 1 - index // metadata['columns'], index % metadata['columns']
+        return quilt_np[row * metadata['view_height']:(row + 1) * metadata['view_height'], column * metadata['view_width']:(column + 1) * metadata['view_width'], :]
+
+    @staticmethod
+    def __read_image(filepath, colorchannels=None):
+        ''' read an image file as RGB(A) numpy array with the given number of color channels '''
+
+        # read the image in its original color format
+        image = cv2.imread(filepath, cv2.IMREAD_UNCHANGED)
+        if image is None: return None
+
+        # reduce 16 bit images to 8 bit
+        if image.dtype == np.uint16: image = (image >> 8).astype(np.uint8)
+
+        # if no number of color channels is requested, keep the alpha channel of the image
+        if colorchannels is None: colorchannels = 4 if (image.ndim == 3 and image.shape[2] == 4) else 3
+
+        # convert OpenCV's BGR(A) to RGB(A)
+        if image.ndim == 2:         return cv2.cvtColor(image, cv2.COLOR_GRAY2RGBA if colorchannels == 4 else cv2.COLOR_GRAY2RGB)
+        elif image.shape[2] == 3:   return cv2.cvtColor(image, cv2.COLOR_BGR2RGBA if colorchannels == 4 else cv2.COLOR_BGR2RGB)
+        else:                       return cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA if colorchannels == 4 else cv2.COLOR_BGRA2RGB)
+
+    @staticmethod
+    def __read_image_shape(filepath):
+        ''' read the image shape of a compressed image without decoding the pixel data, if possible '''
+        try:
+
+            # Pillow only reads the image header when opening a file
+            from PIL import Image
+            with Image.open(filepath) as image:
+                return image.height, image.width, 4 if (image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info) else 3
+
+        except ImportError:
+
+            # otherwise the image needs to be decoded
+            quilt_np = LookingGlassQuilt.__read_image(filepath)
+            if quilt_np is None: raise TypeError("The quilt image was found but could not be opened. The image format is not supported.")
+
+            return quilt_np.shape
+
+    # PRIVATE INSTANCE METHODS: SAVING
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __prepare_save(self, filepath, format, flip_views, quality, add_suffix, aspect):
+        ''' prepare file path, image data, and encoder parameters for saving the quilt '''
+
+        # if no file format is given, choose it from the file extension
+        basename, extension = os.path.splitext(filepath)
+        if format is None: format = LookingGlassQuilt.fileformats.from_extension(extension)
+        if format is None: raise TypeError("The file format could not be detected from the file extension '%s'. Please choose one of the following: %s" % (extension, LookingGlassQuilt.fileformats.to_list()))
+        if not LookingGlassQuilt.fileformats.is_valid(format): raise TypeError("'%s' is no valid quilt file format." % format)
+
+        # if the file extension does not match the file format, append the default extension
+        if LookingGlassQuilt.fileformats.from_extension(extension) != format: basename, extension = filepath, format.extension
+
+        # add the quilt suffix, if the file name does not have one yet
+        # NOTE: The format convention is "quiltname_qs{columns}x{rows}a{aspect}"
+        if add_suffix and not re.search('_qs(\d+)x(\d+)', os.path.basename(basename)):
+            if aspect is None: aspect = self.metadata['view_width'] / self.metadata['view_height']
+            basename += '_qs%ix%ia%s' % (self.metadata['columns'], self.metadata['rows'], ('%.2f' % aspect) if len(str(aspect)) > 3 else aspect)
+
+        filepath = basename + extension
+
+        # get the quilt image
+        quilt_np = self.__from_views_to_quilt_image(flip_views)
+
+        # raw files keep the RGB(A) pixel data
+        params = []
+        if format == LookingGlassQuilt.fileformats.raw:
+            image = np.ascontiguousarray(quilt_np)
+
+        # all other formats are encoded by OpenCV, which expects BGR(A)
+        else:
+            if self.colorchannels == 4 and format != LookingGlassQuilt.fileformats.jpeg: image = cv2.cvtColor(quilt_np, cv2.COLOR_RGBA2BGRA)
+            elif self.colorchannels == 4:                                                image = cv2.cvtColor(quilt_np, cv2.COLOR_RGBA2BGR)
+            else:                                                                        image = cv2.cvtColor(quilt_np, cv2.COLOR_RGB2BGR)
+
+            # OpenEXR images are stored as 32 bit float
+            if format == LookingGlassQuilt.fileformats.exr: image = image.astype(np.float32) / 255.0
+
+            # encoder parameters
+            if format == LookingGlassQuilt.fileformats.jpeg and quality is not None:    params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+            elif format == LookingGlassQuilt.fileformats.webp and quality is not None:  params = [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+            elif format == LookingGlassQuilt.fileformats.png and quality is not None:   params = [cv2.IMWRITE_PNG_COMPRESSION, int(quality)]
+
+        return filepath, format, image, params
+
+    @staticmethod
+    def __write_image(filepath, format, image, params):
+        ''' encode the image data and write it to the given file path '''
+
+        # raw pixel data is written without header
+        if format == LookingGlassQuilt.fileformats.raw:
+            image.tofile(filepath)
+
+        else:
+
+            # encode in memory and write the file from Python
+            # NOTE: cv2.imwrite() fails for non-ASCII paths on some platforms
+            # NOTE: OpenEXR support of OpenCV might require the environment
+            #       variable OPENCV_IO_ENABLE_OPENEXR=1
+            success, buffer = cv2.imencode(format.extension, image, params)
+            if not success: raise RuntimeError("The quilt could not be encoded as '%s'." % format)
+
+            buffer.tofile(filepath)
+
+        return filepath
+
     # PRIVATE INSTANCE METHODS: VIEWS TO QUILTS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    # NOTE: this function is based on https://stackoverflow.com/questions/42040747/more-idiomatic-way-to-display-images-in-a-grid-with-numpy
-    # NOTE: This call takes 15 to 30 ms -> can this be optimized?
+    def __allocate_view_stack(self):
+        ''' create the contiguous view stack and the subarrays for each view '''
+
+        # create the view stack of shape (rows, view_height, columns, view_width, colorchannels)
+        # NOTE: In this layout, the view stack can be reshaped to the quilt of
+        #       shape (quilt_height, quilt_width, colorchannels) without copying
+        self.__merged_numpy = np.empty((self.metadata['rows'], self.metadata['view_height'], self.metadata['columns'], self.metadata['view_width'], self.colorchannels), dtype=np.uint8)
+
+        # create a strided subarray for each view (starting at the bottom left)
+        self.__view_slots = [self.__merged_numpy[i // self.metadata['columns'], :, i % self.metadata['columns'], :, :] for i in range(self.metadata['count'])]
+
+        logger.debug(" [#] Allocated view stack of shape %s." % (self.__merged_numpy.shape,))
+
+    # NOTE: The view data of views created by this class is always a subarray
+    #       of the view stack. Only views that were marked as updated since the
+    #       last call and were passed in from outside are copied into the view
+    #       stack here (and only once).
     def __from_views_to_quilt_numpy(self, flip_views=False):
         ''' convert views given as numpy arrays to a quilt as a numpy array '''
 
         start = time.time()
 
-        # if no merged numpy array exists
-        if self.__merged_numpy is None:
+        # if no view stack exists yet (e.g., views were appended to an empty quilt)
+        if self.__merged_numpy is None or self.__merged_numpy.shape[-1] != self.colorchannels:
+            self.__allocate_view_stack()
+
+            # all views need to be merged into the new view stack
+            with self.views_lock:
+                for view in self.views: view['updated'] = True
+
+        # get the views that were updated since the last call and reset their status
+        self.__updated_views = [i for i in self.get_updated_views(reset_updated=True) if i < self.metadata['count']]
+
+        # move the data of the updated views which are not part of the view
+        # stack into the view stack and re-assign their data as subarray of it
+        copied = 0
+        for i in self.__updated_views:
+            view = self.views[i]['view']
+            if view.format != LightfieldView.formats.numpyarray:
+                # NOTE: Views in other formats keep their data and are converted
+                #       each time they are updated
+                LookingGlassQuilt.__copy_into_slot(self.__view_slots[i], LightfieldView.convert_data(view.data, view.format, LightfieldView.formats.numpyarray))
+                copied += 1
+            elif view.data is not self.__view_slots[i]:
+                LookingGlassQuilt.__copy_into_slot(self.__view_slots[i], view.data)
+                view.data = self.__view_slots[i]
+                copied += 1
+
+        # log info
+        logger.debug(" [#] Merged %i updated views (%i copied into the view stack) in %.3f ms." % (len(self.__updated_views), copied, (time.time() - start) * 1000))
 
-            # get the views
-            views = self.get_view_data()
-            views_format = self.views_format
+        # output the views
+        return self.__merged_numpy
 
-            # create numpy array from the BytesIO buffer object
-            self.__merged_numpy = np.asarray(views, dtype=np.uint8)
 
-            # log info
-            logger.debug(" [#] Prepared numpy array of shape %s in %.3f ms." % (self.__merged_numpy.shape, (time.time() - start) * 1000))
 
-            # step 1: get an array of shape (rows, columns, view_height, view_width)
-            self.__merged_numpy = self.__merged_numpy.reshape(self.metadata['rows'], self.metadata['columns'], self.metadata['view_height'], self.metadata['view_width'], self.colorchannels)
+    @staticmethod
+    def __copy_into_slot(slot, data):
+        ''' copy the view data into its subarray of the view stack and add or drop the alpha channel, if the number of color channels differs '''
+        # NOTE: This happens, if the color mode of the quilt was changed after
+        #       the views were created
 
-            # step 2: swap the "columns" and "view_height" axis, so that we get an
-            #         array of shape (rows, view_height, columns, view_width, colorchannels)
-            self.__merged_numpy = self.__merged_numpy.swapaxes(1, 2)
+        if data.shape[-1] == slot.shape[-1]:
+            slot[...] = data
 
-            # step 3: re-assign the numpy arrays for all underlying LightfieldView-objects
-            # as (memory)views into the __merged_numpy array
-            # NOTE: This step speeds up the quilt creation by some tens of milliseconds
-            #       since the next time the LightfieldView pixel data is updated
-            #       it directly updates the pixel data in the __merged_numpy array.
-            i_x = i_y = 0
-            for i, view in enumerate(self.views):
+        elif data.ndim == 3 and data.shape[-1] in (3, 4):
+            slot[..., :3] = data[..., :3]
+            if slot.shape[-1] == 4: slot[..., 3] = 255
 
-                # create subarray view into the quilt pixel data
-                view['view'].data = self.__merged_numpy[i_y, :, i_x, :, :]
+        else:
+            raise ValueError("The view data of shape %s can not be converted to %i color channels." % (data.shape, slot.shape[-1]))
 
-                # choose column and row
-                if (i + 1) % self.metadata['columns'] == 0 and i > 0:
-                    i_x = 0
-                    i_y += 1
-                else:
-                    i_x += 1
+    def __from_views_to_quilt_image(self, flip_views=False):
+        ''' return the quilt as numpy array of shape (quilt_height, quilt_width, colorchannels) from the top row to the bottom row '''
 
-            # log info
-            logger.debug(" [#] Prepeared quilt as numpy array in %.3f ms." % ((time.time() - start) * 1000))
+        # the view stack starts with the bottom row of views
+        quilt_np = self.__from_views_to_quilt_numpy()
 
-        # output the views
-        return self.__merged_numpy
+        # NOTE: Flipping the views in addition is the same as flipping the
+        #       complete view stack, which needs no copy
+        if flip_views: return quilt_np.reshape(self.metadata['quilt_height'], self.metadata['quilt_width'], self.colorchannels)[::-1]
+        else:          return np.flip(quilt_np, 0).reshape(self.metadata['quilt_height'], self.metadata['quilt_width'], self.colorchannels)
 
+    def __from_views_to_quilt_pil(self, flip_views=False):
+        ''' convert the views to a quilt as Pillow image '''
+        from PIL import Image
 
+        # if the views are flipped, Pillow can read the view stack from the
+        # bottom to the top without reordering the rows of views
+        # NOTE: Pillow only maps the buffer of RGBA images and copies RGB images
+        if flip_views:
 
-    # PRIVATE INSTANCE METHODS: CONVERT BETWEEN DECODERFORMATS
-    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+            quilt_np = self.__from_views_to_quilt_numpy()
+            return Image.frombuffer(self.colormode, (self.metadata['quilt_width'], self.metadata['quilt_height']), quilt_np.reshape(-1), 'raw', self.colormode, 0, -1)
+
+        # otherwise the rows of views are reordered, which requires a copy
+        # that is cached until the views change
+        return self.__cached_output(LightfieldImage.decoderformat.pil_image, flip_views, lambda: Image.frombuffer(self.colormode, (self.metadata['quilt_width'], self.metadata['quilt_height']), np.ascontiguousarray(self.__from_views_to_quilt_image(flip_views)), 'raw', self.colormode, 0, 1))
+
+    def __from_views_to_quilt_bytesio(self, flip_views=False):
+        ''' convert the views to a PNG encoded quilt in a BytesIO object '''
+
+        def encode():
+
+            # encode the quilt (OpenCV expects BGR(A))
+            quilt_np = self.__from_views_to_quilt_image(flip_views)
+            success, buffer = cv2.imencode('.png', cv2.cvtColor(quilt_np, cv2.COLOR_RGBA2BGRA if self.colorchannels == 4 else cv2.COLOR_RGB2BGR))
+            if not success: raise TypeError("The quilt could not be encoded.")
+
+            return io.BytesIO(buffer)
+
+        # the encoded quilt is cached until the views change
+        output = self.__cached_output(LightfieldImage.decoderformat.bytesio, flip_views, encode)
+        output.seek(0)
+        return output
+
+    def __cached_output(self, format, flip_views, create):
+        ''' return the cached output for the given format or create it, if the views changed '''
+
+        # merge the updated views first, so the revision of the views is final
+        self.__from_views_to_quilt_numpy()
+
+        # if the cached output was created from the current views
+        cached = self.__output_cache.get((format, flip_views))
+        if cached and cached[0] == self.views_revision: return cached[1]
+
+        # otherwise create a new output
+        start = time.time()
+        output = create()
+        self.__output_cache[(format, flip_views)] = (self.views_revision, output)
+
+        logger.debug(" [#] Created quilt as %s in %.3f ms." % (format, (time.time() - start) * 1000))
+
+        return output
 
 
     # CLASS PROPERTIES
@@ -466,3 +885,11 @@ class LookingGlassQuilt(BaseLightfieldImageFormat):
     @merged_numpy.setter
     def merged_numpy(self, value):
         pass
+
+    @property                   # read-only property
+    def updated_views(self):
+        return self.__updated_views
+
+    @updated_views.setter
+    def updated_views(self, value):
+        pass
@@ -19,6 +19,8 @@
 # EXTERNAL PACKAGE DEPENDENCIES
 ###################################################
 import sys, os, io, struct
+import threading, weakref, asyncio, functools, hashlib, collections, contextlib
+import concurrent.futures
 import pynng, cv2
 import math
 import numpy as np
@@ -56,8 +58,78 @@ class LookingGlassBridge(BaseServiceType):
     __socket = None                                             # NNG socket
     __address = 'ipc:///tmp/holoplay-driver.ipc'                # driver url (alternative: "ws://localhost:11222/driver", "ipc:///tmp/holoplay-driver.ipc")
     __dialer = None                                             # NNG Dialer of the socket
-    __devices = []                                              # list of devices supported by this service (#TODO: this needs to be implemented)
+    __devices = []                                              # configurations of the devices, which were obtained from Looking Glass Bridge the last time
+    __ready = None                                              # event, which is set when the service is connected and initialized
+    __ready_callbacks = None                                    # functions, which are called with the service when it is ready
+    __ready_lock = None                                         # lock which protects the ready callbacks
+    __stop_connecting = None                                    # event, which stops the background connection attempts
+    __calibrations = None                                       # received and parsed calibration of each device in the format {serial: (received, parsed)}
+    __calibrations_lock = None                                  # lock which protects the calibrations
+    __poller = None                                             # state of the device poller in the format {'thread': thread, 'stop': event}
+    __devices_callbacks = None                                  # functions, which are called with the service and the devices when the devices changed
     __decoder_format = LightfieldImage.decoderformat.numpyarray # the decoder format in which the lightfield data is passed to the service
+    __timeout = 5000                                            # timeout of the requests (in ms)
+    __contexts = None                                           # idle NNG contexts, which are reused for the next requests
+    __contexts_lock = None                                      # lock which protects the idle contexts and the request statistics
+    __context_timeouts = True                                   # if False, the receive timeout of the NNG contexts can't be set and the socket's timeout is used
+    __encoder_lock = None                                       # lock which protects the frame buffer of the CBOR encoder
+    __request_stats = None                                      # statistics of the requests in the format {'pending': int, 'acknowledged': int, 'unacknowledged': int, 'round_trip': ms, 'last_round_trip': ms}
+    __acknowledged = True                                       # if False, Looking Glass Bridge does not acknowledge SHOW commands and they are not waited for
+    __missed_acknowledgements = 0                               # number of consecutive SHOW commands, which were not acknowledged
+    __asynchronous = False                                      # if True, quilts are converted and sent by a background thread
+    __sender = None                                             # state of the background sender in the format {'condition': threading.Condition, 'frame': tuple or None, 'running': bool, 'due': float}
+    __pacing = None                                             # statistics of the sent frames in the format {'sent': int, 'dropped': int, 'fps': float, 'latency': ms, 'last_sent': float}
+    __pacing_lock = None                                        # lock which protects the statistics of the sent frames
+    __encoder = None                                            # CBOR encoder, whose buffer is reused for the messages with quilt bitmaps
+    __client_name = ""                                          # name under which the client is registered at Looking Glass Bridge
+    __quilt_cache = None                                        # quilts cached by Looking Glass Bridge in the format {(device index, cache key): name} (ordered from least to most recently used)
+    __quilt_cache_lock = None                                   # lock which protects the quilt cache
+    __quilt_cache_pending = None                                # quilts which are being uploaded to the cache in the format {name: ((device index, cache key), event)}
+    __quilt_cache_loading = None                                # number of SHOW commands of each cached quilt, which are being sent in the format {name: int}
+    __quilt_cache_stats = None                                  # statistics of the quilt cache in the format {'hits': int, 'misses': int, 'evictions': int}
+    __transport = None                                          # transport in which quilts are sent to Looking Glass Bridge
+    __transport_stats = None                                    # measured latencies of the transports in the format {shape: {'frames': int, 'candidates': {(transport, quality): {'encode': ms, 'send': ms, 'frames': int, 'last': int}}}}
+    __transport_lock = None                                     # lock which protects the transport statistics
+    __compress_buffers = None                                   # thread-local image arrays, into which the quilts are converted before they are compressed
+    __fanout_executor = None                                    # thread pool, which sends a quilt to several devices at once
+
+    # DEFINE PUBLIC CLASS ATTRIBUTES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # time between the connection attempts of a service, which connects in the
+    # background (in s)
+    reconnect_interval = 2.0
+
+    # time between two requests of the device poller (in s)
+    poll_interval = 1.0
+
+    # maximum number of frames per second sent by the background sender
+    # (if 0, the rate is only limited by the time required to send a frame)
+    max_fps = 0
+
+    # maximum number of quilts, which are cached by Looking Glass Bridge
+    # (if 0, quilts are never cached)
+    quilt_cache_size = 16
+
+    # compression level of PNG images (0 - 9) and quality of JPEG images (0 - 100)
+    png_compression = 1
+    jpeg_quality = 90
+
+    # JPEG qualities the adaptive transport chooses from (from highest to lowest)
+    adaptive_jpeg_qualities = [95, 85]
+
+    # number of frames after which the adaptive transport measures the least
+    # recently used transport again
+    adaptive_probe_interval = 30
+
+    # relative latency by which a transport of lower fidelity must be faster to
+    # be chosen by the adaptive transport
+    adaptive_tolerance = 0.1
+
+    # time to wait for the acknowledgement of a SHOW command (in ms) and number
+    # of consecutive missed acknowledgements after which SHOW commands are not
+    # waited for anymore
+    acknowledge_timeout = 1000
+    max_missed_acknowledgements = 3
 
     # Error
     ###################
@@ -78,10 +150,88 @@ class LookingGlassBridge(BaseServiceType):
         CLIERR_PIPEERROR = 8
         CLIERR_APPNOTINITIALIZED = 9
 
+    #   Enum definition for the error messages included in a successful reply
+    #   from Looking Glass Bridge.
+    class service_error(Enum):
+        ERR_NOERROR = 0
+        ERR_BADCBOR = 1
+        ERR_BADCOMMAND = 2
+        ERR_NOIMAGE = 3
+        ERR_LKGNOTFOUND = 4
+        ERR_NOTINCACHE = 5
+        ERR_INITTOOLATE = 6
+        ERR_NOTALLOWED = 7
+
+    # Transport
+    ###################
+    #   Enum definition for the formats in which the quilts are sent to
+    #   Looking Glass Bridge.
+    class transports(Enum):
+        raw = 1                 # uncompressed BITMAP (no encoding, but the largest message)
+        png = 2                 # PNG image (lossless)
+        jpeg = 3                # JPEG image (lossy)
+        adaptive = 4            # the transport with the lowest measured latency
+
+        @classmethod
+        def to_list(cls):
+            return list(map(lambda enum: enum, cls))
+
+        @classmethod
+        def is_valid(cls, value):
+            ''' check if a given value is a member of this class '''
+            return (value in cls.to_list())
+
     # INSTANCE METHODS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-    def __init__(self, timeout = 5000, client_name = ""):
+    def __init__(self, timeout = 5000, client_name = "", address = None, blocking = True):
         ''' initialize the class instance and create the NNG socket '''
+        ''' if an address is given, the service connects to it instead of the default address of Looking Glass Bridge (e.g., to connect to an emulator) '''
+        ''' if blocking is False, the service connects and requests the devices in a background thread until Looking Glass Bridge answers '''
+
+        if address: self.__address = address
+
+        # the service is ready, when it is connected and initialized
+        self.__devices = []
+        self.__ready = threading.Event()
+        self.__ready_callbacks = []
+        self.__ready_lock = threading.Lock()
+        self.__stop_connecting = threading.Event()
+
+        # the derived calibration values are only calculated if the calibration
+        # of a device changed
+        self.__calibrations = {}
+        self.__calibrations_lock = threading.Lock()
+        self.__poller = {'thread': None, 'stop': None}
+        self.__devices_callbacks = []
+
+        # the socket is shared by the calling thread, the background sender and
+        # the asyncio methods, which use their own NNG context for each request
+        self.__timeout = timeout
+        self.__contexts = []
+        self.__contexts_lock = threading.Lock()
+        self.__request_stats = {'pending': 0, 'acknowledged': 0, 'unacknowledged': 0, 'round_trip': None, 'last_round_trip': None}
+
+        # statistics of the sent frames
+        self.__pacing = {'sent': 0, 'dropped': 0, 'fps': 0.0, 'latency': None, 'last_sent': None}
+        self.__pacing_lock = threading.Lock()
+
+        # CBOR encoder of this service
+        self.__encoder = cbor.CBOREncoder()
+        self.__encoder_lock = threading.Lock()
+
+        # quilts cached by Looking Glass Bridge
+        self.__client_name = client_name
+        self.__quilt_cache = collections.OrderedDict()
+        self.__quilt_cache_lock = threading.Lock()
+        self.__quilt_cache_pending = {}
+        self.__quilt_cache_loading = collections.Counter()
+        self.__quilt_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        # transport of the quilts
+        self.__transport = self.transports.raw
+        self.__transport_stats = {}
+        self.__transport_lock = threading.Lock()
+        self.__compress_buffers = threading.local()
 
         # open a Req0 socket
         self.__socket = pynng.Req0(recv_timeout = timeout, send_timeout = timeout)
@@ -91,29 +241,42 @@ class LookingGlassBridge(BaseServiceType):
 
             logger.info("Created socket: %s" % self.__socket)
 
-            # connect to Looking Glass Bridge App
-            if self.__connect():
+            # connect to Looking Glass Bridge App in a background thread
+            # NOTE: Only a weak reference to the service is kept by the thread,
+            #       so that the service can still be deleted
+            if not blocking:
 
-                # send initialization command
-                response = self.__send_message(self.__init(client_name))
-                if response != None:
+                threading.Thread(target=LookingGlassBridge.__connect_loop, args=(weakref.ref(self), self.__stop_connecting, self.reconnect_interval), name='pyLightIO-connect', daemon=True).start()
 
-                    # if no error was received
-                    if response[1]['error'] == 0:
+                logger.info("Connecting to Looking Glass Bridge in the background ...")
 
-                        # fill version string of the Looking Glass Bridge
-                        self.version = response[1]['version']
+            # otherwise connect to Looking Glass Bridge App
+            elif self.__connect():
 
-                # log info
-                logger.info("Connected to Looking Glass Bridge v%s." % self.get_version())
+                self.__initialize()
 
     def is_ready(self):
         ''' check if the service is ready: Is NNG socket created and connected to Looking Glass Bridge App? '''
-        if self.__is_connected():
+        if self.__ready.is_set() and self.__is_connected():
             return True
 
         return False
 
+    def wait_until_ready(self, timeout = None):
+        ''' wait until the service is ready and return True if that happened before the timeout (in s) '''
+        return self.__ready.wait(timeout) and self.is_ready()
+
+    def add_ready_callback(self, callback):
+        ''' call the given function with the service as argument, when the service is ready (immediately, if it is ready already) '''
+        ''' NOTE: The function is called from the thread, which connected the service '''
+
+        with self.__ready_lock:
+            if not self.__ready.is_set():
+                self.__ready_callbacks.append(callback)
+                return
+
+        callback(self)
+
     def get_version(self):
         ''' return the looking glass bridge version '''
 
@@ -140,30 +303,63 @@ class LookingGlassBridge(BaseServiceType):
         if self.is_ready():
 
             # request calibration data
-            response = self.__send_message(self.__get_devices())
-            if response != None:
+            devices = self.__parse_devices(self.__send_message(self.__get_devices()))
+            if devices is not None: self.__devices = devices
 
-                # if no errors were received
-                if response[1]['error'] == 0:
+            return devices
 
-                    # get the list of devices with status "ok"
-                    devices = [device for device in response[1]['devices'] if device['state'] == "ok"]
+    def start_polling(self, interval = None):
+        ''' request the devices in a background thread every interval (in s) and notify the devices callbacks, if they changed '''
 
-                    # iterate through all devices
-                    for device in devices:
+        # stop the running poller first
+        self.stop_polling()
+
+        if interval is not None: self.poll_interval = interval
+
+        # NOTE: Only a weak reference to the service is kept by the thread,
+        #       so that the service can still be deleted
+        self.__poller['stop'] = threading.Event()
+        self.__poller['thread'] = threading.Thread(target=LookingGlassBridge.__poll_loop, args=(weakref.ref(self), self.__poller['stop']), name='pyLightIO-poll', daemon=True)
+        self.__poller['thread'].start()
+
+        logger.info("Polling the devices of '%s' every %.1f s." % (self, self.poll_interval))
+
+    def stop_polling(self):
+        ''' stop the background thread, which requests the devices '''
+
+        if self.__poller['thread']:
+            self.__poller['stop'].set()
+            self.__poller['thread'] = None
+
+            logger.info("Stopped polling the devices of '%s'." % self)
+
+    def add_devices_callback(self, callback):
+        ''' call the given function with the service and the devices, when the device poller detects a change '''
+        ''' NOTE: The function is called from the thread of the device poller '''
+        if not callback in self.__devices_callbacks: self.__devices_callbacks.append(callback)
 
-                        # parse odd value-object format from calibration json
-                        device['calibration'].update({key: value['value'] if isinstance(value, dict) else value for (key, value) in device['calibration'].items()})
+    def remove_devices_callback(self, callback):
+        ''' remove a function, which was added by add_devices_callback() '''
+        if callback in self.__devices_callbacks: self.__devices_callbacks.remove(callback)
 
-                        # calculate the derived values (e.g., tilt, pich, etc.)
-                        device['calibration'].update(self.__calculate_derived(device['calibration']))
+    @staticmethod
+    def calculate_derived(calibration):
+        ''' calculate the values derived from the calibration json delivered by Looking Glass Bridge '''
+        ''' NOTE: The received values are replaced (e.g., the pitch) '''
 
-                        # return the device list
-                        return devices
+        calibration['aspect'] = calibration['screenW'] / calibration['screenH']
+        calibration['tilt'] = calibration['screenH'] / (calibration['screenW'] * calibration['slope'])
+        calibration['pitch'] = - calibration['screenW'] / calibration['DPI']  * calibration['pitch']  * math.sin(math.atan(abs(calibration['slope'])))
+        calibration['subp'] = calibration['pitch'] / (3 * calibration['screenW'])
+        calibration['ri'], calibration['bi'] = (2,0) if calibration['flipSubp'] else (0,2)
+        calibration['fringe'] = 0.0
+
+        return calibration
 
-    def display(self, device, lightfield, flip_views=False, aspect=None, invert=False, custom_decoder = None):
+    def display(self, device, lightfield, flip_views=False, aspect=None, invert=False, custom_decoder = None, cache_key = None):
         ''' display a given lightfield image object on a device '''
         ''' Looking Glass Bridge expects a lightfield image in LookingGlassQuilt format '''
+        ''' if a cache key is given (or True to use the hash of the views), the quilt is cached by Looking Glass Bridge and shown from the cache next time '''
 
         logger.info("Preparing lightfield image '%s' for display on '%s' ..." % (lightfield, device))
 
@@ -175,63 +371,226 @@ class LookingGlassBridge(BaseServiceType):
 
                 # convert the lightfield into a suitable format for this service
                 # NOTE: Looking Glass Bridge expects a byte stream
-                start = time.time()
                 decoded_lightfield_data = lightfield.decode(self.__decoder_format, flip_views=flip_views, custom_decoder=custom_decoder)
 
                 # lightfield is decoded as numpy array
                 if self.__decoder_format == LightfieldImage.decoderformat.numpyarray and type(decoded_lightfield_data) == np.ndarray:
 
-                    # flip the individual views vertically, if required
-                    start = time.time()
-                    if flip_views:
-                        merged_numpy = lightfield.merged_numpy.view()[:, ::-1, :, :, :]
+                    # parse the quilt metadata
+                    settings = {'vx': lightfield.metadata['columns'], 'vy':lightfield.metadata['rows'], 'vtotal': lightfield.metadata['rows'] * lightfield.metadata['columns'], 'aspect': aspect, 'invert': invert}
 
-                        logger.debug(" [#] Flipping the numpy array of shape %s took %.3f ms." % (merged_numpy.shape, (time.time() - start) * 1000))
-                        start = time.time()
-                    else:
-                        merged_numpy = lightfield.merged_numpy.view()
+                    # if the quilt is sent by the background sender
+                    if self.asynchronous:
 
-                    # convert BGR(A) <-> RGB on little-endian systems to make the
-                    # data in the numpy buffer comply with the BITMAP file format
-                    # specifications
-                    start = time.time()
-                    if sys.byteorder == "little":
+                        # replace the pending frame (if any) by this frame
+                        # NOTE: The revision of the views is stored to detect
+                        #       frames, which were modified before they were sent
+                        with self.__sender['condition']:
+
+                            if self.__sender['frame'] is not None:
+                                self.__track_frame(False)
+                                logger.debug(" [#] Dropped stale lightfield image '%s', which was not sent yet." % self.__sender['frame'][1])
+
+                            self.__sender['frame'] = ([(device.configuration['index'], settings, None)], lightfield, flip_views, lightfield.views_revision, cache_key)
+                            self.__sender['condition'].notify()
+
+                        logger.info(" [#] Lightfield image was queued for '%s' (total time: %.3f ms)." % (self, (time.time() - start_total) * 1000))
+
+                        return True
+
+                    # otherwise pass the quilt to the device
+                    self.__track_frame(self.__send_quilt([(device.configuration['index'], settings, None)], lightfield, flip_views, cache_key=cache_key), start_total)
+                    logger.info(" [#] Done (total time: %.3f ms)." % ((time.time() - start_total) * 1000))
+
+                    return True
+
+                raise TypeError("The '%s' expected lightfield data conversion to %s, but %s was passed." % (self, np.ndarray, type(decoded_lightfield_data)))
+
+            # otherwise show the demo quilt
+            else:
+
+                # pass the quilt to the device
+                logger.info(" [#] Display of demo quilt is requested for '%s' ..." % self)
+                self.__send_message(self.__show_demo(device.configuration['index']))
+                logger.info(" [#] Done.")
+
+                return True
+
+        raise RuntimeError("The '%s' is not ready. Is Looking Glass Bridge app running?" % (self))
 
-                        if lightfield.colorchannels == 3:
+    def display_multiple(self, devices, lightfield, flip_views=False, aspect=None, invert=None, custom_decoder = None, cache_key = None):
+        ''' display a given lightfield image object on several devices at once '''
+        ''' the lightfield is decoded and converted only once and then sent to all devices concurrently '''
+        ''' if no aspect ratio or invert flag is given, the values from the calibration of each device are used '''
 
-                            bytes = cv2.cvtColor(merged_numpy.reshape(lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], lightfield.colorchannels), cv2.COLOR_BGR2RGB)
+        logger.info("Preparing lightfield image '%s' for display on %i devices ..." % (lightfield, len(devices)))
 
-                            logger.debug(" [#] Converting from BGR to RGB took %.3f ms." % ((time.time() - start) * 1000))
+        # if the service is ready
+        if self.is_ready():
+            start_total = time.time()
 
-                        elif lightfield.colorchannels == 4:
+            # if a lightfield was given
+            if lightfield != None:
 
-                            bytes = cv2.cvtColor(merged_numpy.reshape(lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], lightfield.colorchannels), cv2.COLOR_BGRA2RGB)
+                # convert the lightfield into a suitable format for this service
+                decoded_lightfield_data = lightfield.decode(self.__decoder_format, flip_views=flip_views, custom_decoder=custom_decoder)
 
-                            logger.debug(" [#] Converting from BGRA to RGB took %.3f ms." % ((time.time() - start) * 1000))
+                # lightfield is decoded as numpy array
+                if self.__decoder_format == LightfieldImage.decoderformat.numpyarray and type(decoded_lightfield_data) == np.ndarray:
+
+                    # parse the quilt metadata for each device
+                    targets = []
+                    for device in devices:
+                        settings = {'vx': lightfield.metadata['columns'], 'vy':lightfield.metadata['rows'], 'vtotal': lightfield.metadata['rows'] * lightfield.metadata['columns'], 'aspect': aspect if aspect else device.configuration['calibration']['aspect'], 'invert': invert if invert is not None else device.configuration['calibration']['invView']}
+                        targets.append((device.configuration['index'], settings, self.__get_view_size(device, lightfield)))
 
-                    elif not sys.byteorder == "little" and lightfield.colorchannels == 4:
+                    # if the quilt is sent by the background sender
+                    if self.asynchronous:
 
-                        # TODO: Actually we would not need this, if we could
-                        #       read in RGB mode to gpu.types.Buffer, but we can't
-                        #       due to a Blender bug / limitation:
-                        #
-                        #       https://developer.blender.org/T91828
-                        bytes = cv2.cvtColor(merged_numpy.reshape(lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], lightfield.colorchannels), cv2.COLOR_RGBA2RGB)
+                        # replace the pending frame (if any) by this frame
+                        with self.__sender['condition']:
 
-                        logger.debug(" [#] Converting from RGBA to RGB took %.3f ms." % ((time.time() - start) * 1000))
+                            if self.__sender['frame'] is not None:
+                                self.__track_frame(False)
+                                logger.debug(" [#] Dropped stale lightfield image '%s', which was not sent yet." % self.__sender['frame'][1])
 
-                    else:
+                            self.__sender['frame'] = (targets, lightfield, flip_views, lightfield.views_revision, cache_key)
+                            self.__sender['condition'].notify()
+
+                        logger.info(" [#] Lightfield image was queued for '%s' (total time: %.3f ms)." % (self, (time.time() - start_total) * 1000))
 
-                        bytes = merged_numpy.reshape(lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], lightfield.colorchannels)
+                        return True
 
-                        logger.debug(" [#] Reading bytes from %s took %.3f ms." % (type(bytes), (time.time() - start) * 1000))
+                    # otherwise pass the quilt to the devices
+                    self.__track_frame(self.__send_quilt(targets, lightfield, flip_views, cache_key=cache_key), start_total)
+                    logger.info(" [#] Done (total time: %.3f ms)." % ((time.time() - start_total) * 1000))
+
+                    return True
+
+                raise TypeError("The '%s' expected lightfield data conversion to %s, but %s was passed." % (self, np.ndarray, type(decoded_lightfield_data)))
+
+            # otherwise show the demo quilt
+            else:
+
+                # pass the quilt to the devices
+                logger.info(" [#] Display of demo quilt is requested for '%s' ..." % self)
+                for future in [self.__get_fanout_executor().submit(self.__send_message, self.__show_demo(device.configuration['index'])) for device in devices]: future.result()
+                logger.info(" [#] Done.")
+
+                return True
+
+        raise RuntimeError("The '%s' is not ready. Is Looking Glass Bridge app running?" % (self))
+
+    def clear(self, device):
+        ''' clear the display of a given device '''
+
+        # if the service is ready
+        if self.is_ready():
+
+            # clear the display
+            if self.__send_message(self.__hide(device.configuration['index'])):
+
+                return True
+
+        raise RuntimeError("The '%s' is not ready. Is Looking Glass Bridge app running?" % (self))
+
+    def clear_quilt_cache(self):
+        ''' forget all quilts cached by Looking Glass Bridge (they are uploaded again when displayed the next time) '''
+        with self.__quilt_cache_lock:
+            self.__quilt_cache.clear()
+
+    def is_frame_due(self):
+        ''' check if a frame passed to display() now would be sent and not replaced by a later frame before '''
+        ''' callers can use this to skip rendering frames, which would be dropped anyway '''
+
+        # frames are always sent, if the background sender is not used
+        if not self.asynchronous: return True
+
+        # NOTE: A frame is due, if no frame is waiting to be sent and the
+        #       minimum interval since the last frame has passed. The frame
+        #       which is being sent meanwhile does not matter, since the next
+        #       frame can be prepared while it is sent.
+        with self.__sender['condition']:
+            return self.__sender['frame'] is None and time.time() >= self.__sender['due']
+
+    # ASYNCIO INSTANCE METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # NOTE: These coroutines are the asyncio counterparts of the methods above.
+    #       They use the same socket, so requests are still processed one after
+    #       another, but the event loop is not blocked while waiting.
+    async def async_get_devices(self):
+        ''' send a request to the service and request the connected devices '''
+
+        # if the service is ready
+        if self.is_ready():
+
+            # request calibration data
+            return self.__parse_devices(await self.__async_send_message(self.__get_devices()))
+
+    async def async_display(self, device, lightfield, flip_views=False, aspect=None, invert=False, custom_decoder = None, cache_key = None):
+        ''' display a given lightfield image object on a device '''
+
+        logger.info("Preparing lightfield image '%s' for asynchronous display on '%s' ..." % (lightfield, device))
+
+        # if the service is ready
+        if self.is_ready():
+            start_total = time.time()
+            loop = asyncio.get_running_loop()
+
+            # if a lightfield was given
+            if lightfield != None:
+
+                # convert the lightfield into a suitable format for this service
+                decoded_lightfield_data = lightfield.decode(self.__decoder_format, flip_views=flip_views, custom_decoder=custom_decoder)
+
+                # lightfield is decoded as numpy array
+                if self.__decoder_format == LightfieldImage.decoderformat.numpyarray and type(decoded_lightfield_data) == np.ndarray:
 
                     # parse the quilt metadata
                     settings = {'vx': lightfield.metadata['columns'], 'vy':lightfield.metadata['rows'], 'vtotal': lightfield.metadata['rows'] * lightfield.metadata['columns'], 'aspect': aspect, 'invert': invert}
 
+                    # if the quilt shall be cached by Looking Glass Bridge
+                    if cache_key and self.quilt_cache_size > 0:
+
+                        # upload the quilt to the cache, if it is not cached yet
+                        name, cached = await loop.run_in_executor(None, self.__get_cached_quilt, device.configuration['index'], lightfield, flip_views, cache_key)
+                        if name is not None and not cached:
+                            response = None
+                            try:
+                                response = await self.__async_send_message(self.__cache_quilt(device.configuration['index'], functools.partial(self.__convert_quilt, lightfield, flip_views), name, settings), image_shape=(lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], 3))
+                            finally:
+                                cached = self.__check_cached_quilt(name, response)
+
+                        # show the cached quilt
+                        # NOTE: If it is not in the cache anymore, it is sent as usual
+                        if cached:
+                            try:
+                                response = await self.__async_send_message(self.__load_quilt(device.configuration['index'], name, settings))
+                            finally:
+                                self.__release_cached_quilt(name)
+
+                            if self.__check_loaded_quilt(name, response):
+                                logger.info(" [#] Done (total time: %.3f ms)." % ((time.time() - start_total) * 1000))
+
+                                return True
+
                     # pass the quilt to the device
-                    logger.info(" [#] Lightfield image with shape %s is being sent to '%s'." % (bytes.shape, self))
-                    self.__send_message(self.__show_quilt(device.configuration['index'], bytes, settings), image_shape=(lightfield.metadata['quilt_height'],lightfield.metadata['quilt_width'], 3))
+                    # NOTE: The quilt is converted (and compressed) in a worker
+                    #       thread while the message is serialized
+                    shape = (lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], 3)
+                    transport, quality = self.__select_transport(shape)
+                    timing = {}
+
+                    logger.info(" [#] Lightfield image with shape %s is being sent to '%s' as %s." % (shape, self, transport.name.upper()))
+                    if transport == self.transports.raw:
+                        await self.__async_send_message(self.__show_quilt(device.configuration['index'], functools.partial(self.__convert_quilt, lightfield, flip_views), settings), image_shape=shape, timing=timing)
+                    else:
+                        start = time.time()
+                        bindata = await loop.run_in_executor(None, self.__compress_quilt, lightfield, flip_views, transport, quality)
+                        timing['encode'] = (time.time() - start) * 1000
+                        await self.__async_send_message(self.__show_quilt(device.configuration['index'], bindata, settings), timing=timing)
+
+                    self.__update_transport_stats(shape, (transport, quality), timing)
                     logger.info(" [#] Done (total time: %.3f ms)." % ((time.time() - start_total) * 1000))
 
                     return True
@@ -243,21 +602,21 @@ class LookingGlassBridge(BaseServiceType):
 
                 # pass the quilt to the device
                 logger.info(" [#] Display of demo quilt is requested for '%s' ..." % self)
-                self.__send_message(self.__show_demo(device.configuration['index']))
+                await self.__async_send_message(self.__show_demo(device.configuration['index']))
                 logger.info(" [#] Done.")
 
                 return True
 
         raise RuntimeError("The '%s' is not ready. Is Looking Glass Bridge app running?" % (self))
 
-    def clear(self, device):
+    async def async_clear(self, device):
         ''' clear the display of a given device '''
 
         # if the service is ready
         if self.is_ready():
 
             # clear the display
-            if self.__send_message(self.__hide(device.configuration['index'])):
+            if await self.__async_send_message(self.__hide(device.configuration['index'])):
 
                 return True
 
@@ -265,12 +624,25 @@ class LookingGlassBridge(BaseServiceType):
 
     def __del__(self):
         ''' disconnect from Looking Glass Bridge App and close NNG socket '''
+
+        # stop the background sender, the connection attempts and the poller
+        self.asynchronous = False
+        if self.__stop_connecting: self.__stop_connecting.set()
+        if self.__poller: self.stop_polling()
+
+        # stop the threads of the fan-out
+        if self.__fanout_executor: self.__fanout_executor.shutdown(wait=False)
+
         if self.__is_connected():
 
             # disconnect and close socket
             self.__disconnect()
             self.__close()
 
+        # close the socket of a service, which never connected
+        elif self.__is_socket():
+            self.__close()
+
     # PRIVATE INSTANCE METHODS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     # NOTE: Here is the place to define internal functions required only for this
@@ -316,6 +688,47 @@ class LookingGlassBridge(BaseServiceType):
         logger.info("Already connected to Looking Glass Bridge v%s." % self.get_version())
         return True
 
+    def __initialize(self, discover = False):
+        ''' register the client at Looking Glass Bridge and mark the service as ready '''
+        ''' if discover is True, the devices are requested too '''
+
+        try:
+
+            # send initialization command
+            response = self.__send_message(self.__init(self.__client_name))
+            if response != None:
+
+                # if no error was received
+                if response[1]['error'] == 0:
+
+                    # fill version string of the Looking Glass Bridge
+                    self.version = response[1]['version']
+
+            # log info
+            logger.info("Connected to Looking Glass Bridge v%s." % self.get_version())
+
+            # request the devices
+            if discover:
+                devices = self.__parse_devices(self.__send_message(self.__get_devices()))
+                if devices is not None: self.__devices = devices
+
+                logger.info("Found %i devices connected to Looking Glass Bridge." % len(self.__devices))
+
+        except pynng.exceptions.NNGException as e:
+
+            logger.error("Could not initialize the connection to Looking Glass Bridge: %s" % e)
+
+        # mark the service as ready and call the waiting functions
+        with self.__ready_lock:
+            self.__ready.set()
+            callbacks, self.__ready_callbacks = self.__ready_callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error("A ready callback of '%s' failed: %s" % (self.name, e))
+
     def __disconnect(self):
         ''' disconnect from looking glass bridge '''
 
@@ -335,61 +748,866 @@ class LookingGlassBridge(BaseServiceType):
 
         # Close socket and reset status variable
         if self.__is_socket():
+
+            # close the idle contexts first
+            # NOTE: A context, which is closed after its socket, raises an error
+            with self.__contexts_lock:
+                for context in self.__contexts:
+                    try:
+                        context.close()
+                    except pynng.exceptions.Closed:
+                        pass
+                self.__contexts.clear()
+
             self.__socket.close()
 
             # reset state variables
             self.__socket = None
             self.__dialer = None
             self.version = ""
+            self.__ready.clear()
+
+    def __track_frame(self, sent, start=None):
+        ''' count a sent or dropped frame and update the achieved frame rate and the latency '''
+
+        with self.__pacing_lock:
+
+            if not sent:
+                self.__pacing['dropped'] += 1
+                return
+
+            now = time.time()
+            self.__pacing['sent'] += 1
+
+            # use exponential moving averages for the latency and frame rate
+            # NOTE: Pauses of more than a second (e.g., no updates of the
+            #       viewport) are not counted for the frame rate
+            if start is not None:
+                latency = (now - start) * 1000
+                self.__pacing['latency'] = latency if self.__pacing['latency'] is None else self.__pacing['latency'] + 0.25 * (latency - self.__pacing['latency'])
+
+            if self.__pacing['last_sent'] is not None and now - self.__pacing['last_sent'] < 1.0:
+                fps = 1.0 / max(now - self.__pacing['last_sent'], 1e-6)
+                self.__pacing['fps'] = fps if not self.__pacing['fps'] else self.__pacing['fps'] + 0.25 * (fps - self.__pacing['fps'])
+
+            self.__pacing['last_sent'] = now
+
+    def __send_quilt(self, targets, lightfield, flip_views, views_revision=None, cache_key=None):
+        ''' convert the view stack of the lightfield into the quilt bitmap and send it to Looking Glass Bridge '''
+        ''' the targets are given as list of (device index, settings, view size) tuples, where the view size is None or the (view_height, view_width) to which the views are resampled '''
+
+        # if the views were modified while the quilt was converted, the quilt
+        # might contain views of different frames
+        # NOTE: The caller displays the lightfield again after the views were
+        #       updated, so the frame can be dropped
+        validate = None
+        if views_revision is not None: validate = lambda: views_revision == lightfield.views_revision
+
+        shape = (lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], 3)
+
+        # if the quilt is sent to a single device without resampling
+        # NOTE: The quilt is converted while the message is serialized, so that
+        #       the pixels are written directly into the frame buffer
+        if len(targets) == 1 and targets[0][2] is None:
+            return self.__send_quilt_to(targets[0][0], targets[0][1], shape, functools.partial(self.__convert_quilt, lightfield, flip_views), functools.partial(self.__compress_quilt, lightfield, flip_views), lightfield, flip_views, validate, cache_key)
+
+        # otherwise the quilt is converted once and resampled once for each
+        # view size, which is required by the devices
+        start = time.time()
+
+        bitmaps = {None: np.empty(shape, dtype=np.uint8)}
+        self.__convert_quilt(lightfield, flip_views, bitmaps[None])
+        for view_size in set(target[2] for target in targets) - set([None]):
+            bitmaps[view_size] = self.__resample_bitmap(bitmaps[None], lightfield.metadata['rows'], lightfield.metadata['columns'], view_size)
+
+        # each compressed image is shared by the devices, which use it
+        compress = {view_size: functools.lru_cache(maxsize=None)(functools.partial(self.__compress_bitmap, bitmap)) for view_size, bitmap in bitmaps.items()}
+
+        # the view stack is hashed only once
+        if cache_key is True and self.quilt_cache_size > 0: cache_key = self.__hash_quilt(lightfield, flip_views)
+
+        logger.debug(" [#] Preparing the quilt for %i devices took %.3f ms." % (len(targets), (time.time() - start) * 1000))
+
+        # send the quilt to all devices concurrently
+        # NOTE: The devices acknowledge the quilts in parallel, so the total
+        #       latency is close to that of the slowest device
+        futures = [self.__get_fanout_executor().submit(self.__send_quilt_to, dev_index, settings, bitmaps[view_size].shape, bitmaps[view_size], compress[view_size], lightfield, flip_views, validate, cache_key) for dev_index, settings, view_size in targets]
+
+        return all([future.result() for future in futures])
+
+    def __send_quilt_to(self, dev_index, settings, shape, bitmap, compress, lightfield, flip_views, validate=None, cache_key=None):
+        ''' send the quilt bitmap (or a function, which writes it into the given array) to the given device '''
+
+        # if the quilt shall be cached by Looking Glass Bridge
+        if cache_key and self.quilt_cache_size > 0:
+
+            # upload the quilt to the cache, if it is not cached yet
+            name, cached = self.__get_cached_quilt(dev_index, lightfield, flip_views, cache_key)
+            if name is not None and not cached:
+                response = None
+                try:
+                    response = self.__send_message(self.__cache_quilt(dev_index, bitmap, name, settings), image_shape=shape, validate=validate)
+                finally:
+                    cached = self.__check_cached_quilt(name, response)
+
+                if response is False:
+                    logger.debug(" [#] Dropped lightfield image '%s', which was modified before it was sent." % lightfield)
+                    return False
+
+            # show the cached quilt
+            # NOTE: If it is not in the cache anymore, it is sent as usual
+            if cached:
+                try:
+                    response = self.__send_message(self.__load_quilt(dev_index, name, settings))
+                finally:
+                    self.__release_cached_quilt(name)
+
+                if self.__check_loaded_quilt(name, response):
+                    return True
+
+        # pass the quilt to the device
+        transport, quality = self.__select_transport(shape)
+        timing = {}
+
+        logger.info(" [#] Lightfield image with shape %s is being sent to '%s' as %s." % (shape, self, transport.name.upper()))
+        if transport == self.transports.raw:
+
+            response = self.__send_message(self.__show_quilt(dev_index, bitmap, settings), image_shape=shape, validate=validate, timing=timing)
+
+        else:
+
+            # NOTE: If the background sender is used, the quilt is compressed
+            #       in its thread
+            start = time.time()
+            bindata = compress(transport, quality)
+            timing['encode'] = (time.time() - start) * 1000
+
+            response = self.__send_message(self.__show_quilt(dev_index, bindata, settings), validate=validate, timing=timing)
+
+        if response is False:
+            logger.debug(" [#] Dropped lightfield image '%s', which was modified before it was sent." % lightfield)
+            return False
+
+        self.__update_transport_stats(shape, (transport, quality), timing)
+
+        return True
+
+    def __get_view_size(self, device, lightfield):
+        ''' return the view size to which the quilt is resampled for the given device or None, if it is not resampled '''
 
-    def __send_message(self, input_object, image_shape=None):
-        ''' send a message to Looking Glass Bridge '''
+        # the quilt is downscaled to the default quilt of the device, if it is
+        # larger (the number of views is not changed)
+        try:
+            scale = min(device.defaultQuilt['quiltX'] / lightfield.metadata['quilt_width'], device.defaultQuilt['quiltY'] / lightfield.metadata['quilt_height'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+        if scale >= 1.0: return None
+
+        return (max(int(lightfield.metadata['view_height'] * scale), 1), max(int(lightfield.metadata['view_width'] * scale), 1))
+
+    def __resample_bitmap(self, bitmap, rows, columns, view_size):
+        ''' resample each view of the quilt bitmap to the given (view_height, view_width) '''
+
+        start = time.time()
+
+        view_height, view_width = bitmap.shape[0] // rows, bitmap.shape[1] // columns
+        resampled = np.empty((rows * view_size[0], columns * view_size[1], 3), dtype=np.uint8)
+
+        # NOTE: The views are resampled one by one, so that the pixels at their
+        #       borders are not mixed with those of the neighbouring views
+        for row in range(rows):
+            for column in range(columns):
+                cv2.resize(bitmap[row * view_height:(row + 1) * view_height, column * view_width:(column + 1) * view_width], (view_size[1], view_size[0]), dst=resampled[row * view_size[0]:(row + 1) * view_size[0], column * view_size[1]:(column + 1) * view_size[1]], interpolation=cv2.INTER_AREA)
+
+        logger.debug(" [#] Resampling the quilt bitmap of shape %s to the view size %s took %.3f ms." % (bitmap.shape, view_size, (time.time() - start) * 1000))
+
+        return resampled
+
+    def __get_fanout_executor(self):
+        ''' return the thread pool, which sends the quilts to several devices at once '''
+        if self.__fanout_executor is None:
+            self.__fanout_executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='pyLightIO-fanout')
+
+        return self.__fanout_executor
+
+    def __hash_quilt(self, lightfield, flip_views):
+        ''' return the hash of the view stack of the lightfield '''
+
+        start = time.time()
+
+        hash = hashlib.blake2b(repr((lightfield.merged_numpy.shape, flip_views)).encode('utf-8'), digest_size=16)
+        hash.update(np.ascontiguousarray(lightfield.merged_numpy).data)
+
+        logger.debug(" [#] Hashing the view stack of shape %s took %.3f ms." % (lightfield.merged_numpy.shape, (time.time() - start) * 1000))
+
+        return hash.hexdigest()
+
+    def __get_cached_quilt(self, dev_index, lightfield, flip_views, cache_key):
+        ''' return the name of the quilt in the cache of Looking Glass Bridge and whether it was cached already '''
+        ''' if it was cached, the name is reserved until __release_cached_quilt() is called, otherwise until __check_cached_quilt() is called '''
+        ''' if the name is None, the quilt can not be cached now '''
+
+        # use the hash of the view stack as key, if no key was given
+        if cache_key is True: cache_key = self.__hash_quilt(lightfield, flip_views)
+        key = (dev_index, cache_key)
+
+        with self.__quilt_cache_lock:
+
+            # if the quilt is being uploaded by another request, wait until
+            # the upload is finished
+            # NOTE: This happens outside of the lock
+            pending = [event for pending_key, event in self.__quilt_cache_pending.values() if pending_key == key]
+
+        if pending and not pending[0].wait(self.__timeout / 1000): return None, False
+
+        with self.__quilt_cache_lock:
+
+            # if the quilt is cached, mark it as most recently used
+            if key in self.__quilt_cache:
+                self.__quilt_cache.move_to_end(key)
+                self.__quilt_cache_stats['hits'] += 1
+                self.__quilt_cache_loading[self.__quilt_cache[key]] += 1
+
+                logger.info(" [#] Quilt '%s' is in the cache of '%s' (%s)." % (cache_key, self, self.__quilt_cache[key]))
+
+                return self.__quilt_cache[key], True
+
+            # if another request started to upload the quilt in the meantime,
+            # it is sent as usual
+            if any(pending_key == key for pending_key, event in self.__quilt_cache_pending.values()): return None, False
+
+            self.__quilt_cache_stats['misses'] += 1
+
+            # the names are reused, so that Looking Glass Bridge overwrites the
+            # evicted quilts and never caches more than quilt_cache_size quilts
+            names = set(self.__quilt_cache.values()) | set(self.__quilt_cache_pending.keys())
+            free = [index for index in range(self.quilt_cache_size) if not "%s_quilt_%i" % (self.__client_name, index) in names]
+            if free:
+                name = "%s_quilt_%i" % (self.__client_name, free[0])
+
+            # evict the least recently used quilt, if the cache is full
+            # NOTE: Quilts which are being shown can not be evicted, since
+            #       Looking Glass Bridge would show the new quilt instead
+            else:
+                evicted = next((cached_key for cached_key, cached_name in self.__quilt_cache.items() if not self.__quilt_cache_loading[cached_name]), None)
+                if evicted is None: return None, False
+
+                name = self.__quilt_cache.pop(evicted)
+                self.__quilt_cache_stats['evictions'] += 1
+
+                logger.info(" [#] Evicted quilt '%s' from the cache of '%s' (%s)." % (evicted[1], self, name))
+
+            # reserve the name until the quilt was uploaded
+            self.__quilt_cache_pending[name] = (key, threading.Event())
+
+            return name, False
+
+    def __check_cached_quilt(self, name, response):
+        ''' check the response to the CACHE command and add the quilt to the cache, if it was cached '''
+        ''' if it was cached, the name is reserved until __release_cached_quilt() is called '''
+
+        # if no error was received, the quilt can be shown from the cache
+        cached = bool(response and response[1]['error'] == 0)
+
+        with self.__quilt_cache_lock:
+
+            key, event = self.__quilt_cache_pending.pop(name)
+            if cached:
+                self.__quilt_cache[key] = name
+                self.__quilt_cache_loading[name] += 1
+
+        # wake up the requests, which wait for this quilt
+        event.set()
+
+        # otherwise the quilt is sent as usual
+        if not cached and response is not False: logger.warning("Looking Glass Bridge could not cache the quilt '%s'." % name)
+
+        return cached
+
+    def __release_cached_quilt(self, name):
+        ''' release the reservation of a cached quilt after it was shown '''
+        with self.__quilt_cache_lock:
+            self.__quilt_cache_loading[name] -= 1
+            if self.__quilt_cache_loading[name] <= 0: del self.__quilt_cache_loading[name]
+
+    def __check_loaded_quilt(self, name, response):
+        ''' check the response to the SHOW command of a cached quilt and remove the quilt from the cache, if it was not shown '''
+
+        # if no error was received
+        # NOTE: If SHOW commands are not acknowledged, there is no response
+        if not response or response[1]['error'] == 0:
+            return True
+
+        # otherwise the quilt is sent as usual
+        self.__forget_cached_quilt(name)
+        if response[1]['error'] == self.service_error.ERR_NOTINCACHE.value: logger.warning("The quilt '%s' is not in the cache of Looking Glass Bridge anymore." % name)
+        else: logger.warning("Looking Glass Bridge could not show the cached quilt '%s'." % name)
+
+        return False
+
+    def __forget_cached_quilt(self, name):
+        ''' remove the quilt with the given name from the cache '''
+        with self.__quilt_cache_lock:
+            for key in [key for key, value in self.__quilt_cache.items() if value == name]:
+                del self.__quilt_cache[key]
+
+    def __forget_device_quilts(self, dev_index):
+        ''' remove all quilts, which were cached for the device with the given index '''
+        with self.__quilt_cache_lock:
+            for key in [key for key in self.__quilt_cache.keys() if key[0] == dev_index]:
+                del self.__quilt_cache[key]
+
+    def __convert_quilt(self, lightfield, flip_views, out, top_down=False):
+        ''' convert the view stack of the lightfield into the pixel data of the quilt bitmap '''
+        ''' if top_down is True, the pixel rows start with the top row (like in PNG or JPEG images) instead of the bottom row '''
+        # NOTE: The channels are converted, the views are flipped and the
+        #       pixels are written into the output array in one pass. The
+        #       output array has the shape (quilt_height, quilt_width, 3) and
+        #       may have padded rows (e.g., a view of the frame buffer).
+
+        start = time.time()
+
+        # convert BGR(A) <-> RGB on little-endian systems to make the
+        # data in the numpy buffer comply with the BITMAP file format
+        # specifications
+        if sys.byteorder == "little":
+
+            code = cv2.COLOR_BGR2RGB if lightfield.colorchannels == 3 else cv2.COLOR_BGRA2RGB
+
+        elif not sys.byteorder == "little" and lightfield.colorchannels == 4:
+
+            # TODO: Actually we would not need this, if we could
+            #       read in RGB mode to gpu.types.Buffer, but we can't
+            #       due to a Blender bug / limitation:
+            #
+            #       https://developer.blender.org/T91828
+            code = cv2.COLOR_RGBA2RGB
+
+        else:
+
+            code = None
+
+        # convert the quilt row by row of views
+        # NOTE: The view stack starts with the bottom row of views like the
+        #       BITMAP, so that each row of views is a band of the bitmap.
+        #       Bands are small enough to be flipped in place while they are
+        #       still cached. A top-down image has the bands in reverse order
+        #       and each band flipped.
+        rows, view_height = lightfield.metadata['rows'], lightfield.metadata['view_height']
+        for row in range(rows):
+            source = lightfield.merged_numpy[row].reshape(view_height, lightfield.metadata['quilt_width'], lightfield.colorchannels)
+            band_row = rows - 1 - row if top_down else row
+            band = out[band_row * view_height:(band_row + 1) * view_height]
+
+            if code is None: np.copyto(band, source)
+            else: cv2.cvtColor(source, code, dst=band)
+
+            # flip the view vertically, if required
+            if flip_views != top_down: cv2.flip(band, 0, dst=band)
+
+        logger.debug(" [#] Converting the view stack of shape %s into the quilt bitmap took %.3f ms." % (lightfield.merged_numpy.shape, (time.time() - start) * 1000))
+
+    def __compress_quilt(self, lightfield, flip_views, transport, quality=None):
+        ''' convert the view stack of the lightfield into a PNG or JPEG image of the quilt and return its data '''
+
+        # reuse the image array of the calling thread
+        # NOTE: The quilt is compressed by the background sender and the
+        #       worker threads of the asyncio methods, so each thread needs
+        #       its own array
+        shape = (lightfield.metadata['quilt_height'], lightfield.metadata['quilt_width'], 3)
+        image = getattr(self.__compress_buffers, 'image', None)
+        if image is None or image.shape != shape:
+            image = self.__compress_buffers.image = np.empty(shape, dtype=np.uint8)
+
+        # NOTE: The channels are already in the order OpenCV expects, since
+        #       the BITMAP has the same order (BGR)
+        self.__convert_quilt(lightfield, flip_views, image, top_down=True)
+
+        return self.__encode_image(image, transport, quality)
+
+    def __compress_bitmap(self, bitmap, transport, quality=None):
+        ''' encode the quilt bitmap as PNG or JPEG image and return its data '''
+
+        # NOTE: Image files start with the top row of pixels
+        return self.__encode_image(cv2.flip(bitmap, 0), transport, quality)
+
+    def __encode_image(self, image, transport, quality=None):
+        ''' encode the top-down BGR image of the quilt as PNG or JPEG image and return its data '''
+
+        start = time.time()
+
+        if transport == self.transports.png:
+            result, data = cv2.imencode('.png', image, [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression])
+        elif transport == self.transports.jpeg:
+            result, data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality if quality is not None else self.jpeg_quality])
+        else:
+            raise ValueError("The transport '%s' does not compress the quilt." % transport)
+
+        if not result:
+            raise RuntimeError("The quilt could not be encoded as %s image." % transport.name.upper())
+
+        logger.debug(" [#] Encoding the quilt of shape %s as %s image of length %i took %.3f ms." % (image.shape, transport.name.upper(), data.nbytes, (time.time() - start) * 1000))
+
+        return data.data
+
+    def __select_transport(self, shape):
+        ''' return the transport and quality in which the next quilt of the given shape is sent '''
+
+        # use the fixed transport, if one was selected
+        if self.__transport == self.transports.raw: return self.transports.raw, None
+        if self.__transport == self.transports.png: return self.transports.png, None
+        if self.__transport == self.transports.jpeg: return self.transports.jpeg, self.jpeg_quality
+
+        # otherwise choose from the candidates (from highest to lowest fidelity)
+        candidates = [(self.transports.raw, None), (self.transports.png, None)] + [(self.transports.jpeg, quality) for quality in self.adaptive_jpeg_qualities]
+        with self.__transport_lock:
+            stats = self.__get_transport_stats(shape)
+
+            # measure each candidate at least once
+            measured = [candidate for candidate in candidates if candidate in stats['candidates']]
+            if len(measured) < len(candidates):
+                return [candidate for candidate in candidates if not candidate in measured][0]
+
+            # measure the least recently used candidate again from time to time,
+            # since the latencies depend on the content of the quilt
+            if stats['frames'] % max(self.adaptive_probe_interval, 1) == 0:
+                return min(candidates, key=lambda candidate: stats['candidates'][candidate]['last'])
+
+            # choose the candidate with the lowest latency
+            # NOTE: A candidate with lower fidelity is only chosen, if it is
+            #       clearly faster
+            latency = lambda candidate: stats['candidates'][candidate]['encode'] + stats['candidates'][candidate]['send']
+            best = candidates[0]
+            for candidate in candidates[1:]:
+                if latency(candidate) < latency(best) * (1.0 - self.adaptive_tolerance): best = candidate
+
+            return best
+
+    def __update_transport_stats(self, shape, candidate, timing):
+        ''' add the measured encoding and sending times of a quilt to the statistics of its transport '''
+        # NOTE: The sending time is the round trip until Looking Glass Bridge
+        #       acknowledged the quilt. If Bridge does not acknowledge SHOW
+        #       commands, it is the time until NNG accepted the message.
+
+        with self.__transport_lock:
+            stats = self.__get_transport_stats(shape)
+            stats['frames'] += 1
+
+            # use exponential moving averages, so that the latencies follow
+            # changes of the content and the system load
+            if candidate in stats['candidates']:
+                values = stats['candidates'][candidate]
+                for key in ('encode', 'send'): values[key] += 0.25 * (timing.get(key, 0.0) - values[key])
+                values['frames'] += 1
+                values['last'] = stats['frames']
+            else:
+                stats['candidates'][candidate] = {'encode': timing.get('encode', 0.0), 'send': timing.get('send', 0.0), 'frames': 1, 'last': stats['frames']}
+
+            logger.debug(" [#] Sending the quilt as %s took %.3f ms (average: %.3f ms)." % (candidate[0].name.upper(), timing.get('encode', 0.0) + timing.get('send', 0.0), stats['candidates'][candidate]['encode'] + stats['candidates'][candidate]['send']))
+
+    def __get_transport_stats(self, shape):
+        ''' return the transport statistics for quilts of the given shape (the caller must hold the transport lock) '''
+
+        # the latencies depend on the size of the quilt
+        if not shape in self.__transport_stats:
+
+            # forget the statistics of the least recently added shapes
+            while len(self.__transport_stats) >= 8: del self.__transport_stats[next(iter(self.__transport_stats))]
+            self.__transport_stats[shape] = {'frames': 0, 'candidates': {}}
+
+        return self.__transport_stats[shape]
+
+    def __send_message(self, input_object, image_shape=None, validate=None, timing=None):
+        ''' send a message to Looking Glass Bridge and return its response '''
+        ''' if a validate function is given, the message is only sent if it returns True after the message was serialized '''
+        ''' if a timing dict is given, the encoding time and the round-trip time (in ms) are added to it '''
+
+        # if a NNG socket is open
+        if self.__is_socket():
+            timing = {} if timing is None else timing
+
+            # NOTE: Each request uses its own NNG context, so that several
+            #       requests can be in flight at once (e.g., a quilt upload
+            #       and a device query). NNG matches the responses to the
+            #       requests of each context.
+            show = 'show' in input_object['cmd'].keys()
+            context = self.__acquire_context(show)
+            try:
+
+                # send the message
+                if not self.__send_request(context, input_object, image_shape, validate, timing): return False
+
+                # if SHOW commands are not acknowledged by Looking Glass Bridge
+                if show and not self.__acknowledged: return
+
+                # receive the CBOR-formatted response
+                start = time.time()
+                try:
+                    response = context.recv()
+                except pynng.Timeout:
+                    if not show: raise
+                    self.__track_acknowledgement(None)
+                    return
+
+            finally:
+                self.__release_context(context)
+
+            return self.__receive_response(input_object, response, show, start, timing)
+
+    async def __async_send_message(self, input_object, image_shape=None, timing=None):
+        ''' send a message to Looking Glass Bridge without blocking the event loop and return its response '''
+        ''' if a timing dict is given, the encoding time and the round-trip time (in ms) are added to it '''
 
         # if a NNG socket is open
         if self.__is_socket():
+            loop = asyncio.get_running_loop()
+            timing = {} if timing is None else timing
+
+            show = 'show' in input_object['cmd'].keys()
+            context = self.__acquire_context(show)
+            try:
+
+                # send the message
+                # NOTE: Large messages are encoded and sent in a worker thread.
+                #       If the coroutine is cancelled meanwhile, the context is
+                #       released as soon as the message was sent.
+                if image_shape is None:
+                    start = time.time()
+                    cbor_dump, cbor_view = self.__encode_message(input_object)
+                    timing['encode'] = timing.get('encode', 0.0) + (time.time() - start) * 1000
+
+                    start = time.time()
+                    await context.asend(cbor_dump)
+                    timing['send'] = timing.get('send', 0.0) + (time.time() - start) * 1000
+                else:
+                    sending = loop.run_in_executor(None, self.__send_request, context, input_object, image_shape, None, timing)
+                    try:
+                        await asyncio.shield(sending)
+                    except asyncio.CancelledError:
+                        sending.add_done_callback(functools.partial(lambda context, future: self.__release_context(context), context))
+                        context = None
+                        raise
+
+                # if SHOW commands are not acknowledged by Looking Glass Bridge
+                if show and not self.__acknowledged: return
+
+                # receive the CBOR-formatted response
+                start = time.time()
+                try:
+                    response = await context.arecv()
+                except pynng.Timeout:
+                    if not show: raise
+                    self.__track_acknowledgement(None)
+                    return
+
+            finally:
+                if context is not None: self.__release_context(context)
+
+            return self.__receive_response(input_object, response, show, start, timing)
+
+    def __send_request(self, context, input_object, image_shape=None, validate=None, timing=None):
+        ''' serialize the message and send it with the given NNG context (returns False if it was not valid anymore) '''
+
+        # NOTE: The frame buffer of the CBOR encoder is used until the message
+        #       was sent, so only one message with bitmap can be sent at once
+        with (self.__encoder_lock if image_shape is not None else contextlib.nullcontext()):
             start = time.time()
 
             # dump a CBOR message
-            if image_shape is None:
-                cbor_dump = cbor.dumps(input_object)
-            else:
-                cbor_dump = cbor.dumps(input_object, image_shape=image_shape)
+            cbor_dump, cbor_view = self.__encode_message(input_object, image_shape)
 
             logger.debug(" [#] Encoding command as CBOR before sending took %.3f ms." % ((time.time() - start) * 1000))
+            if timing is not None: timing['encode'] = timing.get('encode', 0.0) + (time.time() - start) * 1000
             start = time.time()
 
-            # send it to the socket
-            self.__socket.send(cbor_dump)
+            # send it with the context
+            try:
+                if validate and not validate(): return False
+                context.send(cbor_dump)
+            finally:
+                self.__release_message(cbor_dump, cbor_view)
 
             logger.debug(" [#] Sending command of length %i took %.3f ms." % (len(cbor_dump), (time.time() - start) * 1000))
-            start = time.time()
+            if timing is not None: timing['send'] = timing.get('send', 0.0) + (time.time() - start) * 1000
+
+        return True
+
+    def __receive_response(self, input_object, response, show, start, timing):
+        ''' decode the response to the given message and track its round-trip time '''
+
+        logger.debug(" [#] Waiting for response took %.3f ms." % ((time.time() - start) * 1000))
+        timing['send'] = timing.get('send', 0.0) + (time.time() - start) * 1000
+
+        # the round trip of a SHOW command is the time from sending the quilt
+        # until it was acknowledged
+        if show: self.__track_acknowledgement(timing['send'])
+
+        # return the decoded CBOR response length and its conent
+        return [len(response), cbor.loads(response)]
+
+    def __acquire_context(self, show=False):
+        ''' return an idle NNG context or open a new one, if all are in use '''
+
+        with self.__contexts_lock:
+            context = self.__contexts.pop() if self.__contexts else self.__socket.new_context()
+            self.__request_stats['pending'] += 1
+
+        # SHOW commands are only waited for until the acknowledgement timeout
+        # NOTE: pynng has no public option for the receive timeout of a context,
+        #       so the NNG function is called directly. If that fails, the
+        #       contexts keep the receive timeout of the socket.
+        if self.__context_timeouts:
+
+            try:
+                error = pynng.lib.nng_ctx_set_ms(context.context, b'recv-timeout', int(self.acknowledge_timeout if show else self.__timeout))
+            except (AttributeError, TypeError) as e:
+                error = e
+
+            if error:
+                self.__context_timeouts = False
+                logger.warning("The receive timeout of the NNG contexts could not be set (%s). All requests use the socket's timeout of %i ms." % (error, self.__timeout))
+
+        return context
+
+    def __release_context(self, context):
+        ''' return the NNG context to the idle contexts '''
+        # NOTE: If the response was not received, the next request with this
+        #       context cancels the pending request
+
+        with self.__contexts_lock:
+            if self.__is_socket(): self.__contexts.append(context)
+            self.__request_stats['pending'] -= 1
+
+    def __track_acknowledgement(self, round_trip):
+        ''' count an acknowledged (round-trip time in ms) or unacknowledged (None) SHOW command '''
+
+        with self.__contexts_lock:
+
+            if round_trip is not None:
+
+                self.__request_stats['acknowledged'] += 1
+                self.__request_stats['last_round_trip'] = round_trip
+                self.__request_stats['round_trip'] = round_trip if self.__request_stats['round_trip'] is None else self.__request_stats['round_trip'] + 0.25 * (round_trip - self.__request_stats['round_trip'])
+                self.__missed_acknowledgements = 0
+
+                logger.debug(" [#] SHOW command was acknowledged after %.3f ms (average: %.3f ms)." % (round_trip, self.__request_stats['round_trip']))
 
-            # receive the CBOR-formatted response
-            if not ('show' in input_object['cmd'].keys()):
-                response = self.__socket.recv()
             else:
-                return#response = self.__socket.recv()
 
-            logger.debug(" [#] Waiting for response took %.3f ms." % ((time.time() - start) * 1000))
+                self.__request_stats['unacknowledged'] += 1
+                self.__missed_acknowledgements += 1
 
-            # return the decoded CBOR response length and its conent
-            return [len(response), cbor.loads(response)]
+                logger.warning("Looking Glass Bridge did not acknowledge the SHOW command within %i ms." % self.acknowledge_timeout)
 
-    def __calculate_derived(self, calibration):
-        ''' calculate the values derived from the calibration json delivered by Looking Glass Bridge '''
+                # stop waiting for the acknowledgements, if Looking Glass
+                # Bridge does not send them
+                if self.__acknowledged and self.__missed_acknowledgements >= self.max_missed_acknowledgements:
+                    self.__acknowledged = False
 
-        calibration['aspect'] = calibration['screenW'] / calibration['screenH']
-        calibration['tilt'] = calibration['screenH'] / (calibration['screenW'] * calibration['slope'])
-        calibration['pitch'] = - calibration['screenW'] / calibration['DPI']  * calibration['pitch']  * math.sin(math.atan(abs(calibration['slope'])))
-        calibration['subp'] = calibration['pitch'] / (3 * calibration['screenW'])
-        calibration['ri'], calibration['bi'] = (2,0) if calibration['flipSubp'] else (0,2)
-        calibration['fringe'] = 0.0
+                    logger.warning("Looking Glass Bridge does not acknowledge SHOW commands. They are not waited for anymore.")
 
-        return calibration
+    def __encode_message(self, input_object, image_shape=None):
+        ''' serialize a command as CBOR and return the data to send and the memoryview of the frame buffer (if used) '''
+
+        # commands without bitmap are serialized as bytes object
+        # NOTE: They use their own encoder, so that they are not blocked by a
+        #       message with bitmap, which is being sent
+        if image_shape is None:
+            return cbor.dumps(input_object), None
+
+        # commands with bitmap are serialized into the reusable frame buffer
+        # NOTE: The pixel rows are copied only once (into the frame buffer) and
+        #       the buffer is passed to NNG without creating a bytes object
+        cbor_view = self.__encoder.encode_into(input_object, image_shape=image_shape)
+
+        return pynng.ffi.from_buffer(cbor_view), cbor_view
+
+    def __release_message(self, cbor_dump, cbor_view):
+        ''' release the frame buffer after the message was sent '''
+
+        # NOTE: The frame buffer can only be enlarged for the next message,
+        #       if no view of it exists anymore
+        if cbor_view is not None:
+            pynng.ffi.release(cbor_dump)
+            cbor_view.release()
+
+    def __parse_devices(self, response):
+        ''' return the list of devices from the response to the INFO command '''
+
+        if response != None:
+
+            # if no errors were received
+            if response[1]['error'] == 0:
+
+                # get the list of devices with status "ok"
+                devices = [device for device in response[1]['devices'] if device['state'] == "ok"]
+
+                # iterate through all devices
+                for device in devices:
+
+                    # parse odd value-object format from calibration json
+                    device['calibration'].update({key: value['value'] if isinstance(value, dict) else value for (key, value) in device['calibration'].items()})
+
+                    # if the calibration did not change since the last request,
+                    # the derived values are reused
+                    serial = device['calibration'].get('serial')
+                    with self.__calibrations_lock:
+                        received, parsed = self.__calibrations.get(serial, (None, None))
+
+                    if received == device['calibration']:
+                        device['calibration'] = dict(parsed)
+                        continue
+
+                    # otherwise calculate the derived values (e.g., tilt, pich, etc.)
+                    received = dict(device['calibration'])
+                    device['calibration'].update(self.calculate_derived(device['calibration']))
+
+                    # if the device was recalibrated, forget its cached quilts
+                    if parsed is not None:
+                        logger.info("The calibration of the device '%s' changed." % serial)
+                        self.__forget_device_quilts(device['index'])
+
+                    with self.__calibrations_lock:
+                        self.__calibrations[serial] = (received, dict(device['calibration']))
+
+                # return the device list
+                return devices
+
+    def __poll_devices(self):
+        ''' request the devices and notify the devices callbacks, if they changed '''
+
+        devices = self.__parse_devices(self.__send_message(self.__get_devices()))
+        if devices is None: return False
+
+        # compare the devices with the last known devices
+        # NOTE: The parsed calibration includes the derived values, so it
+        #       is only compared if the received calibration changed
+        previous = [(d['index'], d['hardwareVersion'], d['calibration']) for d in self.__devices]
+        if previous == [(d['index'], d['hardwareVersion'], d['calibration']) for d in devices]:
+            return False
+
+        logger.info("The devices of '%s' changed. Found %i devices." % (self, len(devices)))
+
+        self.__devices = devices
+        for callback in list(self.__devices_callbacks):
+            try:
+                callback(self, devices)
+            except Exception as e:
+                logger.error("A devices callback of '%s' failed: %s" % (self.name, e))
+
+        return True
 
 
     # PRIVATE STATIC METHODS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @staticmethod
+    def __connect_loop(service_ref, stop, interval):
+        ''' try to connect to Looking Glass Bridge until it answers or the service is deleted '''
+
+        attempts = 0
+        while not stop.is_set():
+
+            # stop, if the service was deleted or its socket was closed
+            service = service_ref()
+            if service is None or not service.__is_socket(): return
+
+            try:
+
+                service.__dialer = service.__socket.dial(service.__address, block = True)
+
+            except pynng.exceptions.NNGException:
+
+                # NOTE: Only the first failed attempt is logged
+                if attempts == 0: logger.info("Looking Glass Bridge is not running. Trying to connect every %.1f s ..." % interval)
+                attempts += 1
+
+            else:
+
+                # quilts cached by a previous instance of Looking Glass Bridge
+                # are gone, so they need to be uploaded again
+                service.clear_quilt_cache()
+
+                # register the client and request the devices
+                service.__initialize(discover = True)
+                return
+
+            # release the reference while waiting
+            del service
+            stop.wait(interval)
+
+    @staticmethod
+    def __poll_loop(service_ref, stop):
+        ''' request the devices every poll interval until the poller is stopped or the service is deleted '''
+
+        while True:
+
+            # stop, if the service was deleted
+            service = service_ref()
+            if service is None: return
+            interval = service.poll_interval
+
+            try:
+
+                if service.is_ready():
+                    start = time.time()
+                    if not service.__poll_devices(): logger.debug(" [#] Device poll found no changes and took %.3f ms." % ((time.time() - start) * 1000))
+
+            except Exception as e:
+
+                logger.error("The device poller of '%s' failed: %s" % (service, e))
+
+            # release the reference while waiting
+            del service
+            if stop.wait(interval): return
+
+    @staticmethod
+    def __sender_loop(service_ref, sender):
+        ''' send the latest queued quilt until the background sender is stopped '''
+        # NOTE: Only a weak reference to the service is kept while waiting, so
+        #       that the service can still be deleted
+
+        while True:
+
+            # wait for the next frame
+            with sender['condition']:
+                while sender['running'] and sender['frame'] is None:
+                    sender['condition'].wait()
+
+                # wait until the next frame is due
+                # NOTE: Frames, which are passed meanwhile, replace the waiting
+                #       frame, so a burst of updates is merged into the newest
+                while sender['running'] and time.time() < sender['due']:
+                    sender['condition'].wait(sender['due'] - time.time())
+
+                # stop, if the background sender was stopped
+                if not sender['running']: return
+
+                frame, sender['frame'] = sender['frame'], None
+
+            # stop, if the service was deleted
+            service = service_ref()
+            if service is None: return
+
+            try:
+
+                start = time.time()
+                if service.__is_socket():
+                    sent = service.__send_quilt(*frame)
+                    service.__track_frame(sent, start)
+                    if sent: logger.info(" [#] Background sender sent lightfield image '%s' (total time: %.3f ms)." % (frame[1], (time.time() - start) * 1000))
+
+            except Exception as e:
+
+                logger.error("Background sender could not send lightfield image '%s': %s" % (frame[1], e))
+
+            # the next frame is sent after the minimum interval
+            with sender['condition']:
+                sender['due'] = start + (1.0 / service.max_fps if service.max_fps else 0.0)
+
+            # release the references
+            del service, frame
+
     @staticmethod
     def __init(client_name):
         ''' initialize the client at Looking Glass Bridge with the given name '''
@@ -546,3 +1764,99 @@ class LookingGlassBridge(BaseServiceType):
             'bin': bytes(),
         }
         return command
+
+
+    # CLASS PROPERTIES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @property
+    def quilt_cache_stats(self):
+        with self.__quilt_cache_lock:
+            return dict(self.__quilt_cache_stats, cached=len(self.__quilt_cache))
+
+    @quilt_cache_stats.setter
+    def quilt_cache_stats(self, value):
+        pass
+
+    @property
+    def transport(self):
+        return self.__transport
+
+    @transport.setter
+    def transport(self, value):
+        if not self.transports.is_valid(value):
+            raise ValueError("The transport '%s' is not supported by '%s'. Use one of %s." % (value, self.name, self.transports.to_list()))
+
+        self.__transport = value
+
+    @property
+    def transport_stats(self):
+        with self.__transport_lock:
+            return {shape: {"%s%s" % (transport.name, quality if quality is not None else ''): dict(values) for (transport, quality), values in stats['candidates'].items()} for shape, stats in self.__transport_stats.items()}
+
+    @transport_stats.setter
+    def transport_stats(self, value):
+        pass
+
+    @property
+    def request_stats(self):
+        with self.__contexts_lock:
+            return dict(self.__request_stats)
+
+    @request_stats.setter
+    def request_stats(self, value):
+        pass
+
+    @property
+    def devices(self):
+        return list(self.__devices)
+
+    @devices.setter
+    def devices(self, value):
+        pass
+
+    @property
+    def polling(self):
+        return self.__poller['thread'] is not None and self.__poller['thread'].is_alive()
+
+    @polling.setter
+    def polling(self, value):
+        pass
+
+    @property
+    def pacing_stats(self):
+        with self.__pacing_lock:
+            return {key: value for key, value in self.__pacing.items() if key != 'last_sent'}
+
+    @pacing_stats.setter
+    def pacing_stats(self, value):
+        pass
+
+    @property
+    def asynchronous(self):
+        return self.__asynchronous
+
+    @asynchronous.setter
+    def asynchronous(self, value):
+
+        # start the background sender, if it is not running
+        if value and not self.__sender:
+
+            self.__sender = {'condition': threading.Condition(), 'frame': None, 'running': True, 'due': 0.0}
+            threading.Thread(target=LookingGlassBridge.__sender_loop, args=(weakref.ref(self), self.__sender), name='pyLightIO-sender', daemon=True).start()
+
+            logger.info("Started background sender of '%s'." % self.name)
+
+        # stop the background sender, if it is running
+        # NOTE: A frame, which was not sent yet, is dropped
+        elif not value and self.__sender:
+
+            with self.__sender['condition']:
+                self.__sender['running'] = False
+                self.__sender['frame'] = None
+                self.__sender['condition'].notify()
+
+            self.__sender = None
+
+            logger.info("Stopped background sender of '%s'." % self.name)
+
+        self.__asynchronous = bool(value)
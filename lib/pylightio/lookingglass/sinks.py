@@ -0,0 +1,386 @@
+# ###################### BEGIN LICENSE BLOCK ###########################
+#
+# Copyright © 2021 Christian Stolze
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# ####################### END LICENSE BLOCK ############################
+
+# EXTERNAL PACKAGE DEPENDENCIES
+###################################################
+import os, copy, queue, threading, weakref, tempfile
+import cv2
+import numpy as np
+
+# debugging
+import time
+
+# INTERNAL PACKAGE DEPENDENCIES
+###################################################
+from pylightio.managers.services import BaseServiceType
+from pylightio.managers.devices import BaseDeviceType
+from pylightio.lookingglass.devices import LookingGlassDeviceMixin
+from pylightio.lookingglass.services import LookingGlassBridge
+from pylightio.lookingglass.lightfields import LookingGlassQuilt
+from pylightio.lookingglass.interleaver import LookingGlassInterleaver
+from pylightio.lookingglass.emulator import LookingGlassBridgeEmulator
+
+# PREPARE LOGGING
+###################################################
+import logging
+
+# get the library logger
+logger = logging.getLogger('pyLightIO')
+
+
+
+# FILE SINK FOR LOOKING GLASS DEVICES
+###################################################
+# the following service type is a virtual device sink. It provides virtual
+# devices and writes each quilt that is displayed on them (or the native image
+# of the device) to image files or a video file on a background thread. That way
+# the display pipeline can be used on machines without Looking Glass Bridge,
+# e.g., to store the output of a render farm or to measure the throughput.
+class LookingGlassFileSink(BaseServiceType):
+
+    # DEFINE CLASS PROPERTIES AS PROTECTED MEMBERS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    type = 'lookingglassfilesink'                           # the unique identifier string of this service type (required for the factory class)
+    name = 'Looking Glass File Sink'                        # the name this service type
+
+    # DEFINE CLASS PROPERTIES AS PRIVATE MEMBERS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    __path = None               # directory in which the images and videos are written
+    __devices = None            # configurations of the virtual devices
+    __queue = None              # frames, which wait for the encoder thread
+    __encoder = None            # thread, which converts and writes the frames
+    __writers = None            # video writers of the devices in the format {device index: (cv2.VideoWriter, frame size, file path)}
+    __interleavers = None       # interleavers of the devices in the format {device index: LookingGlassInterleaver}
+    __stats = None              # statistics of the written frames
+    __stats_lock = None         # lock which protects the statistics
+
+
+    # DEFINE PUBLIC CLASS ATTRIBUTES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # format of the image files (any extension supported by OpenCV)
+    image_format = 'png'
+
+    # compression level of PNG images (0 - 9) and quality of JPEG images (0 - 100)
+    png_compression = 1
+    jpeg_quality = 90
+
+    # codec, file extension and frame rate of the video files
+    video_fourcc = 'mp4v'
+    video_extension = 'mp4'
+    video_fps = 30.0
+
+    # maximum number of frames, which wait for the encoder thread
+    queue_size = 8
+
+
+    # INSTANCE METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __init__(self, client_name = "", path = None, devices = None, native = False, video = False, drop_frames = False):
+        ''' create the sink, which writes the frames into the given directory '''
+        ''' devices are the device types or configurations of the virtual devices (by default one Looking Glass Portrait) '''
+        ''' if native is True, the native images of the devices are written instead of the quilts and if video is True, one video file is written per device '''
+        ''' if drop_frames is True, display() does not wait for the encoder thread, if the queue is full, but drops the frame '''
+
+        self.client_name = client_name
+        self.native = native
+        self.video = video
+        self.drop_frames = drop_frames
+        self.version = ""
+
+        self.__path = path if path else os.path.join(tempfile.gettempdir(), 'pylightio-sink')
+        os.makedirs(self.__path, exist_ok=True)
+
+        # create the configurations of the virtual devices
+        # NOTE: The configurations are completed like the configurations of
+        #       devices connected to Looking Glass Bridge
+        if devices is None: devices = [DeviceType for DeviceType in BaseDeviceType.__subclasses__() if issubclass(DeviceType, LookingGlassDeviceMixin) and DeviceType.type == 'portrait']
+        self.__devices = []
+        for index, device in enumerate(devices):
+
+            configuration = copy.deepcopy(device if isinstance(device, dict) else device.emulated_configuration)
+
+            # the serials are unique, so that the virtual devices are never
+            # mistaken for emulated or connected devices
+            configuration['index'] = index
+            configuration['calibration'] = LookingGlassBridge.calculate_derived(dict(LookingGlassBridgeEmulator.default_calibration, **configuration['calibration']))
+            configuration['calibration']['serial'] = "%s-SINK%i" % (configuration['calibration']['serial'], index)
+
+            self.__devices.append(configuration)
+
+        self.__writers = {}
+        self.__interleavers = {}
+        self.__stats = {'written': 0, 'dropped': 0, 'fps': 0.0, 'latency': None, 'conversion': None, 'writing': None, 'last_written': None}
+        self.__stats_lock = threading.Lock()
+
+        # start the encoder thread
+        # NOTE: Only a weak reference to the sink is kept by the thread, so that
+        #       the sink can still be deleted
+        self.__queue = queue.Queue(maxsize=max(self.queue_size, 1))
+        self.__encoder = threading.Thread(target=LookingGlassFileSink.__encoder_loop, args=(weakref.ref(self), self.__queue), name='pyLightIO-sink', daemon=True)
+        self.__encoder.start()
+
+        logger.info("Created '%s' with %i virtual devices, which writes %s %s to '%s'." % (self, len(self.__devices), 'native images' if self.native else 'quilts', 'as video' if self.video else 'as images', self.__path))
+
+    def is_ready(self):
+        ''' check if the service is ready: Is the encoder thread running? '''
+        return self.__encoder is not None and self.__encoder.is_alive()
+
+    def get_version(self):
+        ''' return the version string of the service '''
+        return self.version
+
+    def get_devices(self):
+        ''' return the configurations of the virtual devices '''
+        return copy.deepcopy(self.__devices)
+
+    def display(self, device, lightfield, flip_views=False, aspect=None, invert=False, custom_decoder = None, cache_key = None):
+        ''' write the given lightfield image to the files of the given device '''
+        return self.display_multiple([device], lightfield, flip_views=flip_views)
+
+    def display_multiple(self, devices, lightfield, flip_views=False, aspect=None, invert=None, custom_decoder = None, cache_key = None):
+        ''' write the given lightfield image to the files of several devices at once '''
+        ''' the view stack is copied once and then written for all devices by the encoder thread '''
+
+        if not self.is_ready(): raise RuntimeError("The '%s' is not ready." % self)
+
+        # if the lightfield is a LookingGlassQuilt
+        if type(lightfield) == LookingGlassQuilt:
+
+            start = time.time()
+
+            # copy the view stack, since the caller may render the next frame
+            # into it while the encoder thread is still writing this one
+            views = np.array(lightfield.merged_numpy, copy=True)
+            views.flags.writeable = False
+
+            for device in devices:
+                try:
+
+                    self.__queue.put((device.configuration['index'], views, dict(lightfield.metadata), lightfield.colorchannels, flip_views, start), block=not self.drop_frames)
+
+                except queue.Full:
+
+                    with self.__stats_lock: self.__stats['dropped'] += 1
+
+                    logger.debug(" [#] Dropped frame for device %i, because the encoder thread is busy." % device.configuration['index'])
+
+                    return False
+
+            return True
+
+        # nothing is written for the demo quilt
+        elif lightfield is None:
+
+            logger.info("The '%s' can not display the demo quilt." % self)
+
+            return False
+
+        raise TypeError("The lightfield image of type '%s' can not be written. Only '%s' is supported." % (type(lightfield), LookingGlassQuilt))
+
+    def clear(self, device):
+        ''' clear the display of a given device (nothing is written) '''
+        return True
+
+    def flush(self, timeout = None):
+        ''' wait until all queued frames were written and return True if that happened before the timeout (in s) '''
+
+        start = time.time()
+        while self.__queue.unfinished_tasks:
+            if timeout is not None and time.time() - start > timeout: return False
+            time.sleep(0.001)
+
+        return True
+
+    def close(self):
+        ''' write the queued frames, stop the encoder thread and close the video files '''
+
+        if self.__encoder is not None:
+
+            # if the sink is deleted by the encoder thread, it stops by itself
+            if self.__encoder is threading.current_thread():
+                self.__release_writers()
+
+            # otherwise the encoder thread stops after the last queued frame
+            else:
+                self.__queue.put(None)
+                self.__encoder.join()
+
+            self.__encoder = None
+
+            logger.info("Closed '%s' after writing %i frames." % (self, self.__stats['written']))
+
+    def __del__(self):
+        ''' write the queued frames and close the video files '''
+        if self.__encoder is not None: self.close()
+
+
+    # PRIVATE INSTANCE METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    def __convert_frame(self, dev_index, views, metadata, colorchannels, flip_views):
+        ''' convert the view stack into the BGR image of the quilt or the native image of the device '''
+        # NOTE: The view stack has the shape (rows, view_height, columns, view_width, colorchannels),
+        #       starts with the bottom row of views and has RGB(A) channels
+
+        rows, columns, view_height, view_width = metadata['rows'], metadata['columns'], metadata['view_height'], metadata['view_width']
+
+        # the native image is gathered from the view stack
+        if self.native:
+
+            interleaver = self.__interleavers.get(dev_index)
+            if interleaver is None:
+                interleaver = self.__interleavers[dev_index] = LookingGlassInterleaver(self.__devices[dev_index]['calibration'])
+
+            image = np.take(views.reshape(-1), interleaver.get_gather_map(rows, columns, view_height, view_width, colorchannels, flip_views), mode='clip')
+
+        # the quilt image starts with the top row of pixels, so the rows of
+        # views are reversed and the views are flipped, if they are not flipped
+        # already
+        elif flip_views:
+            image = views[::-1].reshape(rows * view_height, columns * view_width, colorchannels)
+        else:
+            image = views.reshape(rows * view_height, columns * view_width, colorchannels)[::-1]
+
+        return cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2BGR if image.shape[2] == 3 else cv2.COLOR_RGBA2BGR)
+
+    def __write_frame(self, dev_index, image, number):
+        ''' write the image into the image file or the video of the device and return the file path '''
+
+        if self.video:
+
+            # open the video file of the device
+            # NOTE: If the image size changes, a new video file is started
+            size = (image.shape[1], image.shape[0])
+            writer = self.__writers.get(dev_index)
+            if writer is None or writer[1] != size:
+                if writer is not None: writer[0].release()
+
+                filepath = os.path.join(self.__path, "device_%i_%ix%i.%s" % (dev_index, size[0], size[1], self.video_extension))
+                writer = self.__writers[dev_index] = (cv2.VideoWriter(filepath, cv2.VideoWriter_fourcc(*self.video_fourcc), self.video_fps, size), size, filepath)
+                if not writer[0].isOpened(): raise RuntimeError("The video file '%s' could not be opened with the codec '%s'." % (filepath, self.video_fourcc))
+
+            writer[0].write(image)
+
+            return writer[2]
+
+        filepath = os.path.join(self.__path, "device_%i_%06i.%s" % (dev_index, number, self.image_format))
+        if self.image_format.lower() == 'png': parameters = [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+        elif self.image_format.lower() in ['jpg', 'jpeg']: parameters = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        else: parameters = []
+
+        if not cv2.imwrite(filepath, image, parameters):
+            raise RuntimeError("The image file '%s' could not be written." % filepath)
+
+        return filepath
+
+    def __track_frame(self, start, conversion, writing):
+        ''' count a written frame and update the achieved frame rate and the timings '''
+
+        with self.__stats_lock:
+
+            now = time.time()
+            self.__stats['written'] += 1
+
+            # use exponential moving averages for the timings and the frame rate
+            # NOTE: Pauses of more than a second are not counted for the frame rate
+            for key, value in (('latency', (now - start) * 1000), ('conversion', conversion), ('writing', writing)):
+                self.__stats[key] = value if self.__stats[key] is None else self.__stats[key] + 0.25 * (value - self.__stats[key])
+
+            if self.__stats['last_written'] is not None and now - self.__stats['last_written'] < 1.0:
+                fps = 1.0 / max(now - self.__stats['last_written'], 1e-6)
+                self.__stats['fps'] = fps if not self.__stats['fps'] else self.__stats['fps'] + 0.25 * (fps - self.__stats['fps'])
+
+            self.__stats['last_written'] = now
+
+            return self.__stats['written']
+
+    def __release_writers(self):
+        ''' close the video files '''
+
+        for writer in self.__writers.values(): writer[0].release()
+        self.__writers.clear()
+
+
+    # PRIVATE STATIC METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @staticmethod
+    def __encoder_loop(sink_ref, frames):
+        ''' convert and write the queued frames until the sink is closed or deleted '''
+
+        numbers = {}
+        while True:
+
+            # wait for the next frame
+            # NOTE: The timeout is required to notice that the sink was deleted
+            try:
+                frame = frames.get(timeout=1.0)
+            except queue.Empty:
+                if sink_ref() is None: return
+                continue
+
+            sink = sink_ref()
+            try:
+
+                # stop, if the sink was closed or deleted
+                if frame is None or sink is None:
+                    if sink is not None: sink.__release_writers()
+                    return
+
+                dev_index, views, metadata, colorchannels, flip_views, start = frame
+
+                try:
+
+                    start_conversion = time.time()
+                    image = sink.__convert_frame(dev_index, views, metadata, colorchannels, flip_views)
+
+                    start_writing = time.time()
+                    filepath = sink.__write_frame(dev_index, image, numbers.get(dev_index, 0))
+                    numbers[dev_index] = numbers.get(dev_index, 0) + 1
+
+                    sink.__track_frame(start, (start_writing - start_conversion) * 1000, (time.time() - start_writing) * 1000)
+
+                    logger.debug(" [#] Wrote frame of device %i to '%s' (conversion: %.3f ms, writing: %.3f ms, total: %.3f ms)." % (dev_index, filepath, (start_writing - start_conversion) * 1000, (time.time() - start_writing) * 1000, (time.time() - start) * 1000))
+
+                except Exception as e:
+
+                    logger.error("The '%s' could not write the frame of device %i: %s" % (sink, dev_index, e))
+
+            finally:
+
+                # release the references
+                frames.task_done()
+                del sink, frame
+
+
+    # CLASS PROPERTIES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @property
+    def path(self):
+        return self.__path
+
+    @path.setter
+    def path(self, value):
+        pass
+
+    @property
+    def frame_stats(self):
+        with self.__stats_lock:
+            return dict(self.__stats)
+
+    @frame_stats.setter
+    def frame_stats(self, value):
+        pass
@@ -18,6 +18,7 @@
 
 # EXTERNAL PACKAGE DEPENDENCIES
 ###################################################
+import threading, bisect
 from enum import Enum
 
 # INTERNAL PACKAGE DEPENDENCIES
@@ -50,6 +51,28 @@ class DeviceManager(object):
     __dev_list = []             # list for initialized device instances
     __dev_active = None         # currently active device instance
     __dev_service = None         # the service used by the device manager
+    __dev_lock = threading.RLock()  # lock which protects the device list, the indices and the listeners
+    __dev_index = {'id': {}, 'serial': {}, 'type': {}, 'index': {}}  # devices indexed by the values of these keys in the format {key: {value: [devices ordered by id]}}
+    __dev_keys = {}             # the indexed values of each device in the format {device: {key: value}}
+    __dev_listeners = []        # functions which are called when devices are added, removed or changed
+
+
+    # DEFINE PUBLIC CLASS ATTRIBUTES
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    # events which are passed to the listeners of the device manager
+    class events(Enum):
+        added = 1                   # a device was added or connected again
+        removed = 2                 # a device was removed or disconnected
+        calibration_changed = 3     # the calibration of a connected device changed
+
+        @classmethod
+        def to_list(cls):
+            return list(map(lambda enum: enum, cls))
+
+        @classmethod
+        def is_valid(cls, value):
+            ''' check if a given value is a member of this class '''
+            return (value in cls.to_list())
 
 
     # CLASS METHODS
@@ -77,7 +100,7 @@ class DeviceManager(object):
         return cls.__dev_service
 
     @classmethod
-    def refresh(cls, emulate_remaining = True):
+    def refresh(cls, emulate_remaining = True, devices = None):
         '''
         Refresh the device list of the device manager. This calls the service's
         `get_devices()` method.
@@ -85,6 +108,10 @@ class DeviceManager(object):
         :param emulate_remaining: If `True`, the device manager adds one emulated
             device of each type to the device list.
         :type emulate_remaining: bool, optional (default: `True`)
+        :param devices: The device configurations, which were already obtained
+            from the service (e.g., by its background discovery). If `None`,
+            the devices are requested from the service.
+        :type devices: list, optional (default: `None`)
         :return: No return value.
         :rtype: None
         '''
@@ -92,45 +119,103 @@ class DeviceManager(object):
         # if the service ready
         if cls.__dev_service and cls.__dev_service.is_ready():
 
-            instances = []
+            # request devices, if they were not passed
+            # NOTE: This is done before the lock is acquired, so that other
+            #       threads can use the device list while the service is waiting
+            if devices is None: devices = cls.__dev_service.get_devices()
+
+            events = []
+            with cls.__dev_lock:
+
+                # remember the connected devices and set all (not emulated)
+                # devices to "disconnected"
+                # NOTE: We don't delete the devices, because that would be more
+                #       complex to handle when the user already used the specific
+                #       device type instance for their settings
+                connected = set(d for d in cls.__dev_list if d.connected == True)
+                for d in cls.__dev_list:
+                    if d.emulated == False:
+                        d.connected = False
+
+                if devices:
 
-            # set all (not emulated) devices to "disconnected"
-            # NOTE: We don't delete the devices, because that would be more
-            #       complex to handle when the user already used the specific
-            #       device type instance for their settings
-            for d in cls.__dev_list:
-                if d.emulated == False:
-                    d.connected = False
+                    # for each device returned create a LookingGlassDevice instance
+                    # of the corresponding type
+                    for idx, device in enumerate(devices):
 
-            # request devices
-            devices = cls.__dev_service.get_devices()
-            if devices:
+                        # try to find the instance of this device
+                        # NOTE: Emulated devices are skipped, because they may
+                        #       use the same serial as an emulator of the Bridge
+                        instance = [d for d in cls.__dev_index['serial'].get(device['calibration']['serial'], []) if d.emulated == False]
 
-                # for each device returned create a LookingGlassDevice instance
-                # of the corresponding type
-                for idx, device in enumerate(devices):
+                        # if no instance of this device exists
+                        if not instance:
 
-                    # try to find the instance of this device
-                    instance = list(filter(lambda d: d.serial == device['calibration']['serial'], cls.__dev_list))
+                            # create a device instance of the corresponding type
+                            instance = cls.__add_device(device['hardwareVersion'], device)
+                            events.append((cls.events.added, instance))
 
-                    # if no instance of this device exists
-                    if not instance:
+                        else:
 
-                        # create a device instance of the corresponding type
-                        instance = cls.add_device(device['hardwareVersion'], device)
+                            instance = instance[0]
 
-                    else:
+                            # update the configuration
+                            calibration = instance.configuration.get('calibration') if instance.configuration else None
+                            instance.configuration = device
+                            cls.__index_device(instance)
 
-                        # update the configuration
-                        instance[0].configuration = device
+                            # make sure the state of the device instance is "connected"
+                            instance.connected = True
 
-                        # make sure the state of the device instance is "connected"
-                        instance[0].connected = True
+                            if not instance in connected: events.append((cls.events.added, instance))
+                            elif calibration != device['calibration']: events.append((cls.events.calibration_changed, instance))
+
+                # the devices, which were not found anymore, were disconnected
+                for d in connected:
+                    if d.connected == False: events.append((cls.events.removed, d))
+
+            # notify the listeners
+            for event, device in events: cls.__notify(event, device)
 
             return None
 
         logger.error("No Looking Glass Bridge connection. The device list could not be obtained. ")
 
+    @classmethod
+    def start_polling(cls, interval = None):
+        '''
+        Refresh the device list automatically, whenever the service detects
+        that devices were connected, disconnected or recalibrated. The service
+        requests the devices in a background thread and the listeners of the
+        device manager are notified from this thread.
+
+        :param interval: The time between two requests of the service in
+            seconds. If `None`, the default interval of the service is used.
+        :type interval: float, optional (default: `None`)
+        :return: `True` if the service supports polling.
+        :rtype: bool
+        '''
+
+        if cls.__dev_service and hasattr(cls.__dev_service, 'start_polling'):
+            cls.__dev_service.add_devices_callback(cls.__devices_changed)
+            cls.__dev_service.start_polling(interval)
+            return True
+
+        return False
+
+    @classmethod
+    def stop_polling(cls):
+        '''
+        Stop refreshing the device list automatically.
+
+        :return: No return value.
+        :rtype: None
+        '''
+
+        if cls.__dev_service and hasattr(cls.__dev_service, 'stop_polling'):
+            cls.__dev_service.stop_polling()
+            cls.__dev_service.remove_devices_callback(cls.__devices_changed)
+
     @classmethod
     def add_device(cls, device_type, device_configuration = None):
         '''
@@ -142,26 +227,12 @@ class DeviceManager(object):
         :return: The added device.
         :rtype: :class:`pylightio.BaseDeviceType` or subclass of it
         '''
-        # try to find the class for the specified type, if it exists
-        DeviceTypeClass = [subclass for subclass in BaseDeviceType.__subclasses__() if subclass.type == device_type]
-
-        # call the corresponding type
-        if DeviceTypeClass:
-
-            # create the device instance
-            device = DeviceTypeClass[0](cls.__dev_service, device_configuration)
+        device = cls.__add_device(device_type, device_configuration)
 
-            # increment device count
-            # NOTE: this number is never decreased to prevent ambiguities of the id
-            cls.__dev_count += 1
+        # notify the listeners
+        cls.__notify(cls.events.added, device)
 
-            # append registered device to the device list
-            cls.__dev_list.append(device)
-
-            return device
-
-        # otherwise raise an exception
-        raise ValueError("There is no Looking Glass of type '%s'." % device_type)
+        return device
 
 
     @classmethod
@@ -176,15 +247,23 @@ class DeviceManager(object):
         '''
 
         # if the device is in the list
-        if device in cls.__dev_list:
+        with cls.__dev_lock:
+            found = device in cls.__dev_keys
+            if found:
 
-            # create the device instance
-            logger.info("Removing device '%s' ..." % (device))
+                # create the device instance
+                logger.info("Removing device '%s' ..." % (device))
+
+                # if this device is the active device, set_active
+                if cls.get_active() == device: cls.reset_active()
+
+                cls.__dev_list.remove(device)
+                cls.__unindex_device(device)
 
-            # if this device is the active device, set_active
-            if cls.get_active() == device.id: cls.reset_active()
+        if found:
 
-            cls.__dev_list.remove(device)
+            # notify the listeners
+            cls.__notify(cls.events.removed, device)
 
             return True
 
@@ -207,7 +286,7 @@ class DeviceManager(object):
         for DeviceType in set(BaseDeviceType.__subclasses__()) - set([DeviceType for DeviceType in cls.__subclasses__() if DeviceType.type in filter ]):
 
             # if not already emulated
-            if not (DeviceType.type in [d.type for d in cls.__dev_list if d.emulated == True]):
+            if not any(d.emulated == True for d in cls.__dev_index['type'].get(DeviceType.type, [])):
 
                 # create an instance without passing a configuration
                 # (that will created an emulated device)
@@ -215,10 +294,60 @@ class DeviceManager(object):
 
         return True
 
+    @classmethod
+    def display(cls, lightfield, devices = None, **kwargs):
+        '''
+        Display a lightfield on several devices at once. The devices are
+        grouped by their service, which decodes the lightfield only once for
+        all of its devices.
+
+        :param lightfield: The lightfield image to be displayed.
+        :type lightfield: :class:`pylightio.BaseLightfieldImageFormat`
+        :param devices: The devices on which the lightfield is displayed. If
+            `None`, all connected devices are used.
+        :type devices: list, optional (default: `None`)
+        :param kwargs: Additional keyword arguments, which are passed to the
+            `display_multiple()` method of the services.
+        :return: `True` if the lightfield was passed to all services.
+        :rtype: bool
+        '''
+
+        # use all connected devices, if no devices are given
+        if devices is None: devices = [d for d in cls.to_list() if d.service]
+
+        # group the devices by their service
+        services = {}
+        for device in devices:
+
+            # if the lightfield image format is not supported by the device
+            if not (lightfield == None or type(lightfield) in device.formats):
+                raise TypeError("The given lightfield image of type '%s' is not supported by the device '%s'." % (type(lightfield), device))
+
+            if not device.service: raise RuntimeError("No service was specified for the device '%s'." % device)
+            services.setdefault(device.service, []).append(device)
+
+        # request each service to display the lightfield on its devices
+        success = True
+        for service, service_devices in services.items():
+
+            logger.info("Requesting '%s' to display the lightfield on %i devices ..." % (service, len(service_devices)))
+
+            if service.display_multiple(service_devices, lightfield, **kwargs):
+
+                # if that is successful, remember the lightfield for the devices
+                for device in service_devices: device.lightfield = lightfield
+
+            else:
+
+                success = False
+
+        return success
+
     @classmethod
     def to_list(cls, show_connected = True, show_emulated = False, filter_by_type = None):
         ''' enumerate the devices of this device manager as list '''
-        return [d for d in cls.__dev_list if ((show_connected == None or d.connected == show_connected) and (show_emulated == None or d.emulated == show_emulated)) and (filter_by_type == None or type(d) == filter_by_type)]
+        with cls.__dev_lock:
+            return [d for d in cls.__dev_list if ((show_connected == None or d.connected == show_connected) and (show_emulated == None or d.emulated == show_emulated)) and (filter_by_type == None or type(d) == filter_by_type)]
 
     @classmethod
     def count(cls, show_connected = True, show_emulated = False, filter_by_type = None):
@@ -236,48 +365,40 @@ class DeviceManager(object):
     def set_active(cls, id=None, key=None, value=None):
         ''' set the active device (i.e., the one currently used by the user) '''
 
-        # if a custom key and value are given
-        if key is not None and value is not None:
-
-            for device in cls.__dev_list:
-                if hasattr(device, key) and (getattr(device, key) == value):
-                    cls.__dev_active = device
-                    return device
-
-        # otherwise we use the id
-        elif (id is not None):
+        with cls.__dev_lock:
+            cls.__dev_active = cls.get_device(id, key, value)
 
-            for device in cls.__dev_list:
-                if (device.id == id):
-                    cls.__dev_active = device
-                    return device
-
-            # else raise exception
-            raise ValueError("The given device with id '%i' is not in the list." % id)
-
-        # else raise exception
-        raise ValueError("No valid keyword and value were given to identify the device.")
+            return cls.__dev_active
 
     @classmethod
     def get_device(cls, id=None, key=None, value=None):
         ''' get device instance based on the given key/value pair or id '''
+        # NOTE: The id, serial, type and index of the devices are looked up in
+        #       the indices. All other keys are searched in the device list.
 
-        # if a custom key and value are given
-        if key is not None and value is not None:
+        with cls.__dev_lock:
 
-            for device in cls.__dev_list:
-                if hasattr(device, key) and (getattr(device, key) == value):
-                    return device
+            # if a custom key and value are given
+            if key is not None and value is not None:
 
-        # otherwise we use the id
-        elif (id is not None):
+                if key in cls.__dev_index:
+                    devices = cls.__dev_index[key].get(value)
+                    if devices: return devices[0]
 
-            for device in cls.__dev_list:
-                if (device.id == id):
-                    return device
+                else:
 
-            # else raise exception
-            raise ValueError("The given device with id '%i' is not in the list." % id)
+                    for device in cls.__dev_list:
+                        if hasattr(device, key) and (getattr(device, key) == value):
+                            return device
+
+            # otherwise we use the id
+            elif (id is not None):
+
+                devices = cls.__dev_index['id'].get(id)
+                if devices: return devices[0]
+
+                # else raise exception
+                raise ValueError("The given device with id '%i' is not in the list." % id)
 
         # else raise exception
         raise ValueError("No valid keyword and value were given to identify the device.")
@@ -290,12 +411,134 @@ class DeviceManager(object):
     @classmethod
     def exists(cls, serial=None, type=None):
         ''' check if the device instance already exists '''
-        if serial and serial in [d.serial for d in cls.__dev_list]:
-            return True
+        with cls.__dev_lock:
+            if serial and serial in cls.__dev_index['serial']:
+                return True
+
+            if type and type in cls.__dev_index['type']:
+                return True
+
+        return False
+
+    @classmethod
+    def add_listener(cls, callback):
+        '''
+        Add a function, which is called when a device is added, removed or its
+        calibration changed. The function is called with the event and the
+        device as arguments.
+
+        :param callback: The function to be called.
+        :type callback: callable
+        :return: No return value.
+        :rtype: None
+
+        .. note:: The function is called from the thread, which changed the
+            device list (e.g., a background thread of the service).
+        '''
+        with cls.__dev_lock:
+            if not callback in cls.__dev_listeners: cls.__dev_listeners.append(callback)
+
+    @classmethod
+    def remove_listener(cls, callback):
+        '''
+        Remove a function, which was added by `add_listener()`.
+
+        :param callback: The function to be removed.
+        :type callback: callable
+        :return: `True` if the function was removed.
+        :rtype: bool
+        '''
+        with cls.__dev_lock:
+            if callback in cls.__dev_listeners:
+                cls.__dev_listeners.remove(callback)
+                return True
 
         return False
 
 
+    # PRIVATE CLASS METHODS
+    # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+    @classmethod
+    def __add_device(cls, device_type, device_configuration = None):
+        ''' create the device instance and add it to the device list and the indices without notifying the listeners '''
+
+        # try to find the class for the specified type, if it exists
+        DeviceTypeClass = [subclass for subclass in BaseDeviceType.__subclasses__() if subclass.type == device_type]
+
+        # call the corresponding type
+        if DeviceTypeClass:
+
+            with cls.__dev_lock:
+
+                # create the device instance
+                device = DeviceTypeClass[0](cls.__dev_service, device_configuration)
+
+                # increment device count
+                # NOTE: this number is never decreased to prevent ambiguities of the id
+                cls.__dev_count += 1
+
+                # append registered device to the device list
+                cls.__dev_list.append(device)
+                cls.__index_device(device)
+
+            return device
+
+        # otherwise raise an exception
+        raise ValueError("There is no Looking Glass of type '%s'." % device_type)
+
+    @classmethod
+    def __index_device(cls, device):
+        ''' add the device to the indices or update its entries '''
+
+        keys = cls.__dev_keys.setdefault(device, {})
+        for key, index in cls.__dev_index.items():
+
+            # get the current value of the device
+            value = getattr(device, key, None)
+            if key in keys:
+
+                # skip unchanged values
+                if keys[key] == value: continue
+
+                # otherwise remove the old entry
+                index[keys[key]].remove(device)
+                if not index[keys[key]]: del index[keys[key]]
+                del keys[key]
+
+            # the devices with the same value are ordered by their id, so that
+            # the first one is the same as in the device list
+            if value is not None:
+                bucket = index.setdefault(value, [])
+                bucket.insert(bisect.bisect_right([d.id for d in bucket], device.id), device)
+                keys[key] = value
+
+    @classmethod
+    def __unindex_device(cls, device):
+        ''' remove the device from the indices '''
+
+        for key, value in cls.__dev_keys.pop(device, {}).items():
+            cls.__dev_index[key][value].remove(device)
+            if not cls.__dev_index[key][value]: del cls.__dev_index[key][value]
+
+    @classmethod
+    def __devices_changed(cls, service, devices):
+        ''' refresh the device list with the devices obtained by the poller of the service '''
+        if service is cls.__dev_service: cls.refresh(devices=devices)
+
+    @classmethod
+    def __notify(cls, event, device):
+        ''' call the listeners for the given event '''
+
+        with cls.__dev_lock:
+            listeners = list(cls.__dev_listeners)
+
+        for callback in listeners:
+            try:
+                callback(event, device)
+            except Exception as e:
+                logger.error("A listener of the device manager failed on event '%s' of device '%s': %s" % (event.name, device, e))
+
+
 # BASE CLASS FOR DEVICE TYPES
 ###############################################
 # base class for the implementation of different lightfield display types.
@@ -49,8 +49,9 @@ class ServiceManager(object):
     # CLASS METHODS
     # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
     @classmethod
-    def add(cls, service_type, client_name = ""):
+    def add(cls, service_type, client_name = "", **kwargs):
         ''' open the service of the specified type '''
+        ''' additional keyword arguments are passed to the constructor of the service '''
 
         # try to find the class for the specified type, if it exists
         ServiceTypeClass = [subclass for subclass in BaseServiceType.__subclasses__() if (subclass == service_type or subclass.type == service_type)]
@@ -59,7 +60,7 @@ class ServiceManager(object):
         if ServiceTypeClass:
 
             # create the service instance
-            service = ServiceTypeClass[0](client_name = client_name)
+            service = ServiceTypeClass[0](client_name = client_name, **kwargs)
 
             # append registered device to the device list
             cls.__service_list.append(service)
@@ -181,10 +182,14 @@ class BaseServiceType(object):
         ''' this function should return a list of device configurations '''
         pass
 
-    def display(self, device, lightfield, aspect=None, custom_decoder = None):
+    def display(self, device, lightfield, aspect=None, custom_decoder = None, cache_key = None):
         ''' display a given lightfield image object on a device '''
         pass
 
+    def display_multiple(self, devices, lightfield, aspect=None, custom_decoder = None, cache_key = None):
+        ''' display a given lightfield image object on several devices at once '''
+        pass
+
     def clear(self, device):
         ''' clear the display of a given device '''
         pass
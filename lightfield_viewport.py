@@ -28,7 +28,7 @@ from .globals import *
 import sys, platform
 import bpy, bgl
 import gpu
-import time, timeit
+import time, timeit, bisect
 from math import *
 from mathutils import *
 from gpu_extras.batch import batch_for_shader
@@ -315,6 +315,15 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 	skip_views = 1
 	restricted_viewcone_limit = 0
 
+	# views that wait to be rendered (from the center outwards), views that
+	# were rendered already for the current lightfield, views that are
+	# skipped by the preview mode, and the rendered view each of the remaining
+	# views was filled with
+	render_queue = None
+	rendered_views = None
+	skipped_views = None
+	filled_views = None
+
 	# DEBUGING VARIABLES
 	start_multi_view = 0
 
@@ -528,8 +537,16 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 		# if the TIMER event for the lightfield rendering is called AND the automatic render mode is active
 		if event.type == 'TIMER' or event.type == 'Z':
 
-			# if something has changed OR the user requested a manual redrawing
-			if self.modal_redraw or (not self.modal_redraw and ((self.depsgraph_update_time > 0 and time.time() - self.depsgraph_update_time > LookingGlassAddon.low_resolution_preview_timout) or context.window_manager.addon_settings.viewport_manual_refresh == True)):
+			# if something has changed OR views are still waiting to be rendered OR the user requested a manual redrawing
+			if self.modal_redraw or self.render_queue or (not self.modal_redraw and ((self.depsgraph_update_time > 0 and time.time() - self.depsgraph_update_time > LookingGlassAddon.low_resolution_preview_timout) or context.window_manager.addon_settings.viewport_manual_refresh == True)):
+
+				# if the service can not take the next frame yet, render the
+				# views at a later timer event
+				# NOTE: Otherwise the frame would replace a frame that was
+				#		not sent yet and the rendering effort would be wasted
+				device = getattr(self, 'device', None)
+				if int(self.addon_settings_window_manager.renderMode) == 0 and device and device.service and hasattr(device.service, 'is_frame_due') and not device.service.is_frame_due():
+					return {'PASS_THROUGH'}
 
 				# update the viewport settings
 				self.updateViewportSettings(context)
@@ -780,6 +797,60 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 				# write pixel data from texture into the buffer (numpy array)
 				framebuffer.read_color(0, 0, array.shape[1], array.shape[0], array.shape[2], 0, 'UBYTE', data=buffer)
 
+	# check if a view is skipped by the active preview mode
+	def is_skipped_view(self, view):
+
+		# if the "skip views preview" is activated AND this view shall be skipped
+		if (self.addon_settings_window_manager.viewport_use_preview_mode and (self.addon_settings_window_manager.lightfield_preview_mode == '2' or self.addon_settings_window_manager.lightfield_preview_mode == '3')) and view % self.skip_views:
+			return True
+
+		# if the "Restricted viewcone preview" is activated AND this view shall be skipped
+		elif (self.addon_settings_window_manager.viewport_use_preview_mode and self.addon_settings_window_manager.lightfield_preview_mode == '4') and (view < self.restricted_viewcone_limit or view > self.qs[self.preset]["total_views"] - self.restricted_viewcone_limit):
+			return True
+
+		return False
+
+	# synthesize the given views from the rendered views
+	def interpolate_views(self, views):
+
+		start_test = time.time()
+
+		# find the rendered views left and right of each view
+		# NOTE: Views outside of the rendered views (e.g., in the restricted
+		#		viewcone preview) are filled with the outermost rendered view
+		rendered_views = np.array(self.rendered_views)
+		right = np.searchsorted(rendered_views, views)
+		left_views = rendered_views[np.clip(right - 1, 0, len(rendered_views) - 1)]
+		right_views = rendered_views[np.clip(right, 0, len(rendered_views) - 1)]
+
+		# weights of the right views in 1/256 steps
+		weights = np.where(right_views != left_views, np.round(256 * (np.array(views) - left_views) / np.maximum(right_views - left_views, 1)), 0).astype(np.uint16)
+
+		# blend the neighbors in 16 bit integers
+		# NOTE: The products are computed with an explicit dtype, since NumPy 1.x
+		#		would otherwise multiply uint8 arrays by small scalars in 8 bit
+		left_buffer, right_buffer = None, None
+		for view, left_view, right_view, weight in zip(views, left_views, right_views, weights):
+
+			view_data = self.lightfield_image.views[view]['view'].data
+			left_data, right_data = self.lightfield_image.views[left_view]['view'].data, self.lightfield_image.views[right_view]['view'].data
+
+			if weight == 0:
+				view_data[:] = left_data
+
+			else:
+				if left_buffer is None: left_buffer, right_buffer = np.empty(view_data.shape, dtype=np.uint16), np.empty(view_data.shape, dtype=np.uint16)
+
+				np.multiply(left_data, 256 - weight, out=left_buffer, dtype=np.uint16)
+				np.multiply(right_data, weight, out=right_buffer, dtype=np.uint16)
+				left_buffer += right_buffer
+				left_buffer += 128
+				np.right_shift(left_buffer, 8, out=view_data, casting='unsafe')
+
+			self.lightfield_image.update_view(view)
+
+		LookingGlassAddonLogger.debug(" [#] Interpolating %i skipped views took %.3f ms" % (len(views), (time.time() - start_test) * 1000))
+
 	# Draw function which copies data from the 3D View
 	def render_view(self, context):
 
@@ -803,6 +874,9 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 				# delete the current LightfieldImage
 				if self.lightfield_image: self.lightfield_image = None
 
+				# all views of the new LightfieldImage must be rendered
+				self.render_queue = None
+
 				# TODO: Actually we would use "RGB" and a numpy array with 3
 				#		color channels, because that would be more efficient.
 				#		But we can't read in RGB mode to gpu.types.Buffer
@@ -819,11 +893,11 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 				#		we can change this. (because the Blender fix is not)
 
 				# create a pylio LightfieldImage
+				# NOTE: The LightfieldViews of the image are created along with
+				#		it. Their data are subarrays of the quilt, so the view
+				#		textures are copied directly into the quilt.
 				self.lightfield_image = pylio.LightfieldImage.new(pylio.LookingGlassQuilt, id=self.preset, colormode='RGBA')
 
-				# create a new set of LightfieldViews
-				self.lightfield_image.set_views([pylio.LightfieldView(np.empty((self.qs[self.preset]["view_height"], self.qs[self.preset]["view_width"], 4), dtype=np.uint8), pylio.LightfieldView.formats.numpyarray) for view in range(0, self.qs[self.preset]["total_views"])], pylio.LightfieldView.formats.numpyarray)
-
 			LookingGlassAddonLogger.debug("Start rendering lightfield views ...")
 			LookingGlassAddonLogger.debug(" [#] View dimensions: %i x %i" % (self.qs[self.preset]["view_width"], self.qs[self.preset]["view_height"]))
 			LookingGlassAddonLogger.debug(" [#] LightfieldImage views: %i" % len(self.lightfield_image.get_view_data()))
@@ -867,8 +941,33 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 				# RENDER THE VIEWS
 				# ++++++++++++++++++++++++++++++++++++++++++++++++
 
-				# loop through all required views
-				for view in range(0, self.qs[self.preset]["total_views"]):
+				# if a new lightfield shall be rendered, queue all views that are not
+				# skipped from the center view outwards
+				# NOTE: The views are rendered progressively within the time budget
+				#		of each timer event, so that the UI is not blocked for the
+				#		whole quilt. The center views are visible from the usual
+				#		viewing position, so they are rendered first.
+				if self.modal_redraw or self.render_queue is None:
+
+					# NOTE: The skipped views are not cleared, but synthesized from
+					#		the rendered views, so that the lightfield does not flicker
+					total_views = self.qs[self.preset]["total_views"]
+					self.render_queue = sorted([view for view in range(0, total_views) if not self.is_skipped_view(view)], key=lambda view: (abs(2 * view - (total_views - 1)), view))
+					self.rendered_views = []
+					self.skipped_views = [view for view in range(0, total_views) if self.is_skipped_view(view)]
+					self.filled_views = {}
+
+				# render views until the time budget is used up (but at least one)
+				budget = self.addon_settings_window_manager.viewport_render_budget / 1000
+				drawn_views = []
+				while self.render_queue:
+
+					# if the lightfield window is not active anymore, stop
+					# NOTE: The remaining views stay in the queue
+					if not (context or context.window_manager.addon_settings.ShowLightfieldWindow):
+						break
+
+					view = self.render_queue.pop(0)
 
 					with self.qs[self.preset]["viewOffscreen"][view].bind():
 
@@ -879,47 +978,31 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 						LookingGlassAddonLogger.debug(" [#] [%i] Setting up view camera took %.3f ms" % (view, (time.time() - start_test) * 1000))
 						start_test = time.time()
 
-						# if the "skip views preview" is activated AND this view shall be skipped
-						if (self.addon_settings_window_manager.viewport_use_preview_mode and (self.addon_settings_window_manager.lightfield_preview_mode == '2' or self.addon_settings_window_manager.lightfield_preview_mode == '3')) and view % self.skip_views:
-
-							# clear LightfieldView array's color data (so it appears black)
-							self.lightfield_image.views[view]['view'].data[:] = 0
-
-							LookingGlassAddonLogger.debug(" [#] [%i] Clearing skipped view's numpy array took %.3f ms" % (view, (time.time() - start_test) * 1000))
+						# draw the viewport rendering to the offscreen for the current view
+						self.qs[self.preset]["viewOffscreen"][view].draw_view3d(
+							# we use the "Scene" and the "View Layer" that is active in the Window
+							# the user currently works in
+							scene=context.scene,
+							view_layer=context.view_layer,
+							view3d=self._override.space_data,
+							region=self._override.region,
+							view_matrix=view_matrix,
+							projection_matrix=projection_matrix,
+							do_color_management = True)
 
-						# if the "Restricted viewcone preview" is activated AND this view shall be skipped
-						elif (self.addon_settings_window_manager.viewport_use_preview_mode and self.addon_settings_window_manager.lightfield_preview_mode == '4') and (view < self.restricted_viewcone_limit or view > self.qs[self.preset]["total_views"] - self.restricted_viewcone_limit):
+						drawn_views.append(view)
 
-							# clear LightfieldView array's color data (so it appears black)
-							self.lightfield_image.views[view]['view'].data[:] = 0
+						LookingGlassAddonLogger.debug(" [#] [%i] Drawing view into offscreen took %.3f ms" % (view, (time.time() - start_test) * 1000))
 
-							LookingGlassAddonLogger.debug(" [#] [%i] Clearing skipped view's numpy array took %.3f ms" % (view, (time.time() - start_test) * 1000))
-
-						else:
-
-							# if the lightfield window is not active anymore, stop
-							if not (context or context.window_manager.addon_settings.ShowLightfieldWindow):
-								continue
-
-							# draw the viewport rendering to the offscreen for the current view
-							self.qs[self.preset]["viewOffscreen"][view].draw_view3d(
-								# we use the "Scene" and the "View Layer" that is active in the Window
-								# the user currently works in
-								scene=context.scene,
-								view_layer=context.view_layer,
-								view3d=self._override.space_data,
-								region=self._override.region,
-								view_matrix=view_matrix,
-								projection_matrix=projection_matrix,
-								do_color_management = True)
-
-							LookingGlassAddonLogger.debug(" [#] [%i] Drawing view into offscreen took %.3f ms" % (view, (time.time() - start_test) * 1000))
+					# if the time budget is used up, continue at the next timer event
+					if budget > 0 and time.time() - self.start_multi_view >= budget:
+						break
 
 				# restore all viewport shading and overlay settings
 				self.restoreViewportSettings()
 
 				LookingGlassAddonLogger.debug("-----------------------------")
-				LookingGlassAddonLogger.debug("Rendering all views took in total %.3f ms" % ((time.time() - self.start_multi_view) * 1000))
+				LookingGlassAddonLogger.debug("Rendering %i views took in total %.3f ms (%i views remaining)" % (len(drawn_views), (time.time() - self.start_multi_view) * 1000, len(self.render_queue)))
 				LookingGlassAddonLogger.debug("-----------------------------")
 
 
@@ -930,34 +1013,59 @@ class LOOKINGGLASS_OT_render_viewport(bpy.types.Operator):
 
 				self.start_multi_view = time.time()
 
-				# loop through all required views
-				for view in range(0, self.qs[self.preset]["total_views"]):
+				# loop through all views drawn during this timer event
+				for view in drawn_views:
 
-					# if the "skip views preview" is activated AND this view shall be skipped
-					if (self.addon_settings_window_manager.viewport_use_preview_mode and (self.addon_settings_window_manager.lightfield_preview_mode == '2' or self.addon_settings_window_manager.lightfield_preview_mode == '3')) and view % self.skip_views:
+					start_test = time.time()
 
-						continue
-					# if the "Restricted viewcone preview" is activated AND this view shall be skipped
-					elif (self.addon_settings_window_manager.viewport_use_preview_mode and self.addon_settings_window_manager.lightfield_preview_mode == '4') and (view < self.restricted_viewcone_limit or view > self.qs[self.preset]["total_views"] - self.restricted_viewcone_limit):
+					# copy texture into LightfieldView array and mark the view as updated
+					self.from_texture_to_numpy_array(self.qs[self.preset]["viewOffscreen"][view], self.lightfield_image.views[view]['view'].data[:])
+					self.lightfield_image.update_view(view)
+					bisect.insort(self.rendered_views, view)
 
-						continue
-					else:
+					LookingGlassAddonLogger.debug(" [#] [%i] Copying texture to numpy array took %.3f ms" % (view, (time.time() - start_test) * 1000))
 
-						start_test = time.time()
+				# fill the views, which are not rendered yet, with their nearest
+				# rendered neighbor, so that the partially rendered lightfield can
+				# already be displayed
+				# NOTE: Only views whose nearest rendered neighbor changed since the
+				#		last timer event are copied
+				if self.render_queue and drawn_views:
+
+					rendered_views = np.array(self.rendered_views)
+					for view in self.render_queue + self.skipped_views:
+
+						nearest_view = rendered_views[np.abs(rendered_views - view).argmin()]
+						if self.filled_views.get(view) == nearest_view: continue
 
-						# copy texture into LightfieldView array
-						self.from_texture_to_numpy_array(self.qs[self.preset]["viewOffscreen"][view], self.lightfield_image.views[view]['view'].data[:])
+						self.lightfield_image.views[view]['view'].data[:] = self.lightfield_image.views[nearest_view]['view'].data
+						self.lightfield_image.update_view(view)
+						self.filled_views[view] = nearest_view
 
-						LookingGlassAddonLogger.debug(" [#] [%i] Copying texture to numpy array took %.3f ms" % (view, (time.time() - start_test) * 1000))
+				# if all views are rendered now, synthesize the skipped views
+				elif drawn_views and self.skipped_views:
+
+					self.interpolate_views(self.skipped_views)
 
 				LookingGlassAddonLogger.debug("-----------------------------")
 				LookingGlassAddonLogger.debug("Copying all views took in total %.3f ms" % ((time.time() - self.start_multi_view) * 1000))
 				LookingGlassAddonLogger.debug("-----------------------------")
 
+			else:
+
+				# the remaining views can not be rendered without a camera
+				self.render_queue = None
+
 			# reset draw variable:
 			# This is here to prevent excessive redrawing
+			# NOTE: The remaining views of the render queue are rendered anyway
 			self.modal_redraw = False
 
+		else:
+
+			# the remaining views can not be rendered without a camera
+			self.render_queue = None
+
 
 
 # ------------ CAMERA FRUSTUM RENDERING -------------
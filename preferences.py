@@ -194,6 +194,14 @@ class LOOKINGGLASS_PT_preferences(AddonPreferences):
 									description="Additionally log outputs to std out for debugging",
 									update=LookingGlassAddon.update_logger_levels,
 									)
+
+	# detection of device changes
+	device_polling: bpy.props.BoolProperty(
+									default=False,
+									name="Detect device changes",
+									description="Check for connected, disconnected, or recalibrated Looking Glasses in the background",
+									update=LookingGlassAddon.update_device_polling,
+									)
 	# need this here, since the actual logger level property is not initialized
 	# before the dependencies are installed. but we want to log all details
 	logger_level = 0
@@ -232,3 +240,7 @@ class LOOKINGGLASS_PT_preferences(AddonPreferences):
 		column_3 = row_logger.column()
 		column_3.prop(self, "console_output")
 		column_3.scale_x = 0.25
+
+		# detection of device changes
+		row_devices = layout.row()
+		row_devices.prop(self, "device_polling")
@@ -54,9 +54,47 @@ LookingGlassAddonLogger = logging.getLogger('Alice/LG')
 # Class that contains all functions relevant for the UI
 class LookingGlassAddonUI:
 
+	# item lists of the device enums, which are rebuilt only when the device
+	# manager reports a change
+	# NOTE: Blender also requires that the strings of the items are referenced
+	#		in Python as long as the enum is in use
+	device_list_items = {}
+	device_list_items_previous = {}
+
+	# This listener of the device manager is required to rebuild the device lists
+	# NOTE: It is called by the thread which changed the devices (e.g., the
+	#		device poller), so the lists are rebuilt on Blender's main thread
+	@staticmethod
+	def device_list_changed_callback(event, device):
+
+		# rebuild the device lists with the next timer event
+		if not bpy.app.timers.is_registered(LookingGlassAddonUI.device_list_changed_handler):
+			bpy.app.timers.register(LookingGlassAddonUI.device_list_changed_handler)
+
+	# This timer is required to rebuild the device lists on the main thread
+	@staticmethod
+	def device_list_changed_handler():
+
+		# the item lists are rebuilt, when the enums are drawn the next time
+		# NOTE: The previous item lists are still referenced, since Blender
+		#		might use their strings until the enums are drawn again
+		LookingGlassAddonUI.device_list_items_previous = LookingGlassAddonUI.device_list_items
+		LookingGlassAddonUI.device_list_items = {}
+
+		# redraw the UI, so that the device lists are updated
+		for window in bpy.context.window_manager.windows:
+			for area in window.screen.areas:
+				area.tag_redraw()
+
+		return None
+
 	# This callback is required to be able to update the list of connected Looking Glass devices
 	def connected_device_list_callback(self, context):
 
+		# use the item list, if the devices did not change
+		items = LookingGlassAddonUI.device_list_items.get(('connected', LookingGlassAddon.debugging_use_dummy_device))
+		if items is not None: return items
+
 		# prepare a item list with entries of the form "identifier, name, description"
 		items = []
 
@@ -92,12 +130,17 @@ class LookingGlassAddonUI:
 
 
 		# return the item list
+		LookingGlassAddonUI.device_list_items[('connected', LookingGlassAddon.debugging_use_dummy_device)] = items
 		return items
 
 
 	# This callback is required to be able to update the list of emulated Looking Glass devices
 	def emulated_device_list_callback(self, context):
 
+		# use the item list, if the devices did not change
+		items = LookingGlassAddonUI.device_list_items.get('emulated')
+		if items is not None: return items
+
 		# prepare a item list with entries of the form "identifier, name, description"
 		items = []
 
@@ -121,6 +164,7 @@ class LookingGlassAddonUI:
 
 
 		# return the item list
+		LookingGlassAddonUI.device_list_items['emulated'] = items
 		return items
 
 	# This callback is required to be able to update the list of presets
@@ -881,6 +925,14 @@ class LookingGlassAddonSettingsWM(bpy.types.PropertyGroup):
 										default = True,
 										)
 
+	viewport_render_budget: bpy.props.IntProperty(
+										name="Render Budget (ms)",
+										description="Maximum time per update, which is used to render the views of the lightfield viewport. The remaining views are rendered during the next updates. If 0, all views are rendered at once",
+										default = 50,
+										min = 0,
+										max = 1000,
+										)
+
 	viewport_manual_refresh: bpy.props.BoolProperty(
 										name="Refresh Looking Glass",
 										description="Redraw the lightfield in the Looking Glass",
@@ -1732,6 +1784,10 @@ class LOOKINGGLASS_PT_panel_lightfield(bpy.types.Panel):
 			row_output.separator()
 			row_output.prop(context.window_manager.addon_settings, "viewport_use_preview_mode", text="", icon='IMAGE_ZDEPTH')
 
+			# Progressive rendering
+			row_budget = column.row(align = True)
+			row_budget.prop(context.window_manager.addon_settings, "viewport_render_budget")
+
 
 		# if the lightfield window is in quilt viewer mode
 		elif context.window_manager.addon_settings.renderMode == '1':